@@ -4,6 +4,8 @@ import json
 import subprocess
 import sys
 
+VERSION_FILE = "TNTGitHook/version.py"
+
 
 def get_last_version() -> str:
     # Return the version number of the last release
@@ -28,20 +30,20 @@ def bump_minor_number(version_number: str) -> str:
 
 
 def replace_version_number(last_version_number: str, new_version_number: str):
-    file_content = generate_setup_file_content_with_new_version(last_version_number, new_version_number)
-    write_new_setup_file(file_content)
+    file_content = generate_version_file_content_with_new_version(last_version_number, new_version_number)
+    write_new_version_file(file_content)
 
 
-def write_new_setup_file(file_content: str):
-    file_input = open("setup.py", "wt")
+def write_new_version_file(file_content: str):
+    file_input = open(VERSION_FILE, "wt")
     file_input.write(file_content)
     file_input.close()
 
 
-def generate_setup_file_content_with_new_version(last_version_number: str, new_version_number: str) -> str:
-    file_input = open("setup.py", "rt")
+def generate_version_file_content_with_new_version(last_version_number: str, new_version_number: str) -> str:
+    file_input = open(VERSION_FILE, "rt")
     file_content = file_input.read()
-    file_content = file_content.replace(last_version_number, new_version_number)
+    file_content = file_content.replace(f'"{last_version_number}"', f'"{new_version_number}"')
     file_input.close()
     return file_content
 
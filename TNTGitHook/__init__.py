@@ -1,13 +1,17 @@
 import argparse
 import json
-
-import requests
-
-from TNTGitHook.credentials import ask
-from TNTGitHook.exceptions import CommitMessageFormatError, InvalidSetupConfigurationError
+import os
+import sys
+from datetime import date
+
+# Only what the push hot path needs is imported here. requests, keyring and the setup machinery are imported by the
+# commands that use them, so every push doesn't pay for them on interpreter startup.
+from TNTGitHook import credentials, outbox, tracing
+from TNTGitHook.exceptions import CommitMessageFormatError, InvalidSetupConfigurationError, NetworkError
 from TNTGitHook.hook import Config, PrjConfig, DEFAULT_CONFIG_FILE_PATH, NAME, read_commit_msgs, \
     parse_commit_messages, create_activity, parse_commit_messages_from_file
-from TNTGitHook.hook_setup import is_update_needed, write_hook, setup
+from TNTGitHook.hook_setup import is_update_needed, write_hook
+from TNTGitHook.spool import submit_async, run_job, run_orphaned_jobs, show_new_submissions
 from TNTGitHook.utils import to_class
 
 
@@ -19,47 +23,199 @@ def main(argv=None):
     group.add_argument("--setup", action='store_true')
     group.add_argument('--commit-msgs', help="Commit messages")
     group.add_argument('--commit-msgs-file', help="Commit messages file")
+    group.add_argument("--pre-push", action='store_true', help="Run as git pre-push hook, reading the pushed refs from stdin")
+    group.add_argument("--flush", action='store_true', help="Send the activities pending in the outbox")
+    group.add_argument("--backfill", action='store_true', help="Register the evidences of past days from the history")
+    group.add_argument("--workspace", help="Register the commits of every configured repository in the directory")
+    group.add_argument('--submit-job', help=argparse.SUPPRESS)
+    group.add_argument("--agent", action='store_true', help="Run the resident agent in foreground")
+    group.add_argument("--agent-status", action='store_true', help="Show the resident agent status")
+    group.add_argument("--agent-stop", action='store_true', help="Stop the resident agent")
 
     parser.add_argument('--debug', action='store_true')
     parser.add_argument('--remote', help="Remote repo URL", required=False)
     parser.add_argument('--config', help="Config file", required=False)
+    parser.add_argument('--agent-idle-minutes', type=int, default=30, help="For agent: Minutes to wait before exiting")
+    parser.add_argument('--since', type=date.fromisoformat, help="For backfill and workspace: First day (YYYY-MM-DD)")
+    parser.add_argument('--until', type=date.fromisoformat,
+                        help="For backfill and workspace: Last day (YYYY-MM-DD), today by default")
+    parser.add_argument('--author', help="For backfill: Register the commits of this author, git user.email by default")
 
     parser.add_argument('--organization', help="For setup: The organization. By default require input", required=False, default="")
     parser.add_argument('--project', help="For setup: The project. By default require input", required=False, default="")
     parser.add_argument('--role', help="For setup: The role. By default require input", required=False, default="")
+    parser.add_argument('--trace', help=f"Append Chrome trace events of this run to the file (or set {tracing.TRACE_ENV})")
+    # Nanosecond timestamps taken by the shell hook around its git steps, as "start,end"
+    parser.add_argument('--git-timestamps', help=argparse.SUPPRESS)
 
 
     args = parser.parse_args()
+    if args.trace:
+        tracing.enable(args.trace)
+    else:
+        tracing.enable_from_env()
+    add_git_span(args.git_timestamps)
+    try:
+        with tracing.span("main"):
+            run(parser, args)
+    finally:
+        tracing.export()
+
+
+def add_git_span(git_timestamps: str):
+    if not git_timestamps or not tracing.is_enabled():
+        return
+    try:
+        start, end = (int(timestamp) // 1000 for timestamp in git_timestamps.split(","))
+    except ValueError:
+        # i.e. date on macOS doesn't support nanoseconds
+        return
+    tracing.add_span("git log (shell hook)", start, end)
+
+
+def run(parser: argparse.ArgumentParser, args: argparse.Namespace):
     config = Config.config(args.debug)
 
     if args.set_credentials:
+        from TNTGitHook.credentials import ask
         ask()
         return
 
+    if args.agent or args.agent_status or args.agent_stop:
+        from TNTGitHook import agent
+        if args.agent:
+            agent.serve(args.agent_idle_minutes, args.debug)
+        elif args.agent_status:
+            agent.print_status()
+        else:
+            agent.stop()
+        return
+
+    if args.submit_job:
+        run_job(args.submit_job, args.debug)
+        run_orphaned_jobs(args.debug)
+        return
+
+    if args.flush:
+        try:
+            flushed, failed = outbox.flush(config)
+            print(f"Outbox flushed: {flushed} activities sent, {failed} pending")
+            if failed:
+                exit(-1)
+            return
+        finally:
+            print_debug_stats(config)
+
     if args.setup:
+        from TNTGitHook.hook_setup import setup
         try:
             setup(config, args.organization, args.project, args.role)
             return
         except InvalidSetupConfigurationError as error:
             print(error)
             exit(-1)
+        finally:
+            print_debug_stats(config)
 
-    config_file = args.config or DEFAULT_CONFIG_FILE_PATH
-    try:
-        commit_msgs = parse_commit_messages(args.commit_msgs) if args.commit_msgs else parse_commit_messages_from_file(args.commit_msgs_file)
+    if args.workspace:
+        from TNTGitHook import workspace
+        import time
+        try:
+            until = args.until or date.today()
+            since = args.since or until
+            start = time.perf_counter()
+            updated, up_to_date, failed = workspace.run(config, args.workspace, since, until)
+            print(f"Workspace {args.workspace}: {updated} activities updated, {up_to_date} already up to date, "
+                  f"{failed} failed in {time.perf_counter() - start:.1f} s")
+            if failed:
+                exit(-1)
+            return
+        except Exception as error:
+            print("Could not register workspace activities on TNT due to some errors:")
+            print(error)
+            exit(-1)
+        finally:
+            print_debug_stats(config)
+
+    config_path = args.config or DEFAULT_CONFIG_FILE_PATH
+    if args.backfill:
+        if args.since is None:
+            parser.error("--backfill requires --since")
+        from TNTGitHook.backfill import backfill, remote_url
+        import time
+        try:
+            with open(config_path) as config_file:
+                prj_config: PrjConfig = json.load(config_file, object_hook=lambda x: to_class(x, PrjConfig))
+            config.timeout = prj_config.timeout
+            until = args.until or date.today()
+            start = time.perf_counter()
+            registered, skipped, failed = backfill(config, prj_config, args.since, until,
+                                                   args.remote or remote_url(), config_path, author=args.author)
+            elapsed = time.perf_counter() - start
+            print(f"Backfill from {args.since} to {until}: {registered} days registered, {skipped} already done, "
+                  f"{failed} failed in {elapsed:.1f} s ({registered / elapsed:.1f} days/s)")
+            if failed:
+                exit(-1)
+            return
+        except Exception as error:
+            print("Could not backfill activities on TNT due to some errors:")
+            print(error)
+            exit(-1)
+        finally:
+            print_debug_stats(config)
 
-        with open(config_file) as config_file:
+    try:
+        with tracing.span("read commits"):
+            if args.pre_push:
+                from TNTGitHook.git import pushed_commits
+                commit_msgs = pushed_commits(sys.stdin)
+                if commit_msgs is None:
+                    return
+            else:
+                commit_msgs = parse_commit_messages(args.commit_msgs) if args.commit_msgs else parse_commit_messages_from_file(args.commit_msgs_file)
+
+        with open(config_path) as config_file:
             prj_config: PrjConfig = json.load(config_file, object_hook=lambda x: to_class(x, PrjConfig))
             config.timeout = prj_config.timeout
 
-            if is_update_needed():
-                write_hook()
-
+            with tracing.span("hook update check"):
+                if is_update_needed():
+                    write_hook()
+
+            show_new_submissions()
+            if prj_config.agent:
+                from TNTGitHook import agent
+                if args.pre_push and config_path == DEFAULT_CONFIG_FILE_PATH and submit_to_agent(agent, prj_config,
+                                                                                                 commit_msgs, args.remote):
+                    return
+                agent.ensure_running(prj_config, args.debug)
+            if prj_config.async_submission:
+                latency = submit_async(commit_msgs, args.remote, prj_config, config_path, args.debug)
+                print(f"Activity queued for TNT in {latency:.1f} ms, it will be registered in background")
+                return
+
+            with tracing.span("import requests"):
+                import requests
+            with tracing.span("outbox flush"):
+                outbox.flush_pending(config)
+            with tracing.span("orphaned jobs"):
+                run_orphaned_jobs(args.debug)
             try:
-                create_activity(config, prj_config, commit_msgs, args.remote)
-            except requests.exceptions.RequestException as error:
+                with outbox.group_locked(date.today(), prj_config):
+                    response = create_activity(config, prj_config, commit_msgs, args.remote, config_path)
+                if not outbox.is_sent(response):
+                    print(f"TNT answered with HTTP return code {response.status_code}, continue with the push")
+                    if outbox.is_retriable(response):
+                        outbox.enqueue(commit_msgs, args.remote, prj_config, config_path)
+                        print("Activity stored in the outbox, it will be sent on next push or with "
+                              "'TNTGitHook --flush'")
+                    else:
+                        print("Could not register activity on TNT, the request was rejected")
+            except (requests.exceptions.RequestException, NetworkError) as error:
                 print("Timeout generating activity due to request error, continue with the push")
                 print(error)
+                outbox.enqueue(commit_msgs, args.remote, prj_config, config_path)
+                print("Activity stored in the outbox, it will be sent on next push or with 'TNTGitHook --flush'")
                 exit(0)
             except Exception as error:
                 print(" Could not register activity on TNT due to some errors:")
@@ -72,3 +228,28 @@ def main(argv=None):
         print("Could not register activity on TNT due to some errors:")
         print(error)
         exit(-1)
+    finally:
+        print_debug_stats(config)
+
+
+def submit_to_agent(agent, prj_config: PrjConfig, commit_msgs, remote: str) -> bool:
+    """Registers the push through the resident agent, False if it is not running"""
+    result = agent.submit(os.getcwd(), remote, commit_msgs, agent.SUBMIT_TIMEOUT_REQUESTS * prj_config.timeout)
+    if result is None:
+        return False
+    status, output = result
+    if output:
+        print(output)
+    if status == "FAIL":
+        print("Error executing python hook")
+        exit(-1)
+    return True
+
+
+def print_debug_stats(config: Config):
+    if not config.debug:
+        return
+    if config.has_transport():
+        print(config.transport)
+    if credentials.timings:
+        print(credentials.timings_report())
@@ -0,0 +1,298 @@
+"""Optional resident process that registers pushes without paying the interpreter startup on each one.
+
+The agent keeps the HTTP session, the credentials and the project configs (with their pinned catalog IDs) in memory,
+and exits after some idle minutes. tnt_git_hook.sh and the --pre-push hook talk to it through a Unix socket using a
+line based protocol:
+
+    SUBMIT                       STATUS
+    project: <path>
+    remote: <url>
+    length: <bytes>
+
+    <commit messages>
+
+The first line of the response is OK or FAIL, the rest is the output to show to the user.
+"""
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+from collections import deque
+from contextlib import redirect_stdout
+from datetime import date
+from io import StringIO
+from typing import List, Optional, Tuple
+
+from TNTGitHook.hook import Config, PrjConfig, DEFAULT_CONFIG_FILE_PATH, parse_commit_messages, create_activity, \
+    retrieve_keychain_credentials
+from TNTGitHook.utils import hook_data_path, to_class
+
+AGENT_SOCKET: str = "agent.sock"
+DEFAULT_IDLE_MINUTES: int = 30
+# The agent may look up the catalog, the activity of the day and post it before answering
+SUBMIT_TIMEOUT_REQUESTS: int = 4
+LATENCY_SAMPLES: int = 1000
+
+
+def socket_path() -> str:
+    path = hook_data_path("run")
+    os.chmod(path, 0o700)
+    return f"{path}{AGENT_SOCKET}"
+
+
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class AgentState:
+    """Everything the agent keeps warm between pushes"""
+
+    def __init__(self, debug: bool):
+        self.config = Config.config(debug)
+        self.started = time.time()
+        self.requests_served = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.credentials = None
+        self.credentials_stats = CacheStats()
+        # Config file path -> (mtime, PrjConfig), so revalidated catalog IDs are kept even if the file can't be written
+        self.prj_configs = {}
+        self.catalog_stats = CacheStats()
+
+    def get_credentials(self):
+        if self.credentials is None:
+            self.credentials_stats.misses += 1
+            self.credentials = retrieve_keychain_credentials()
+        else:
+            self.credentials_stats.hits += 1
+        return self.credentials
+
+    def get_prj_config(self, config_path: str) -> PrjConfig:
+        mtime = os.stat(config_path).st_mtime_ns
+        cached = self.prj_configs.get(config_path)
+        if cached is None or cached[0] != mtime:
+            with open(config_path) as config_file:
+                prj_config: PrjConfig = json.load(config_file, object_hook=lambda x: to_class(x, PrjConfig))
+            cached = (mtime, prj_config)
+            self.prj_configs[config_path] = cached
+        prj_config = cached[1]
+        if prj_config.has_pinned_ids():
+            self.catalog_stats.hits += 1
+        else:
+            self.catalog_stats.misses += 1
+        return prj_config
+
+    def percentile(self, percentile: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+
+    def status(self) -> dict:
+        return {"pid": os.getpid(),
+                "uptime": round(time.time() - self.started, 1),
+                "requests_served": self.requests_served,
+                "errors": self.errors,
+                "credentials_hit_rate": round(self.credentials_stats.hit_rate(), 3),
+                "catalog_hit_rate": round(self.catalog_stats.hit_rate(), 3),
+                "p50_ms": round(self.percentile(0.50) * 1000, 1),
+                "p99_ms": round(self.percentile(0.99) * 1000, 1)}
+
+
+class AgentHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        command = self.rfile.readline().decode("utf8").strip()
+        if command == "STATUS":
+            self.reply("OK", json.dumps(self.server.state.status()))
+        elif command == "STOP":
+            self.reply("OK", "Agent stopped")
+            self.server.stopped = True
+        elif command == "SUBMIT":
+            self.submit()
+        else:
+            self.reply("FAIL", f"Unknown command {command}")
+
+    def submit(self):
+        # Imported here, as the module is only loaded by the hook for status and spawning
+        import requests
+        from TNTGitHook import outbox
+        from TNTGitHook.exceptions import NetworkError
+        from TNTGitHook.hook_setup import is_update_needed, write_hook
+
+        state: AgentState = self.server.state
+        start = time.perf_counter()
+        headers = self.read_headers()
+        commit_msgs = parse_commit_messages(self.rfile.read(int(headers["length"])).decode("utf8").strip())
+        config_path = os.path.join(headers["project"], DEFAULT_CONFIG_FILE_PATH)
+        output = StringIO()
+        status = "OK"
+        with redirect_stdout(output):
+            try:
+                prj_config = state.get_prj_config(config_path)
+                state.config.timeout = prj_config.timeout
+                if is_update_needed():
+                    write_hook()
+                outbox.flush_pending(state.config)
+                try:
+                    with outbox.group_locked(date.today(), prj_config):
+                        response = create_activity(state.config, prj_config, commit_msgs, headers.get("remote"),
+                                                   config_path, credentials=state.get_credentials())
+                    if not outbox.is_sent(response):
+                        print(f"TNT answered with HTTP return code {response.status_code}, continue with the push")
+                        if outbox.is_retriable(response):
+                            outbox.enqueue(commit_msgs, headers.get("remote"), prj_config, config_path)
+                            print("Activity stored in the outbox, it will be sent on next push or with "
+                                  "'TNTGitHook --flush'")
+                        else:
+                            print("Could not register activity on TNT, the request was rejected")
+                except (requests.exceptions.RequestException, NetworkError) as error:
+                    print("Timeout generating activity due to request error, continue with the push")
+                    print(error)
+                    outbox.enqueue(commit_msgs, headers.get("remote"), prj_config, config_path)
+                    print("Activity stored in the outbox, it will be sent on next push or with 'TNTGitHook --flush'")
+                except Exception as error:
+                    print(" Could not register activity on TNT due to some errors:")
+                    print(error)
+                    state.errors += 1
+                    if not prj_config.ignore_errors:
+                        status = "FAIL"
+            except Exception as error:
+                print("Could not register activity on TNT due to some errors:")
+                print(error)
+                state.errors += 1
+                status = "FAIL"
+        state.requests_served += 1
+        state.latencies.append(time.perf_counter() - start)
+        self.server.last_activity = time.monotonic()
+        self.reply(status, output.getvalue().rstrip("\n"))
+
+    def read_headers(self) -> dict:
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode("utf8").rstrip("\n")
+            if not line:
+                return headers
+            key, _, value = line.partition(":")
+            headers[key.strip()] = value.strip()
+
+    def reply(self, status: str, message: str):
+        self.wfile.write(f"{status}\n{message}\n".encode("utf8"))
+
+
+class AgentServer(socketserver.UnixStreamServer):
+    """Serves one push at a time, so the shared state doesn't need locking"""
+
+    def __init__(self, path: str, state: AgentState, idle_minutes: int = DEFAULT_IDLE_MINUTES):
+        if os.path.exists(path):
+            # Left behind by an agent that didn't exit cleanly, is_running already checked nobody answers
+            os.remove(path)
+        super().__init__(path, AgentHandler)
+        os.chmod(path, 0o600)
+        self.state = state
+        self.idle_seconds = idle_minutes * 60
+        self.timeout = min(self.idle_seconds, 60)
+        self.last_activity = time.monotonic()
+        self.stopped = False
+
+    def serve_until_idle(self):
+        try:
+            while not self.stopped and time.monotonic() - self.last_activity < self.idle_seconds:
+                self.handle_request()
+        finally:
+            self.server_close()
+            if os.path.exists(self.server_address):
+                os.remove(self.server_address)
+
+
+def send(command: str, timeout: float = 1.0, path: str = None) -> (str, str):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(path or socket_path())
+        client.sendall(f"{command}\n".encode("utf8"))
+        response = b""
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+    status, _, message = response.decode("utf8").partition("\n")
+    return status, message.rstrip("\n")
+
+
+def submit(project: str, remote: str, commit_msgs: List[Tuple[str, str, str, str]],
+           timeout: float) -> Optional[Tuple[str, str]]:
+    """Hands the push to the agent, returns its (status, output) or None if it is not running"""
+    # Newest first, like the git log output sent by tnt_git_hook.sh
+    body = "\n".join(";".join(commit_msg) for commit_msg in reversed(commit_msgs)).encode("utf8")
+    request = f"SUBMIT\nproject: {project}\nremote: {remote}\nlength: {len(body)}\n\n".encode("utf8") + body
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path())
+            client.sendall(request)
+            response = client.makefile("rb").read().decode("utf8")
+    except OSError:
+        return None
+    status, _, message = response.partition("\n")
+    if status not in ("OK", "FAIL"):
+        return None
+    return status, message.rstrip("\n")
+
+
+def is_running(path: str = None) -> bool:
+    try:
+        return send("STATUS", path=path)[0] == "OK"
+    except OSError:
+        return False
+
+
+def spawn(idle_minutes: int, debug: bool) -> None:
+    import subprocess
+
+    args = [sys.executable, "-m", "TNTGitHook", "--agent", "--agent-idle-minutes", str(idle_minutes)]
+    if debug:
+        args.append("--debug")
+    subprocess.Popen(args,
+                     stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL,
+                     close_fds=True,
+                     start_new_session=True)
+
+
+def ensure_running(prj_config: PrjConfig, debug: bool) -> None:
+    if prj_config.agent and not is_running():
+        spawn(prj_config.agent_idle_minutes, debug)
+
+
+def serve(idle_minutes: int, debug: bool) -> None:
+    path = socket_path()
+    if is_running(path):
+        print("Agent already running")
+        return
+    AgentServer(path, AgentState(debug), idle_minutes).serve_until_idle()
+
+
+def print_status() -> None:
+    try:
+        status, message = send("STATUS")
+    except OSError:
+        print("Agent not running")
+        return
+    for key, value in json.loads(message).items():
+        print(f"{key}: {value}")
+
+
+def stop() -> None:
+    try:
+        print(send("STOP")[1])
+    except OSError:
+        print("Agent not running")
@@ -0,0 +1,122 @@
+"""Registers the evidences of past days from the repository history, i.e. when the hook is set up in an old repository.
+
+The history is walked once and grouped by author day, and every day is registered through the same path as a push,
+so days that already have an evidence are merged with it instead of duplicated.
+"""
+import hashlib
+import json
+import subprocess
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from TNTGitHook import hook, outbox
+from TNTGitHook.exceptions import GitLogError, UnknownAuthorError
+from TNTGitHook.git import LOG_FORMAT
+from TNTGitHook.utils import hook_data_path, write_atomically
+
+# Days are registered concurrently, up to the connections kept by the transport
+BACKFILL_MAX_WORKERS: int = 4
+
+
+def checkpoint_path(prj_config, remote: str, author: str) -> str:
+    # By name, as the role ID is pinned by the first run
+    key = json.dumps([f"{prj_config.organization}/{prj_config.project}/{prj_config.role}", remote or "", author])
+    return f"{hook_data_path('backfill')}{hashlib.sha1(key.encode('utf8')).hexdigest()}.json"
+
+
+def read_checkpoint(path: str) -> Set[date]:
+    """Days already registered by previous runs"""
+    try:
+        with open(path) as checkpoint_file:
+            return {date.fromisoformat(day) for day in json.load(checkpoint_file)["days"]}
+    except (FileNotFoundError, ValueError, KeyError):
+        return set()
+
+
+def write_checkpoint(path: str, days: Set[date]) -> None:
+    write_atomically(path, json.dumps({"days": sorted(day.isoformat() for day in days)}))
+
+
+def commits_by_day(since: date, until: date, revisions: Sequence[str] = ("HEAD",), author: str = None,
+                   cwd: str = None) -> Dict[date, List[Tuple[str, str, str, str]]]:
+    """Commits authored between both days (included), oldest first"""
+    # git filters by committer date, which is never before the author date, so only --since can be delegated to it. It
+    # is a day earlier because the author day is in the author time zone, and git would fill the time with the current
+    since_time = f"{(since - timedelta(days=1)).isoformat()} 00:00:00"
+    args = ["git", "log", "--reverse", "--topo-order", f"--pretty=tformat:{LOG_FORMAT}", f"--since={since_time}"]
+    if author:
+        args += [f"--author={author}", "--fixed-strings"]
+    days = defaultdict(list)
+    with subprocess.Popen(args + list(revisions), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          cwd=cwd) as process:
+        for line in process.stdout:
+            commit_msg = hook.parse_commit_message(line.decode("utf8").rstrip("\n"))
+            day = date.fromisoformat(commit_msg[1][:10])
+            if since <= day <= until:
+                days[day].append(commit_msg)
+    if process.returncode != 0:
+        raise GitLogError()
+    return days
+
+
+def user_email(cwd: str = None) -> Optional[str]:
+    result = subprocess.run(["git", "config", "user.email"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=cwd)
+    return result.stdout.decode("utf8").strip() or None
+
+
+def remote_url(cwd: str = None) -> Optional[str]:
+    result = subprocess.run(["git", "ls-remote", "--get-url"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            cwd=cwd)
+    url = result.stdout.decode("utf8").strip()
+    return url if result.returncode == 0 and url else None
+
+
+def backfill(config, prj_config, since: date, until: date, remote: str, config_path: str = None,
+             max_workers: int = BACKFILL_MAX_WORKERS, author: str = None) -> Tuple[int, int, int]:
+    """Registers one evidence per day with commits of the author, the git user by default. Returns (registered,
+    skipped, failed) days"""
+    # The history of a team repository has the commits of every colleague, which are not the user's evidences
+    author = author or user_email()
+    if author is None:
+        raise UnknownAuthorError()
+    days = commits_by_day(since, until, author=author)
+    path = checkpoint_path(prj_config, remote, author)
+    done = read_checkpoint(path)
+    pending = sorted(day for day in days if day not in done)
+    if not pending:
+        return 0, len(days), 0
+
+    # Shared by every day, so they are resolved once instead of once per worker
+    credentials = hook.retrieve_keychain_credentials()
+    hook.resolve_role_id(config, prj_config, config_path)
+    lock = threading.Lock()
+
+    def register(day: date) -> bool:
+        # A push or spool job updating the same day would overwrite this description, or this one theirs
+        with outbox.group_locked(day, prj_config):
+            response = hook.create_activity(config, prj_config, days[day], remote, config_path, day=day,
+                                            credentials=credentials)
+        # No response means the commits were already registered
+        if response is not None and response.status_code != 200:
+            return False
+        with lock:
+            done.add(day)
+            write_checkpoint(path, done)
+        return True
+
+    registered = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(register, day) for day in pending]
+        for day, future in zip(pending, futures):
+            try:
+                if future.result():
+                    registered += 1
+                    continue
+            except Exception as error:
+                print(f"Could not register the evidence of {day}: {error}")
+            failed += 1
+    return registered, len(days) - len(pending), failed
@@ -1,20 +1,42 @@
+import json
+import os
+import time
+from contextlib import contextmanager
 from getpass import getpass
+from typing import Dict, Tuple
 
-import keyring
-from keyring.errors import PasswordDeleteError
+from TNTGitHook.exceptions import NoCredentialsError
+from TNTGitHook.tokens import clear_tokens
+from TNTGitHook.utils import hook_data_path, write_atomically
 
 NAME: str = "TNTGitHook"
+KEYRING_SERVICE: str = f"com.autentia.{NAME}"
+MIGRATION_MARKER: str = "credentials_migrated"
+SESSION_CACHE_FILE: str = "credentials_session.json"
+# Seconds the credentials are kept in a local session cache shared between pushes. Disabled by default
+SESSION_TTL_ENV: str = "TNT_HOOK_CREDENTIALS_TTL"
+
+_credentials: Tuple[str, str] = None
+# Time spent in each credential access step, in seconds, and memoized reads, shown in debug output
+timings: Dict[str, float] = {}
+memoized_hits: int = 0
 
 
 def ask():
+    import keyring
+    from keyring.errors import PasswordDeleteError
+
     # Store the user as single value in keychain to avoid multiple ask for password
     username = input("User: ")
     password = getpass()
-    keyring.set_password(f"com.autentia.{NAME}", "credentials", f"{username}:{password}")
+    keyring.set_password(KEYRING_SERVICE, "credentials", f"{username}:{password}")
+    # Tokens and cached credentials issued for the previous credentials must not be used anymore
+    clear_tokens()
+    clear_credentials_cache()
     # TODO: remove code below when every user has migrated
     try:
-        keyring.delete_password(f"com.autentia.{NAME}", "username")
-        keyring.delete_password(f"com.autentia.{NAME}", "password")
+        keyring.delete_password(KEYRING_SERVICE, "username")
+        keyring.delete_password(KEYRING_SERVICE, "password")
     except PasswordDeleteError:
         # We have already deleted old values, no true error so we can continue
         pass
@@ -25,3 +47,125 @@ def ask():
     print("2- Search com.autentia.TNTGitHook")
     print("3- Open it an click on 'Access Control'")
     print("4- Delete entry 'Python' and click on 'Save Changes'")
+
+
+def retrieve_credentials() -> Tuple[str, str]:
+    """Credentials are read from the OS keyring once per process, or once per session TTL if it is configured"""
+    global _credentials, memoized_hits
+    if _credentials is not None:
+        memoized_hits += 1
+        return _credentials
+    with timed("session_cache"):
+        credentials = read_session_cache()
+    if credentials is None:
+        credentials = read_keyring()
+        write_session_cache(credentials)
+    _credentials = credentials
+    return credentials
+
+
+def read_keyring() -> Tuple[str, str]:
+    with timed("keyring_import"):
+        import keyring
+        from keyring.errors import PasswordDeleteError
+
+    with timed("keyring_get"):
+        credentials = keyring.get_password(KEYRING_SERVICE, "credentials")
+    # TODO: backwards compatibility. Leave only else code when all users migrated to new credentials management
+    legacy = not credentials
+    if legacy:
+        with timed("legacy_migration"):
+            username = keyring.get_password(KEYRING_SERVICE, "username")
+            password = keyring.get_password(KEYRING_SERVICE, "password")
+            keyring.set_password(KEYRING_SERVICE, "credentials", f"{username}:{password}")
+    else:
+        tokens = credentials.split(sep=":", maxsplit=2)
+        username = tokens[0]
+        password = tokens[1]
+    # Deleting the old entries is only needed once, each attempt is a round trip to the keyring service
+    if legacy or not is_migration_recorded():
+        with timed("legacy_cleanup"):
+            try:
+                keyring.delete_password(KEYRING_SERVICE, "username")
+                keyring.delete_password(KEYRING_SERVICE, "password")
+            except PasswordDeleteError:
+                # We have already deleted old values, no true error so we can continue
+                pass
+        record_migration()
+    if not username or not password:
+        raise NoCredentialsError()
+    return username, password
+
+
+def migration_marker_path() -> str:
+    return f"{hook_data_path('state')}{MIGRATION_MARKER}"
+
+
+def is_migration_recorded() -> bool:
+    return os.path.isfile(migration_marker_path())
+
+
+def record_migration() -> None:
+    try:
+        write_atomically(migration_marker_path(), "")
+    except OSError:
+        # Not being able to record it only means the cleanup is attempted again next time
+        pass
+
+
+def session_ttl() -> int:
+    try:
+        return int(os.environ.get(SESSION_TTL_ENV, 0))
+    except ValueError:
+        return 0
+
+
+def session_cache_path() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, f"{NAME}-{SESSION_CACHE_FILE}")
+    path = hook_data_path("run")
+    os.chmod(path, 0o700)
+    return f"{path}{SESSION_CACHE_FILE}"
+
+
+def read_session_cache():
+    if session_ttl() <= 0:
+        return None
+    try:
+        with open(session_cache_path()) as cache_file:
+            session = json.load(cache_file)
+    except (FileNotFoundError, ValueError):
+        return None
+    if session["expires_at"] < time.time():
+        return None
+    return session["username"], session["password"]
+
+
+def write_session_cache(credentials: Tuple[str, str]) -> None:
+    ttl = session_ttl()
+    if ttl <= 0:
+        return
+    session = {"username": credentials[0], "password": credentials[1], "expires_at": time.time() + ttl}
+    write_atomically(session_cache_path(), json.dumps(session), mode=0o600)
+
+
+def clear_credentials_cache() -> None:
+    global _credentials
+    _credentials = None
+    if os.path.isfile(session_cache_path()):
+        os.remove(session_cache_path())
+
+
+@contextmanager
+def timed(step: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = timings.get(step, 0.0) + time.perf_counter() - start
+
+
+def timings_report() -> str:
+    steps = ", ".join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in timings.items())
+    return f"Credentials access: {steps}, {memoized_hits} memoized reads"
@@ -2,8 +2,18 @@ from datetime import datetime
 
 
 class Organization:
-    id: int
-    name: str
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int = None, name: str = None):
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_json(cls, obj: dict):
+        return cls(obj.get("id"), obj.get("name"))
+
+    def to_json(self) -> dict:
+        return {"id": self.id, "name": self.name}
 
     def with_id(self, id: int):
         self.id = id
@@ -15,10 +25,20 @@ class Organization:
 
 
 class Project:
-    id: int
-    name: str
-    open: bool
-    billable: bool
+    __slots__ = ("id", "name", "open", "billable")
+
+    def __init__(self, id: int = None, name: str = None, open: bool = None, billable: bool = None):
+        self.id = id
+        self.name = name
+        self.open = open
+        self.billable = billable
+
+    @classmethod
+    def from_json(cls, obj: dict):
+        return cls(obj.get("id"), obj.get("name"), obj.get("open"), obj.get("billable"))
+
+    def to_json(self) -> dict:
+        return {"id": self.id, "name": self.name, "open": self.open, "billable": self.billable}
 
     def with_id(self, id: int):
         self.id = id
@@ -38,8 +58,18 @@ class Project:
 
 
 class Role:
-    id: int
-    name: str
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int = None, name: str = None):
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_json(cls, obj: dict):
+        return cls(obj.get("id"), obj.get("name"))
+
+    def to_json(self) -> dict:
+        return {"id": self.id, "name": self.name}
 
     def with_id(self, id: int):
         self.id = id
@@ -50,15 +80,41 @@ class Role:
         return self
 
 
+def nested_from_json(cls, obj):
+    return cls.from_json(obj) if isinstance(obj, dict) else None
+
+
 class Activity:
-    id: int
-    startDate: datetime
-    duration: int
-    description: str
-    billable: bool
-    organization: Organization
-    project: Project
-    projectRole: Role
+    __slots__ = ("id", "startDate", "duration", "description", "billable", "organization", "project", "projectRole")
+
+    def __init__(self, id: int = None, startDate: str = None, duration: int = None, description: str = None,
+                 billable: bool = None, organization: Organization = None, project: Project = None,
+                 projectRole: Role = None):
+        self.id = id
+        self.startDate = startDate
+        self.duration = duration
+        self.description = description
+        self.billable = billable
+        self.organization = organization
+        self.project = project
+        self.projectRole = projectRole
+
+    @classmethod
+    def from_json(cls, obj: dict):
+        """Only the fields used by the hook are kept, the rest of the activity (i.e. userId) is dropped"""
+        return cls(obj.get("id"), obj.get("startDate"), obj.get("duration"), obj.get("description"),
+                   obj.get("billable"), nested_from_json(Organization, obj.get("organization")),
+                   nested_from_json(Project, obj.get("project")), nested_from_json(Role, obj.get("projectRole")))
+
+    def to_json(self) -> dict:
+        return {"id": self.id,
+                "startDate": self.startDate,
+                "duration": self.duration,
+                "description": self.description,
+                "billable": self.billable,
+                "organization": self.organization.to_json() if self.organization else None,
+                "project": self.project.to_json() if self.project else None,
+                "projectRole": self.projectRole.to_json() if self.projectRole else None}
 
     def with_id(self, id):
         self.id = id
@@ -99,13 +155,29 @@ class ActivitiesResponse:
 
 
 class CreateActivityRequest:
-    id: int
-    startDate: datetime
-    duration: int
-    description: str
-    billable: bool
-    projectRoleId: int
-    userName: str
+    __slots__ = ("id", "startDate", "duration", "description", "billable", "projectRoleId", "userName")
+
+    def __init__(self, id: int = None, startDate: datetime = None, duration: int = None, description: str = None,
+                 billable: bool = None, projectRoleId: int = None, userName: str = None):
+        self.id = id
+        self.startDate = startDate
+        self.duration = duration
+        self.description = description
+        self.billable = billable
+        self.projectRoleId = projectRoleId
+        self.userName = userName
+
+    def to_json(self) -> dict:
+        """The request body, without id when the activity is new"""
+        body = {"description": self.description,
+                "startDate": self.startDate.isoformat() if isinstance(self.startDate, datetime) else self.startDate,
+                "duration": self.duration,
+                "billable": self.billable,
+                "projectRoleId": self.projectRoleId,
+                "userName": self.userName}
+        if self.id is not None:
+            body = {"id": self.id, **body}
+        return body
 
 
 class FileInfo:
@@ -0,0 +1,331 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+EVIDENCE_PREFIX: str = "###Autocreated evidence###\n(DO NOT DELETE)"
+SECTION_SEPARATOR: str = f"\n{EVIDENCE_PREFIX}\n"
+COMMIT_SEPARATOR: str = "\n-----\n"
+TRUNCATION_MARK: str = "\n..."
+SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+# Compact format: a line per commit with the abbreviated SHA and the time, preceded by a line with the date and another
+# with the author name whenever they change, i.e.
+#   2021-05-27
+#   ~Jane Doe
+#   b287b94c 13:20 Fix-the-build
+#   +3 more commits (c3a1e2bb..d4e5f6a7)
+SHORT_SHA_LENGTH: int = 8
+AUTHOR_MARK: str = "~"
+COMPACT_CONTENT_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2}|\+\d+ more commits \(.*\))$")
+COMPACT_COMMIT_PATTERN = re.compile(r"^([0-9a-f]{8}) \d{2}:\d{2} ", re.MULTILINE)
+ROLLUP_PATTERN = re.compile(r"^\+(\d+) more commits \(([0-9a-f]{8})\.\.([0-9a-f]{8})\)$", re.MULTILINE)
+
+
+def format_commit(commit_msg: Tuple[str, str, str, str]) -> str:
+    return "\n".join(commit_msg)
+
+
+def format_rollup(count: int, first: str, last: str) -> str:
+    return f"+{count} more commits ({first[:SHORT_SHA_LENGTH]}..{last[:SHORT_SHA_LENGTH]})"
+
+
+def join_rollups(first: Optional[Tuple[int, str, str]],
+                 second: Optional[Tuple[int, str, str]]) -> Optional[Tuple[int, str, str]]:
+    """(count, first SHA, last SHA) of two consecutive rolled up ranges"""
+    if first is None or second is None:
+        return first or second
+    return first[0] + second[0], first[1], second[2]
+
+
+def rollup_of(commit_msgs: List[Tuple[str, str, str, str]],
+              rolled_up: Tuple[int, str, str] = None) -> Optional[Tuple[int, str, str]]:
+    """Range of the commits followed by the rolled_up ones, None if there are none"""
+    commits = (len(commit_msgs), commit_msgs[0][0], commit_msgs[-1][0]) if commit_msgs else None
+    return join_rollups(commits, rolled_up)
+
+
+def format_compact_commits(commit_msgs: List[Tuple[str, str, str, str]], room: int = None,
+                           rolled_up: Tuple[int, str, str] = None) -> str:
+    """Compact entry with the commits that fit in room characters, followed by a rollup line of the rest and of the
+    rolled_up commits after them"""
+    lines = []
+    size = -1
+    day = author = None
+    for position, (sha, commit_date, commit_author, message) in enumerate(commit_msgs):
+        commit_lines = []
+        if commit_date[:10] != day:
+            commit_lines.append(commit_date[:10])
+        name = commit_author.partition(" <")[0]
+        if name != author:
+            commit_lines.append(AUTHOR_MARK + name)
+        commit_lines.append(f"{sha[:SHORT_SHA_LENGTH]} {commit_date[11:16]} {message}")
+        commit_size = sum(len(line) + 1 for line in commit_lines)
+        rest = rollup_of(commit_msgs[position + 1:], rolled_up)
+        if room is not None and size + commit_size + (len(format_rollup(*rest)) + 1 if rest else 0) > room:
+            lines.append(format_rollup(*rollup_of(commit_msgs[position:], rolled_up)))
+            break
+        lines.extend(commit_lines)
+        size += commit_size
+        day = commit_date[:10]
+        author = name
+    else:
+        if rolled_up is not None:
+            lines.append(format_rollup(*rolled_up))
+    return "\n".join(lines)
+
+
+def parse_entry_commits(entry: str) -> Tuple[List[Tuple[str, str, str, str]], Optional[Tuple[int, str, str]]]:
+    """Commits and rollup of an entry, as format_compact_commits needs them to write it again. Only the abbreviated
+    SHA, the time and the author name of compact entries are known"""
+    if not COMPACT_CONTENT_PATTERN.match(entry.partition("\n")[0]):
+        commit_msg = tuple(entry.split("\n", 3))
+        return ([commit_msg] if len(commit_msg) == 4 and SHA_PATTERN.match(commit_msg[0]) else []), None
+    commit_msgs = []
+    rolled_up = None
+    day = author = ""
+    for line in entry.split("\n"):
+        rollup = ROLLUP_PATTERN.match(line)
+        if rollup:
+            rolled_up = int(rollup.group(1)), rollup.group(2), rollup.group(3)
+        elif line.startswith(AUTHOR_MARK):
+            author = line[len(AUTHOR_MARK):]
+        elif COMPACT_COMMIT_PATTERN.match(line):
+            sha, time, message = line.split(" ", 2)
+            commit_msgs.append((sha, f"{day}T{time}", author, message))
+        else:
+            day = line
+    return commit_msgs, rolled_up
+
+
+def is_content(line: str) -> bool:
+    return bool(SHA_PATTERN.match(line) or COMPACT_CONTENT_PATTERN.match(line))
+
+
+def fair_shares(sizes: List[int], budget: int) -> List[int]:
+    """Max-min fair split of the budget: sizes below an equal share are kept, the rest is split among the bigger ones"""
+    budget = max(budget, 0)
+    if sum(sizes) <= budget:
+        return list(sizes)
+    low, high = 0, max(sizes)
+    while low < high:
+        level = (low + high + 1) // 2
+        if sum(min(size, level) for size in sizes) <= budget:
+            low = level
+        else:
+            high = level - 1
+    shares = [min(size, low) for size in sizes]
+    # What is left after rounding goes to the first sections, so shares don't change when their sizes do
+    leftover = budget - sum(shares)
+    for index, size in enumerate(sizes):
+        if leftover and size > low:
+            shares[index] += 1
+            leftover -= 1
+    return shares
+
+
+class EvidenceSection:
+    """Evidence of one remote: a header line with the remote URL followed by its commit entries"""
+    header: str
+    entries: List[str]
+
+    def __init__(self, header: str, entries: List[str]):
+        self.header = header
+        self.entries = entries
+
+    @staticmethod
+    def parse(text: str):
+        entries = text.split(COMMIT_SEPARATOR)
+        first_line, newline, rest = entries[0].partition("\n")
+        if newline and not is_content(first_line):
+            header = first_line + newline
+            entries[0] = rest
+        else:
+            header = ""
+        return EvidenceSection(header, entries)
+
+    def body_size(self) -> int:
+        return sum(map(len, self.entries)) + len(COMMIT_SEPARATOR) * max(len(self.entries) - 1, 0)
+
+    def append(self, commit_msgs: List[Tuple[str, str, str, str]], compact: bool = False, cap: int = None) -> None:
+        """Appends the commits, stopping once the body is over cap characters, as the rest would be cut anyway"""
+        size = self.body_size()
+        separator = len(COMMIT_SEPARATOR) if self.entries else 0
+        if compact:
+            if self.entries and commit_msgs:
+                rest, newline, last_line = self.entries[-1].rpartition("\n")
+                rollup = ROLLUP_PATTERN.match(last_line)
+                if rollup:
+                    # The section was already full, the commits join the range of its rollup line
+                    count, first, _ = rollup.groups()
+                    self.entries[-1] = rest + newline + format_rollup(int(count) + len(commit_msgs), first,
+                                                                      commit_msgs[-1][0])
+                    return
+            self.entries.append(format_compact_commits(commit_msgs, None if cap is None else cap - size - separator))
+            return
+        for commit_msg in commit_msgs:
+            if cap is not None and size > cap:
+                break
+            entry = format_commit(commit_msg)
+            self.entries.append(entry)
+            size += separator + len(entry)
+            separator = len(COMMIT_SEPARATOR)
+
+    def rollups(self) -> Dict[str, str]:
+        """First abbreviated SHA of the rolled up ranges, by their last one"""
+        return {last: first for entry in self.entries if COMPACT_CONTENT_PATTERN.match(entry.partition("\n")[0])
+                for _, first, last in ROLLUP_PATTERN.findall(entry)}
+
+    def shas(self) -> List[str]:
+        shas = []
+        for entry in self.entries:
+            first_line = entry.partition("\n")[0]
+            if COMPACT_CONTENT_PATTERN.match(first_line):
+                shas.extend(COMPACT_COMMIT_PATTERN.findall(entry))
+                for _, first, last in ROLLUP_PATTERN.findall(entry):
+                    shas += [first, last]
+            else:
+                shas.append(first_line)
+        return shas
+
+    def is_compact(self) -> bool:
+        return any(COMPACT_CONTENT_PATTERN.match(entry.partition("\n")[0]) for entry in self.entries)
+
+    def render_compact(self, share: int) -> str:
+        """Entries that fit in share characters, followed by a rollup line of the commits that don't instead of a cut,
+        so next pushes find the rollup line and extend it"""
+        parsed = [parse_entry_commits(entry) for entry in self.entries]
+        # Rollup of the commits after each entry
+        rests = [None] * (len(parsed) + 1)
+        for position in range(len(parsed) - 1, -1, -1):
+            commit_msgs, rolled_up = parsed[position]
+            rests[position] = rollup_of(commit_msgs, join_rollups(rolled_up, rests[position + 1]))
+        body = ""
+        for position, entry in enumerate(self.entries):
+            separator = COMMIT_SEPARATOR if body else ""
+            rest = rests[position + 1]
+            if len(body) + len(separator) + len(entry) + \
+                    (len(COMMIT_SEPARATOR) + len(format_rollup(*rest)) if rest else 0) <= share:
+                body += separator + entry
+                continue
+            commit_msgs, rolled_up = parsed[position]
+            return body + separator + format_compact_commits(commit_msgs, share - len(body) - len(separator),
+                                                             join_rollups(rolled_up, rest))
+        return body
+
+    def render(self, share: int = None) -> str:
+        if share is None or share >= self.body_size():
+            return self.header + COMMIT_SEPARATOR.join(self.entries)
+        if share < len(TRUNCATION_MARK):
+            return self.header
+        if self.is_compact():
+            return self.header + self.render_compact(share)
+        # Only the entries that are shown are joined
+        body = ""
+        for entry in self.entries:
+            body += (COMMIT_SEPARATOR if body else "") + entry
+            if len(body) >= share:
+                break
+        return self.header + body[:share - len(TRUNCATION_MARK)] + TRUNCATION_MARK
+
+
+class EvidenceDocument:
+    """Automatic evidence description, parsed once into sections indexed by remote URL and rendered once.
+
+    With a max_size, section bodies that don't fit get a fair share of the characters left by the preamble and the
+    section headers, so one busy remote doesn't crowd out the evidence of the others.
+    """
+    # Text before the first section, None if the description starts with a section
+    preamble: Optional[str]
+    sections: List[EvidenceSection]
+    index: Dict[str, EvidenceSection]
+    # Commits already registered in any section, so overlapping pushes don't repeat them
+    shas: Set[str]
+    # Only the ends of the rolled up ranges are written, this maps their last commit to the first one
+    rollups: Dict[str, str]
+    max_size: Optional[int]
+
+    def __init__(self, preamble: Optional[str] = None, sections: List[EvidenceSection] = None, max_size: int = None):
+        self.preamble = preamble
+        self.sections = sections or []
+        self.max_size = max_size
+        self.index = {}
+        self.shas = set()
+        self.rollups = {}
+        for section in self.sections:
+            self.index.setdefault(section.header, section)
+            self.shas.update(section.shas())
+            self.rollups.update(section.rollups())
+
+    @staticmethod
+    def parse(description: str, max_size: int = None):
+        # A leading new line makes the first section marker look like the others
+        parts = ("\n" + description).split(SECTION_SEPARATOR)
+        preamble = parts[0][1:] if parts[0] else None
+        return EvidenceDocument(preamble, [EvidenceSection.parse(part) for part in parts[1:]], max_size)
+
+    def find_section(self, remote_url: str) -> Optional[EvidenceSection]:
+        section = self.index.get(remote_url)
+        if section is None and remote_url:
+            # Sections written by hand or by old versions may not start with the remote URL
+            section = next((s for s in self.sections if remote_url in s.render()), None)
+        return section
+
+    def add_section(self, remote_url: str) -> EvidenceSection:
+        section = EvidenceSection(remote_url, [])
+        self.sections.append(section)
+        self.index.setdefault(remote_url, section)
+        return section
+
+    def is_registered(self, sha: str) -> bool:
+        return sha in self.shas or sha[:SHORT_SHA_LENGTH] in self.shas
+
+    def rolled_up_commits(self, commit_msgs: List[Tuple[str, str, str, str]]) -> Set[str]:
+        """Commits pushed again that are inside a rolled up range, walking the oldest first commits back from its end"""
+        rolled_up = set()
+        first = None
+        for commit_msg in reversed(commit_msgs):
+            short_sha = commit_msg[0][:SHORT_SHA_LENGTH]
+            if first is None:
+                first = self.rollups.get(short_sha)
+            if first is not None:
+                rolled_up.add(commit_msg[0])
+                if short_sha == first:
+                    first = None
+        return rolled_up
+
+    def add_commits(self, remote_url: str, commit_msgs: List[Tuple[str, str, str, str]],
+                    compact: bool = False) -> List[Tuple[str, str, str, str]]:
+        """Adds the commits not registered yet to the section of the remote, and returns them"""
+        new_commits = []
+        rolled_up = self.rolled_up_commits(commit_msgs) if self.rollups else set()
+        for commit_msg in commit_msgs:
+            if not self.is_registered(commit_msg[0]) and commit_msg[0] not in rolled_up:
+                self.shas.add(commit_msg[0])
+                new_commits.append(commit_msg)
+        if not new_commits and self.sections:
+            # Everything was already registered, the description is left untouched
+            return new_commits
+        section = self.find_section(remote_url)
+        if section is None:
+            section = self.add_section(remote_url)
+        section.append(new_commits, compact, self.section_cap(section))
+        return new_commits
+
+    def fixed_size(self) -> int:
+        head = 0 if self.preamble is None else len(self.preamble) + 1
+        return head + sum(len(SECTION_SEPARATOR) + len(section.header) for section in self.sections) - 1
+
+    def section_cap(self, section: EvidenceSection) -> Optional[int]:
+        """Characters the body of the section can take whatever its size, None if there is no max size"""
+        if self.max_size is None:
+            return None
+        sizes = [self.max_size if s is section else s.body_size() for s in self.sections]
+        return fair_shares(sizes, self.max_size - self.fixed_size())[self.sections.index(section)]
+
+    def render(self) -> str:
+        head = "" if self.preamble is None else "\n" + self.preamble
+        sizes = [section.body_size() for section in self.sections]
+        if self.max_size is None or self.fixed_size() + sum(sizes) <= self.max_size:
+            sections = [section.render() for section in self.sections]
+        else:
+            shares = fair_shares(sizes, self.max_size - self.fixed_size())
+            sections = [section.render(share) for section, share in zip(self.sections, shares)]
+        return SECTION_SEPARATOR.join([head] + sections)[1:]
@@ -76,3 +76,13 @@ class InvalidSetupConfigurationError(Exception):
     def __str__(self):
         return f"Invalid setup configuration.\n" \
             f"usage: TNTGitHook [-h] --setup --organization ORGANIZATION --project PROJECT --role ROLE"
+
+
+class GitLogError(Exception):
+    def __str__(self):
+        return "Unable to retrieve git log information. Is this a git repository?"
+
+
+class UnknownAuthorError(Exception):
+    def __str__(self):
+        return "Unable to know which commits are yours. Set 'git config user.email' or use --author"
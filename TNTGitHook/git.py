@@ -0,0 +1,128 @@
+"""Native pre-push hook: reads the refs being pushed from git and logs their commits, with a git walk for the updated
+refs and another one for the new ones.
+
+Replaces the tnt_git_hook.sh pipeline, so a push doesn't fork date, for-each-ref, grep, ls-remote and friends, and the
+commits are streamed from git instead of being written to a temporary file.
+"""
+import subprocess
+from typing import Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from TNTGitHook import tracing
+from TNTGitHook.hook import COMMIT_LOG_BUDGET_BYTES, parse_commit_lines, print_log_truncation
+
+ZERO_SHA: str = "0" * 40
+BRANCH_PREFIX: str = "refs/heads/"
+LOG_FORMAT: str = "%H;%aI;%an <%ae>;%f"
+
+
+class PushRef(NamedTuple):
+    local_ref: str
+    local_sha: str
+    remote_ref: str
+    remote_sha: str
+
+
+def read_push_refs(stdin: TextIO) -> List[PushRef]:
+    # Each line is "<local ref> <local sha> <remote ref> <remote sha>", see https://git-scm.com/docs/githooks#_pre_push
+    return [PushRef(*line.split()) for line in stdin if len(line.split()) == 4]
+
+
+def log_args() -> List[str]:
+    # The revisions are written to stdin, so the command line doesn't grow with the number of refs or branches
+    return ["git", "log", "--reverse", "--topo-order", f"--pretty=tformat:{LOG_FORMAT}", "--stdin"]
+
+
+def tag_args() -> List[str]:
+    return ["git", "log", "--no-walk", "--no-patch", "--decorate-refs=refs/tags/", "--format=%H;%aI;%an <%ae>;%D",
+            "--stdin"]
+
+
+def other_branches(push_refs: List[PushRef]) -> Iterator[str]:
+    """Local branches not being pushed, streamed from git as there may be thousands of them"""
+    pushed = {push_ref.local_ref for push_ref in push_refs}
+    with subprocess.Popen(["git", "for-each-ref", "--format=%(refname)", BRANCH_PREFIX], stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL, text=True) as process:
+        for line in process.stdout:
+            ref = line.rstrip("\n")
+            if ref not in pushed:
+                yield ref
+
+
+def revisions(push_refs: List[PushRef]) -> Iterator[str]:
+    """Revisions of a single walk over the updated refs, so commits shared between them are logged once"""
+    for push_ref in push_refs:
+        yield push_ref.local_sha
+        yield f"^{push_ref.remote_sha}"
+
+
+def new_ref_revisions(new_refs: List[PushRef], updated_refs: List[PushRef]) -> Iterator[str]:
+    """Revisions of the walk over the new remote branches: only the commits not reachable from the other local
+    branches, nor already logged for the updated refs"""
+    for push_ref in new_refs:
+        yield push_ref.local_sha
+    for push_ref in updated_refs:
+        yield f"^{push_ref.local_sha}"
+    for ref in other_branches(new_refs):
+        yield f"^{ref}"
+
+
+def run_git(args: List[str], budget: int, revs: Iterable[str] = ()) -> Tuple[int, list, int]:
+    """Return code, commits parsed within the budget (oldest first) and total number of commits"""
+    with tracing.span(" ".join(args[:2])), subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as process:
+        # git reads the whole stdin before writing any commit
+        try:
+            for rev in revs:
+                process.stdin.write(f"{rev}\n".encode())
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        commit_msgs = parse_commit_lines(process.stdout, budget)
+        # Past the budget only the commits are counted
+        total = len(commit_msgs) + sum(chunk.count(b"\n") for chunk in iter(lambda: process.stdout.read(1 << 16), b""))
+    return process.returncode, commit_msgs, total
+
+
+def tag_commits(push_refs: List[PushRef]) -> List[Tuple[str, str, str, str]]:
+    """The pushed commits with their tags as message, the evidence of a push with only tags"""
+    returncode, commit_msgs, _ = run_git(tag_args(), COMMIT_LOG_BUDGET_BYTES,
+                                         (push_ref.local_sha for push_ref in push_refs))
+    if returncode != 0:
+        return []
+    tagged = []
+    for sha, commit_date, author, decorations in commit_msgs:
+        if decorations:
+            tags = sorted(decoration[len("tag: "):] for decoration in decorations.split(", "))
+            tagged.append((sha, commit_date, author, "tag: " + " ".join(tags)))
+    return tagged
+
+
+def pushed_commits(stdin: TextIO, budget: int = COMMIT_LOG_BUDGET_BYTES) -> Optional[List[Tuple[str, str, str, str]]]:
+    """Commits of all the pushed refs to register together, None if there is nothing to register"""
+    # Remote refs being deleted push no commits
+    push_refs = [push_ref for push_ref in read_push_refs(stdin) if push_ref.local_sha != ZERO_SHA]
+    if not push_refs:
+        return None
+    updated_refs = [push_ref for push_ref in push_refs if push_ref.remote_sha != ZERO_SHA]
+    new_refs = [push_ref for push_ref in push_refs if push_ref.remote_sha == ZERO_SHA]
+    # The other local branches only exclude commits from the new refs, the updated ones push their whole range
+    walks = ([revisions(updated_refs)] if updated_refs else []) + \
+            ([new_ref_revisions(new_refs, updated_refs)] if new_refs else [])
+    commit_msgs = []
+    total = 0
+    for revs in walks:
+        used = sum(len(";".join(commit_msg)) + 1 for commit_msg in commit_msgs)
+        returncode, walk_msgs, walk_total = run_git(log_args(), max(0, budget - used), revs)
+        if returncode != 0:
+            # Do nothing on error, just inform and go ahead with the push operation (i.e. conflicts)
+            print("Unable to retrieve git log information, will not create evidence on TNT but push continues")
+            return None
+        if used > budget:
+            walk_msgs = []
+        commit_msgs += walk_msgs
+        total += walk_total
+    if total > len(commit_msgs):
+        print_log_truncation(total, commit_msgs)
+    if not commit_msgs:
+        # If there aren't commits to push, checks if they are tagged commits and then generate a custom evidence
+        commit_msgs = tag_commits(push_refs)
+    return commit_msgs or None
@@ -5,21 +5,20 @@ import json
 import os
 import pkgutil
 import stat
-from datetime import timezone
-from functools import reduce
+from contextlib import closing
+from datetime import date, timezone
 from pathlib import Path
-from typing import List, Tuple
-
-import keyring
-import requests
-from keyring.errors import PasswordDeleteError
-from requests import Response
+from typing import Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
+from TNTGitHook import mirror, tracing
+from TNTGitHook.credentials import retrieve_credentials
 from TNTGitHook.entities import *
-from TNTGitHook.exceptions import NoCredentialsError, AuthError, NotFoundError, NetworkError, \
+from TNTGitHook.evidence import EvidenceDocument, EVIDENCE_PREFIX, TRUNCATION_MARK
+from TNTGitHook.exceptions import NotFoundError, NetworkError, \
     CommitMessagesFileNotFoundError, CommitMessageFormatError, CommitMessagesFileFormatError, \
     InvalidSetupConfigurationError
-from TNTGitHook.utils import DateTimeEncoder, first, to_class, formatRemoteURL, hook_installation_path
+from TNTGitHook.utils import first, formatRemoteURL, hook_installation_path, \
+    reverse_lines, count_lines
 
 OLD_TNT_GIT_HOOK_SCRIPT_PATH = "/usr/local/bin/tnt_git_hook"
 
@@ -27,6 +26,15 @@ NAME: str = "TNTGitHook"
 DEFAULT_CONFIG_FILE_PATH: str = f".git/hooks/{NAME}Config.json"
 # In fact is 2048, but as we are going to substitute the last characters for \n... we need 5 empty at the end
 TNT_DESCRIPTION_MAX_SIZE = 2043
+# Bytes of the git log that are parsed. Only the commits that fit in the description are needed, but some of them may be
+# already registered, and compact evidences take less room than the log
+COMMIT_LOG_BUDGET_BYTES = 16 * TNT_DESCRIPTION_MAX_SIZE
+
+if TYPE_CHECKING:
+    # requests is imported when first used, keeping them out of the hook cold start
+    from requests import Response
+    from TNTGitHook.tokens import TokenManager
+    from TNTGitHook.transport import Transport
 
 
 
@@ -34,35 +42,91 @@ class Config:
     baseURL: str
     authURL: str
     basic_auth: str
+    debug: bool = False
     timeout: int = 5
+    retries: int = 2
+    _transport: Transport = None
+    _token_manager: TokenManager = None
 
-    def __init__(self, baseURL: str, authURL: str, basic_auth: str):
+    def __init__(self, baseURL: str, authURL: str, basic_auth: str, debug: bool = False):
         self.baseURL = baseURL
         self.authURL = authURL
         self.basic_auth = basic_auth
+        self.debug = debug
 
     @staticmethod
     def config(debug: bool) -> Config:
         if debug:
             return Config(baseURL="http://localhost:8080/api-hook/",
                           authURL="http://localhost:8080/oauth/token",
-                          basic_auth="dG50LWNsaWVudDpob2xh")
+                          basic_auth="dG50LWNsaWVudDpob2xh",
+                          debug=True)
         else:
             return Config(baseURL="https://tnt.autentia.com/tnt-api/api-hook/",
                           authURL="https://tnt.autentia.com/tntconcept-api-rest-kotlin/oauth/token",
                           basic_auth="dG50LWNsaWVudDpDbGllbnQtVE5ULXYx")
 
+    @property
+    def transport(self) -> Transport:
+        if self._transport is None:
+            from TNTGitHook.transport import Transport
+            self._transport = Transport(self)
+        return self._transport
+
+    def has_transport(self) -> bool:
+        return self._transport is not None
+
+    @property
+    def token_manager(self) -> TokenManager:
+        if self._token_manager is None:
+            from TNTGitHook.tokens import TokenManager
+            self._token_manager = TokenManager(self)
+        return self._token_manager
+
 
 class PrjConfig:
     organization: str
     project: str
     role: str
+    # Catalog IDs resolved on setup, so pushes don't need to look them up again
+    organization_id: int = None
+    project_id: int = None
+    role_id: int = None
+    catalog_fingerprint: str = None
     ignore_errors: bool = False
     timeout: int = 5
+    # Hand the push to a detached worker instead of waiting for TNT
+    async_submission: bool = False
+    # Start a resident agent that handles next pushes without a new interpreter
+    agent: bool = False
+    agent_idle_minutes: int = 30
+    # Abbreviated evidences, so pushes with many commits fit in the activity description
+    compact_evidences: bool = False
 
     @staticmethod
     def activity_prefix() -> str:
-        return "###Autocreated evidence###\n(DO NOT DELETE)"
+        return EVIDENCE_PREFIX
+
+    def has_pinned_ids(self) -> bool:
+        # Names edited by hand after the IDs were pinned don't match the fingerprint, so they are resolved again
+        return self.role_id is not None and self.catalog_fingerprint == self.names_fingerprint()
+
+    def names_fingerprint(self) -> str:
+        return fingerprint(self.organization_id, self.organization, self.project_id, self.project, self.role_id,
+                           self.role)
+
+    def pin(self, organization: Organization, project: Project, role: Role):
+        self.organization_id = organization.id
+        self.project_id = project.id
+        self.role_id = role.id
+        self.catalog_fingerprint = catalog_fingerprint(organization, project, role)
+
+    def pinned_ids(self) -> dict:
+        return {"organization_id": self.organization_id,
+                "project_id": self.project_id,
+                "role_id": self.role_id,
+                "catalog_fingerprint": self.catalog_fingerprint}
+
 
 def setup_config(config: Config, selected_organization: str, selected_project: str, selected_role: str):
     setup_config_with_path(config, selected_organization, selected_project, selected_role, DEFAULT_CONFIG_FILE_PATH)
@@ -80,11 +144,13 @@ def setup_config_with_path(config: Config, selected_organization: str, selected_
         prj_config.organization = organization.name
         prj_config.project = project.name
         prj_config.role = role.name
+        prj_config.pin(organization, project, role)
 
         if is_valid_configuration(selected_organization, selected_project, selected_role):
             with open(path, "w") as f:
                 f.write(json.dumps(prj_config.__dict__, sort_keys=True, indent=4))
         else:
+            write_pinned_ids(path, prj_config)
             print(f"\nUsing project configuration found in {path}:\n"
                   f"Organization: {prj_config_input[0]}\n"
                   f"Project: {prj_config_input[1]}\n"
@@ -121,6 +187,54 @@ def is_valid_file_configuration(config_file):
     return "organization" in config_file and "project" in config_file and "role" in config_file
 
 
+def fingerprint(organization_id: int, organization: str, project_id: int, project: str, role_id: int, role: str) -> str:
+    catalog = f"{organization_id}:{organization}/{project_id}:{project}/{role_id}:{role}"
+    return hashlib.sha1(catalog.encode('utf8')).hexdigest()
+
+
+def catalog_fingerprint(organization: Organization, project: Project, role: Role) -> str:
+    return fingerprint(organization.id, organization.name, project.id, project.name, role.id, role.name)
+
+
+def write_pinned_ids(path: str, prj_config: PrjConfig):
+    with open(path) as f:
+        prj_config_file = json.load(f)
+    prj_config_file.update(prj_config.pinned_ids())
+    with open(path, "w") as f:
+        f.write(json.dumps(prj_config_file, sort_keys=True, indent=4))
+
+
+def resolve_catalog(config: Config, prj_config: PrjConfig) -> Tuple[Organization, Project, Role]:
+    organization = check_organization_exists(config, prj_config.organization)
+    project = check_project_exists(config, organization, prj_config.project)
+    role = check_role_exists(config, project, prj_config.role)
+    return organization, project, role
+
+
+def resolve_role_id(config: Config, prj_config: PrjConfig, config_path: str = None) -> int:
+    if not prj_config.has_pinned_ids():
+        with tracing.span("resolve role"):
+            revalidate_pinned_ids(config, prj_config, config_path)
+    return prj_config.role_id
+
+
+def revalidate_pinned_ids(config: Config, prj_config: PrjConfig, config_path: str = None) -> int:
+    organization, project, role = resolve_catalog(config, prj_config)
+    fingerprint = catalog_fingerprint(organization, project, role)
+    if fingerprint != prj_config.catalog_fingerprint:
+        prj_config.pin(organization, project, role)
+        if config_path is not None:
+            try:
+                write_pinned_ids(config_path, prj_config)
+            except OSError as error:
+                print(f"Unable to store catalog IDs in {config_path}: {error}")
+    return prj_config.role_id
+
+
+def is_revalidation_needed(response: Response) -> bool:
+    return 400 <= response.status_code < 500
+
+
 def write_hook_script():
     hook_script = pkgutil.get_data('TNTGitHook', 'misc/tnt_git_hook.sh').decode('utf8')
     try:
@@ -176,31 +290,53 @@ def read_commit_msgs(file: str):
 def create_activity(config: Config,
                     prj_config: PrjConfig,
                     commit_msgs: [Tuple[str, str, datetime, str]],
-                    remote: str):
-    organization_name = prj_config.organization
+                    remote: str,
+                    config_path: str = None,
+                    day: date = None,
+                    credentials: Tuple[str, str] = None) -> Optional[Response]:
+    return create_merged_activity(config, prj_config, [(remote, commit_msgs)], config_path, day, credentials)
+
+
+def create_merged_activity(config: Config,
+                           prj_config: PrjConfig,
+                           remote_commits: List[Tuple[str, List[Tuple[str, str, str, str]]]],
+                           config_path: str = None,
+                           day: date = None,
+                           credentials: Tuple[str, str] = None) -> Optional[Response]:
+    """Registers the commits of several remotes in the activity of the day with a single update"""
     project_name = prj_config.project
     role_name = prj_config.role
     billable = False
-
-    username, password = retrieve_keychain_credentials()
-
-    organization = check_organization_exists(config, organization_name)
-
-    project = check_project_exists(config, organization, project_name)
-
-    role = check_role_exists(config, project, role_name)
-
-    now = datetime.now()
-    now = now.strftime("%Y-%m-%d")
-    response: Response = requests.get(config.baseURL + "activity/",
-                                      params={"startDate": str(now), "endDate": str(now), "user": username},
-                                      headers={},
-                                      timeout=config.timeout)
-    activities = parse_activities(response.text)
-    existing_activity = find_automatic_evidence(prj_config, activities)
-    info: (str, datetime, int) = generate_info(commit_msgs,
-                                               existing_activity,
-                                               remote_url=remote)
+    day = day or date.today()
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Role resolution doesn't depend on the credentials, so it runs (or, when the IDs are pinned, the connection is
+    # opened) while the keyring is accessed. Today's activities only depend on the username.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if prj_config.has_pinned_ids():
+            executor.submit(config.transport.warm_up, config.baseURL)
+        role_future = executor.submit(resolve_role_id, config, prj_config, config_path)
+
+        with tracing.span("credentials"):
+            username, password = credentials or retrieve_keychain_credentials()
+        mirror_key = mirror.entry_key(day, prj_config, username)
+        with tracing.span("fetch activity"):
+            existing_activity = fetch_automatic_evidence(config, prj_config, username, day, mirror_key)
+        with tracing.span("wait role"):
+            role_id = role_future.result()
+
+    with tracing.span("generate evidence"):
+        info: (str, datetime, int) = merge_evidence(remote_commits,
+                                                    existing_activity,
+                                                    day=day,
+                                                    compact=prj_config.compact_evidences)
+    if existing_activity is not None and info[2] == 0:
+        # Every commit is already registered, sending the same description again is pointless
+        print("Activity for " + project_name + " - " + role_name + " is already up to date")
+        return None
+    if existing_activity is not None and info[0] == existing_activity.description:
+        print(f"The activity description is full, {info[2]} new commits don't fit in the evidence")
 
     new_activity: CreateActivityRequest = CreateActivityRequest()
     if existing_activity is not None:
@@ -209,25 +345,123 @@ def create_activity(config: Config,
     new_activity.startDate = info[1]
     new_activity.duration = 0
     new_activity.billable = billable
-    new_activity.projectRoleId = role.id
+    new_activity.projectRoleId = role_id
     new_activity.userName = username
 
-    json_str = json.dumps(new_activity.__dict__, cls=DateTimeEncoder)
-    data = json.loads(json_str)
-
-    response: Response = requests.post(config.baseURL + "activity",
-                                       headers={},
-                                       json=data,
-                                       timeout=config.timeout)
+    with tracing.span("post activity"):
+        response = post_activity(config, new_activity)
+    if is_revalidation_needed(response):
+        # Pinned IDs may be stale (i.e. role renamed or removed in TNT), so resolve them again and retry once. With the
+        # same role the request itself is wrong, and sending it again would be rejected too
+        role_id = revalidate_pinned_ids(config, prj_config, config_path)
+        if role_id != new_activity.projectRoleId:
+            new_activity.projectRoleId = role_id
+            response = post_activity(config, new_activity)
     if response.status_code == 200:
         print("Successfully created activity for " + project_name + " - " + role_name)
+        remember_activity(mirror_key, new_activity, response)
+    return response
+
+
+def fetch_automatic_evidence(config: Config, prj_config: PrjConfig, username: str, day: date,
+                             mirror_key: str) -> Optional[Activity]:
+    """The automatic evidence of the day, requesting only the activity registered by the last push when possible"""
+    entry = mirror.load(mirror_key)
+    item_status = None
+    if entry is not None and mirror.is_item_endpoint_supported():
+        item_status, activity = fetch_mirrored_activity(config, prj_config, day, entry, mirror_key)
+        if activity is not None:
+            return activity
+
+    # No activity registered by this hook yet, or it has been changed or deleted: look for it in the day activities
+    activity = fetch_day_evidence(config, prj_config, username, day)
+    if activity is None:
+        mirror.forget(mirror_key)
+        return None
+    if entry is not None and entry["id"] == activity.id and item_status not in (None, 200):
+        # The activity exists but couldn't be requested alone, so the API doesn't support it
+        mirror.disable_item_endpoint()
+    mirror.store(mirror_key, activity.id, activity.description)
+    return activity
+
+
+def fetch_mirrored_activity(config: Config, prj_config: PrjConfig, day: date, entry: dict,
+                            mirror_key: str) -> Tuple[int, Optional[Activity]]:
+    headers = {"If-None-Match": entry["etag"]} if entry.get("etag") else {}
+    response: Response = config.transport.get(f"{config.baseURL}activity/{entry['id']}", headers=headers)
+    if response.status_code == 304:
+        return response.status_code, Activity().with_id(entry["id"]).with_description(entry["description"])
+    if response.status_code != 200:
+        return response.status_code, None
+    try:
+        body = json.loads(response.content)
+    except ValueError:
+        return response.status_code, None
+    if not isinstance(body, dict):
+        return response.status_code, None
+    activity = decode_activity(body)
+    # The activity may have been moved to another day or role, or its evidence removed by the user
+    if not str(getattr(activity, "startDate", "")).startswith(day.isoformat()) \
+            or find_automatic_evidence(prj_config, [activity]) is None:
+        return response.status_code, None
+    mirror.store(mirror_key, activity.id, activity.description, response.headers.get("ETag"))
+    return response.status_code, activity
+
+
+def remember_activity(mirror_key: str, new_activity: CreateActivityRequest, response: Response):
+    activity_id = getattr(new_activity, "id", None)
+    if activity_id is None:
+        try:
+            activity_id = response.json().get("id")
+        except (ValueError, AttributeError):
+            activity_id = None
+    if activity_id is None:
+        # Found again in the day activities on next push
+        mirror.forget(mirror_key)
+    else:
+        mirror.store(mirror_key, activity_id, new_activity.description)
+
+
+def fetch_day_evidence(config: Config, prj_config: PrjConfig, username: str, day: date) -> Optional[Activity]:
+    now = day.strftime("%Y-%m-%d")
+    response: Response = config.transport.get(config.baseURL + "activity/",
+                                              params={"startDate": str(now), "endDate": str(now), "user": username})
+    if response.status_code != 200:
+        # An error body is not an empty day, looking further would register a duplicate activity
+        raise NetworkError(response.status_code)
+    with tracing.span("parse activities", size=len(response.content)):
+        return find_automatic_evidence_in(prj_config, response.content)
+
+
+def post_activity(config: Config, new_activity: CreateActivityRequest) -> Response:
+    return config.transport.post(config.baseURL + "activity", json=new_activity.to_json())
+
+
+def decode_activity(obj: dict) -> Activity:
+    """Activity with its organization, project and role decoded as their own entities"""
+    return Activity.from_json(obj)
+
+
+def iter_activities(response_body) -> Iterator[dict]:
+    """Activities of every day of the response, in order, as decoded JSON objects"""
+    for day in json.loads(response_body):
+        yield from day.get("activities") or ()
 
 
 def parse_activities(response_body) -> List[Activity]:
-    activities_response: List[ActivitiesResponse]
-    activities_response = json.loads(response_body, object_hook=lambda x: to_class(x, cls=ActivitiesResponse))
-    activities = reduce(lambda r, a: r + a.activities, activities_response, [])
-    return activities
+    return [decode_activity(activity) for activity in iter_activities(response_body)]
+
+
+def find_automatic_evidence_in(prjConfig: PrjConfig, response_body) -> Optional[Activity]:
+    """The first automatic evidence of the response, only decoding the activities with the evidence prefix"""
+    prefix = prjConfig.activity_prefix()
+    for obj in iter_activities(response_body):
+        description = obj.get("description")
+        if isinstance(description, str) and prefix in description:
+            activity = find_automatic_evidence(prjConfig, [decode_activity(obj)])
+            if activity is not None:
+                return activity
+    return None
 
 
 def find_automatic_evidence(prjConfig: PrjConfig, activities: List[Activity]) -> Activity:
@@ -241,48 +475,19 @@ def find_automatic_evidence(prjConfig: PrjConfig, activities: List[Activity]) ->
 
 
 def generate_request_headers(config):
-    username, password = retrieve_keychain_credentials()
-    headers = {"Authorization": "Basic " + config.basic_auth}
-    payload = {"grant_type": "password",
-               "username": username,
-               "password": password}
-    token_response = requests.post(config.authURL, headers=headers, data=payload, timeout=config.timeout)
-    if token_response.status_code != 200:
-        raise AuthError()
-    access_token = token_response.json()["access_token"]
-    headers = {"Authorization": "Bearer " + access_token}
-    return headers
+    return config.token_manager.headers()
 
 
 def retrieve_keychain_credentials():
-    credentials = keyring.get_password(f"com.autentia.{NAME}", "credentials")
-    # TODO: backwards compatibility. Leave only else code when all users migrated to new credentials management
-    if not credentials:
-        username = keyring.get_password(f"com.autentia.{NAME}", "username")
-        password = keyring.get_password(f"com.autentia.{NAME}", "password")
-        keyring.set_password(f"com.autentia.{NAME}", "credentials", f"{username}:{password}")
-    else:
-        tokens = credentials.split(sep=":", maxsplit=2)
-        username = tokens[0]
-        password = tokens[1]
-    try:
-        keyring.delete_password(f"com.autentia.{NAME}", "username")
-        keyring.delete_password(f"com.autentia.{NAME}", "password")
-    except PasswordDeleteError:
-        # We have already deleted old values, no true error so we can continue
-        pass
-    if not username or not password:
-        raise NoCredentialsError()
-    return username, password
+    return retrieve_credentials()
 
 
 def check_role_exists(config, project, role_name):
-    response: Response = requests.get(config.baseURL + "project/" + str(project.id) + "/role",
-                                      headers={}, timeout=config.timeout)
+    response: Response = config.transport.get(config.baseURL + "project/" + str(project.id) + "/role")
     response.encoding = 'utf-8'
     if response.status_code != 200:
         raise NetworkError()
-    roles: List[Role] = json.loads(response.text, object_hook=lambda x: to_class(x, cls=Role))
+    roles: List[Role] = [Role.from_json(role) for role in json.loads(response.text)]
     role = first(lambda r: r.name == role_name, roles)
     if not role:
         raise NotFoundError("Role", role_name)
@@ -290,12 +495,11 @@ def check_role_exists(config, project, role_name):
 
 
 def check_project_exists(config, organization, project_name):
-    response: Response = requests.get(config.baseURL + "organization/" + str(organization.id) + "/project",
-                                      headers={}, timeout=config.timeout)
+    response: Response = config.transport.get(config.baseURL + "organization/" + str(organization.id) + "/project")
     response.encoding = 'utf-8'
     if response.status_code != 200:
         raise NetworkError()
-    projects: List[Project] = json.loads(response.text, object_hook=lambda x: to_class(x, cls=Project))
+    projects: List[Project] = [Project.from_json(project) for project in json.loads(response.text)]
     project = first(lambda p: p.name == project_name, projects)
     if not project:
         raise NotFoundError("Project", project_name)
@@ -303,35 +507,65 @@ def check_project_exists(config, organization, project_name):
 
 
 def check_organization_exists(config, organization_name):
-    response: Response = requests.get(config.baseURL + "organization", headers={}, timeout=config.timeout)
+    response: Response = config.transport.get(config.baseURL + "organization")
     response.encoding = 'utf-8'
     if response.status_code != 200:
         raise NetworkError()
-    organizations: List[Organization] = json.loads(response.text, object_hook=lambda x: to_class(x, cls=Organization))
+    organizations: List[Organization] = [Organization.from_json(organization)
+                                         for organization in json.loads(response.text)]
     organization = first(lambda o: o.name == organization_name, organizations)
     if not organization:
         raise NotFoundError("Organization", organization_name)
     return organization
 
 
-def parse_commit_messages(commit_msgs: str):
-    def msg_parser(msg: str) -> Tuple[str, str, str, str]:
-        items = msg.split(";")
-        if len(items) != 4:
-            raise CommitMessageFormatError()
-        return items[0], items[1], items[2], items[3]
+def parse_commit_message(msg: str) -> Tuple[str, str, str, str]:
+    items = msg.split(";")
+    if len(items) != 4:
+        raise CommitMessageFormatError()
+    return items[0], items[1], items[2], items[3]
+
 
+def parse_commit_messages(commit_msgs: str):
     lines = filter(None, commit_msgs.split("\n")[::-1])
-    msgs: [Tuple[str, str, datetime, str]] = list(map(msg_parser, lines))
+    msgs: [Tuple[str, str, datetime, str]] = list(map(parse_commit_message, lines))
     return msgs
 
 
-def parse_commit_messages_from_file(commit_msgs_file: str):
-    commit_msgs: str = read_commit_msgs(commit_msgs_file)
+def parse_commit_lines(lines: Iterable[bytes], budget: int) -> List[Tuple[str, str, str, str]]:
+    """Parses git log lines until the budget is used up, leaving the rest of them in the iterator"""
+    msgs: [Tuple[str, str, datetime, str]] = []
+    size = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        msgs.append(parse_commit_message(line.decode("utf8")))
+        size += len(line) + 1
+        if size > budget:
+            break
+    return msgs
+
+
+def print_log_truncation(total: int, msgs: List[Tuple[str, str, str, str]]):
+    print(f"{total} commits pushed, only the oldest {len(msgs)} are registered")
+
+
+def parse_commit_messages_from_file(commit_msgs_file: str, budget: int = COMMIT_LOG_BUDGET_BYTES):
+    """Parses the oldest commits of the git log file that fit in the budget, reading it backwards from its end"""
     try:
-        return parse_commit_messages(commit_msgs)
+        # Closed on errors too, so the file and its memory map are released right away
+        with closing(reverse_lines(commit_msgs_file)) as lines:
+            msgs = parse_commit_lines(lines, budget)
+            if next(lines, None) is not None:
+                # The first push of a big branch can have hundreds of thousands of commits, only the count is needed
+                print_log_truncation(count_lines(commit_msgs_file), msgs)
+    except FileNotFoundError:
+        raise CommitMessagesFileNotFoundError(commit_msgs_file,
+                                              os.access(os.path.dirname(commit_msgs_file), os.W_OK))
     except Exception:
-        raise CommitMessagesFileFormatError(build_file_info(commit_msgs, commit_msgs_file))
+        raise CommitMessagesFileFormatError(build_file_info(read_commit_msgs(commit_msgs_file), commit_msgs_file))
+    return msgs
 
 
 def build_file_info(commit_msgs, commit_msgs_file):
@@ -349,69 +583,46 @@ def build_file_info(commit_msgs, commit_msgs_file):
 
 def generate_info(commit_msgs: [Tuple[str, str, datetime, str]],
                   existing_activity: Activity = None,
-                  remote_url: str = None) -> (str, datetime):
-    start_date: datetime = datetime.now().replace(hour=5, minute=0, second=0, microsecond=0, tzinfo=None)
-
-    remote_url = "" if remote_url is None else remote_url + "\n"
-    result_str: str = ""
-    remote_url = formatRemoteURL(remote_url)
-    if remote_url is not None and existing_activity is not None:
-        remoteURLIsNew = existing_activity.description.find(remote_url) == -1
-        if remoteURLIsNew:
-            result_str = add_new_evidence(existing_activity, commit_msgs, remote_url)
-        if not remoteURLIsNew:
-            result_str = update_existing_evidence(existing_activity, commit_msgs, remote_url)
-
-    else:
-        result_str = add_evidence_with_no_remote_url(existing_activity, commit_msgs, remote_url)
-
-    # Truncate description gracefully if description buffer overflows
-    result_str = (result_str[:TNT_DESCRIPTION_MAX_SIZE] + '\n...') if len(
-        result_str) > TNT_DESCRIPTION_MAX_SIZE else result_str
-
-    return result_str, start_date
-
-
-def update_existing_evidence(existing_activity, msgs, remote_url):
-    selectedDescriptionPointer: int = 0
-    descriptions = ("\n" + existing_activity.description).split("\n###Autocreated evidence###\n(DO NOT DELETE)\n")
-
-    for description in descriptions:
-        if description.find(remote_url) != -1:
-            break
-        selectedDescriptionPointer += 1
-    result_str = descriptions[selectedDescriptionPointer] + "\n-----\n"
-    result_str += "\n-----\n".join(map(lambda m: "\n".join(m), msgs))
-    descriptions[selectedDescriptionPointer] = result_str
-
-    pointer = 0
-    for description in descriptions:
-        if description != "":
-            if pointer == 1:
-                result_str = "###Autocreated evidence###\n(DO NOT DELETE)\n" + description
-            else:
-                result_str += "\n###Autocreated evidence###\n(DO NOT DELETE)\n" + description
-        pointer += 1
-
-    return result_str
-
-
-def add_new_evidence(existing_activity, msgs, remote_url):
-    result_str = existing_activity.description
-    result_str += "\n###Autocreated evidence###\n(DO NOT DELETE)\n" + remote_url
-    result_str += "\n-----\n".join(map(lambda m: "\n".join(m), msgs))
-    return result_str
-
-
-def add_evidence_with_no_remote_url(existing_activity, msgs, remote_url):
-    result_str = PrjConfig.activity_prefix() + "\n"
-    previous_descriptions: str = ""
-    if existing_activity is not None:
-        previous_descriptions = existing_activity.description \
-            .replace(result_str, "") \
-            .replace(remote_url, "")
-        previous_descriptions += "\n-----\n"
-    result_str += remote_url
-    result_str += previous_descriptions
-    result_str += "\n-----\n".join(map(lambda m: "\n".join(m), msgs))
-    return result_str
+                  remote_url: str = None,
+                  day: date = None,
+                  compact: bool = False) -> (str, datetime):
+    return generate_merged_info([(remote_url, commit_msgs)], existing_activity, day, compact)
+
+
+def generate_merged_info(remote_commits: List[Tuple[str, List[Tuple[str, str, str, str]]]],
+                         existing_activity: Activity = None,
+                         day: date = None,
+                         compact: bool = False) -> (str, datetime):
+    description, start_date, _ = merge_evidence(remote_commits, existing_activity, day, compact)
+    return description, start_date
+
+
+def merge_evidence(remote_commits: List[Tuple[str, List[Tuple[str, str, str, str]]]],
+                   existing_activity: Activity = None,
+                   day: date = None,
+                   compact: bool = False) -> (str, datetime, int):
+    """Description and start date of the activity, and how many commits weren't registered yet, even if they don't
+    fit in the description"""
+    day = day or date.today()
+    start_date: datetime = datetime(day.year, day.month, day.day, hour=5)
+
+    # Sections that don't fit are cut to their fair share of the description, ending with "\n..."
+    max_size = TNT_DESCRIPTION_MAX_SIZE + len(TRUNCATION_MARK)
+    with tracing.span("parse evidence"):
+        if existing_activity is not None:
+            document = EvidenceDocument.parse(existing_activity.description, max_size)
+        else:
+            document = EvidenceDocument(max_size=max_size)
+    new_commits = 0
+    with tracing.span("add commits"):
+        for remote_url, commit_msgs in remote_commits:
+            remote_url = "" if remote_url is None else remote_url + "\n"
+            new_commits += len(document.add_commits(formatRemoteURL(remote_url), commit_msgs, compact))
+    with tracing.span("render evidence"):
+        result_str = document.render()
+
+    # Truncate description gracefully if the headers alone overflow the description buffer
+    result_str = (result_str[:TNT_DESCRIPTION_MAX_SIZE] + TRUNCATION_MARK) if len(
+        result_str) > max_size else result_str
+
+    return result_str, start_date, new_commits
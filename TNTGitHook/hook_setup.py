@@ -1,29 +1,112 @@
 import hashlib
+import json
+import os
 from pathlib import Path
 
 from TNTGitHook import hook
-from TNTGitHook.utils import hook_installation_path
+from TNTGitHook.utils import hook_installation_path, write_atomically
 from TNTGitHook.hook import write_hook_script, Config, setup_config, removes_old_hook_file
 from TNTGitHook.pre_push import PrePush
+from TNTGitHook.version import VERSION
+
+HOOK_SCRIPT_FILE: str = "tnt_git_hook"
+# Version and hash, size and mtime stamp of the installed files, so pushes hash the script only when its stamp changes
+MANIFEST_FILE: str = "manifest.json"
+
+
+def hook_script_path() -> str:
+    return f"{hook_installation_path()}{HOOK_SCRIPT_FILE}"
+
+
+def manifest_path() -> str:
+    return f"{hook_installation_path()}{MANIFEST_FILE}"
+
+
+def file_sha1(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def file_stamp(path: str) -> dict:
+    stats = os.stat(path)
+    return {"sha1": file_sha1(path), "size": stats.st_size, "mtime_ns": stats.st_mtime_ns}
+
+
+def read_manifest(path: str = None) -> dict:
+    try:
+        with open(path or manifest_path(), "rb") as manifest_file:
+            manifest = json.loads(manifest_file.read())
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def record_installation(pre_push_path: str = None):
+    """Stamps the installed hook script, and the pre-push file of the repository when given"""
+    manifest = read_manifest()
+    try:
+        manifest["version"] = VERSION
+        manifest["hook_script"] = file_stamp(hook_script_path())
+        if pre_push_path is not None and os.path.isfile(pre_push_path):
+            manifest.setdefault("pre_push", {})[os.path.abspath(pre_push_path)] = file_stamp(pre_push_path)
+        write_atomically(manifest_path(), json.dumps(manifest))
+    except OSError:
+        # Without a manifest every push verifies the hook script in full, as before
+        pass
+
+
+def is_stamp_valid(manifest: dict, script_path: str) -> bool:
+    stamp = manifest.get("hook_script")
+    if manifest.get("version") != VERSION or not isinstance(stamp, dict):
+        return False
+    try:
+        stats = os.stat(script_path)
+    except OSError:
+        return False
+    return stats.st_size == stamp.get("size") and stats.st_mtime_ns == stamp.get("mtime_ns")
 
 
 def is_update_needed():
-    hook_file = Path(f"{hook_installation_path()}tnt_git_hook")
+    directory = hook_installation_path()
+    manifest = read_manifest(f"{directory}{MANIFEST_FILE}")
+    if is_stamp_valid(manifest, f"{directory}{HOOK_SCRIPT_FILE}"):
+        return False
+    return not verify_installation(manifest)
+
+
+def verify_installation(manifest: dict) -> bool:
+    """Full check of the installed files, stamping them again when they are up to date"""
+    hook_file = Path(hook_script_path())
     if not hook_file.is_file():
         print("Hook not in the path")
-        return True
-    else:
-        with open(hook_file) as open_hook_file:
-            current_sha1 = hashlib.sha1(open_hook_file.read().encode('utf8')).hexdigest()
-            if current_sha1 != hook.get_hook_sha1():
-                print("Different hook versions")
-                return True
-    return False
+        return False
+    if file_sha1(str(hook_file)) != hook.get_hook_sha1():
+        print("Different hook versions")
+        return False
+    check_pre_push(manifest, PrePush.path)
+    # Same content (i.e. the script was touched or the package upgraded), so next pushes only stat it again
+    record_installation()
+    return True
+
+
+def check_pre_push(manifest: dict, pre_push_path: str):
+    stamp = manifest.get("pre_push", {}).get(os.path.abspath(pre_push_path))
+    if stamp is None:
+        return
+    try:
+        if file_sha1(pre_push_path) == stamp.get("sha1"):
+            return
+        pre_push_correct = PrePush().is_pre_push_in_file(pre_push_path)
+    except OSError:
+        pre_push_correct = False
+    if not pre_push_correct:
+        print(f"{pre_push_path} no longer calls {hook.NAME}, run the setup again to register the pushes")
 
 
 def write_hook():
     print("Writing hook")
     write_hook_script()
+    record_installation()
     print("Hook written")
 
 
@@ -31,10 +114,10 @@ def setup(config: Config, organization: str, project: str, role: str):
     write_hook_script()
     removes_old_hook_file()
     write_pre_push_script()
+    record_installation(PrePush.path)
     setup_config(config, organization, project, role)
 
 
 def write_pre_push_script():
     pre_push = PrePush()
     pre_push.setup()
-
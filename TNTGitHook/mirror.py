@@ -0,0 +1,63 @@
+import json
+from datetime import date
+from typing import Optional
+
+from TNTGitHook.utils import hook_data_path, write_atomically
+
+MIRROR_FILE: str = "activities.json"
+# Days are kept in the key, so the oldest entries are dropped beyond this size
+MIRROR_MAX_ENTRIES: int = 32
+
+
+def mirror_path() -> str:
+    return f"{hook_data_path('mirror')}{MIRROR_FILE}"
+
+
+def entry_key(day: date, prj_config, username: str) -> str:
+    # By name, as the role ID may be pinned while the activity is being looked up
+    role = f"{prj_config.organization}/{prj_config.project}/{prj_config.role}"
+    return json.dumps([day.isoformat(), username, role])
+
+
+def load_all() -> dict:
+    try:
+        with open(mirror_path()) as mirror_file:
+            mirror = json.load(mirror_file)
+    except (FileNotFoundError, ValueError):
+        mirror = {}
+    mirror.setdefault("entries", {})
+    return mirror
+
+
+def write_all(mirror: dict) -> None:
+    entries = mirror["entries"]
+    for key in sorted(entries)[:-MIRROR_MAX_ENTRIES]:
+        del entries[key]
+    write_atomically(mirror_path(), json.dumps(mirror), mode=0o600)
+
+
+def load(key: str) -> Optional[dict]:
+    """Activity ID, description and ETag of the automatic evidence last seen for the day and role"""
+    return load_all()["entries"].get(key)
+
+
+def store(key: str, activity_id: int, description: str, etag: str = None) -> None:
+    mirror = load_all()
+    mirror["entries"][key] = {"id": activity_id, "description": description, "etag": etag}
+    write_all(mirror)
+
+
+def forget(key: str) -> None:
+    mirror = load_all()
+    if mirror["entries"].pop(key, None) is not None:
+        write_all(mirror)
+
+
+def is_item_endpoint_supported() -> bool:
+    return load_all().get("item_endpoint", True)
+
+
+def disable_item_endpoint() -> None:
+    mirror = load_all()
+    mirror["item_endpoint"] = False
+    write_all(mirror)
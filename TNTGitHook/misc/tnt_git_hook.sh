@@ -23,6 +23,9 @@ else
   gitlog_params="$local_ref --not $(git for-each-ref --format='%(refname)' refs/heads/ | grep -v "${local_ref}")"
 fi
 filename="/tmp/tnt-git-hook-commits-$(date +%s)"
+# Only when tracing, so the git steps show up in the trace of the python hook
+trace_params=""
+[ -n "$TNT_HOOK_TRACE" ] && git_started=$(date +%s%N)
 git log --pretty="format:%H;%aI;%an <%ae>;%f" $gitlog_params 1> $filename
 git_exit=$?
 
@@ -37,6 +40,8 @@ then
   fi
 fi
 
+[ -n "$TNT_HOOK_TRACE" ] && trace_params="--git-timestamps $git_started,$(date +%s%N)"
+
 # Do nothing on error, just inform and go ahead with the push operation (i.e. conflicts)
 if [ $git_exit -ne 0 ]
 then
@@ -48,7 +53,27 @@ fi
 
 REMOTE=$(git ls-remote --get-url | head -1)
 
-python3 -m TNTGitHook --commit-msgs-file $filename --remote $REMOTE
+# If the resident agent is running, hand the commits to it and skip the python startup
+AGENT_SOCKET="$HOME/.tnt/hook/run/agent.sock"
+if [ -S "$AGENT_SOCKET" ] && command -v nc > /dev/null 2>&1
+then
+  agent_response=$( { printf 'SUBMIT\nproject: %s\nremote: %s\nlength: %s\n\n' "$project_path" "$REMOTE" "$(wc -c < $filename | tr -d ' ')"; cat $filename; } | nc -U "$AGENT_SOCKET" 2> /dev/null)
+  agent_status=$(printf '%s\n' "$agent_response" | head -1)
+  if [ "$agent_status" = "OK" ] || [ "$agent_status" = "FAIL" ]
+  then
+    printf '%s\n' "$agent_response" | tail -n +2
+    rm $filename
+    popd
+    if [ "$agent_status" = "FAIL" ]
+    then
+      echo "Error executing python hook"
+      exit 1
+    fi
+    exit 0
+  fi
+fi
+
+python3 -m TNTGitHook --commit-msgs-file $filename --remote $REMOTE $trace_params
 python_exit=$?
 
 if [ $python_exit -ne 0 ]
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import date
+from typing import List, Tuple
+
+from TNTGitHook.utils import hook_data_path, write_atomically
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where the outbox works without inter-process locking
+    fcntl = None
+
+OUTBOX_LOCK: str = ".lock"
+OUTBOX_FLUSH_LOCK: str = ".flush.lock"
+FLUSH_MAX_WORKERS: int = 4
+# Updates of the same day and role are serialized with one of these lock files, so they don't pile up in the outbox
+GROUP_LOCKS: int = 64
+
+
+def outbox_path() -> str:
+    return hook_data_path("outbox")
+
+
+def role_key(prj_config) -> str:
+    # By name, as a process with the role ID pinned and another one resolving it must share the key
+    return f"{prj_config.organization}/{prj_config.project}/{prj_config.role}"
+
+
+def entry_key(day: date, prj_config, remote: str) -> str:
+    return json.dumps([day.isoformat(), role_key(prj_config), remote or ""])
+
+
+def is_sent(response) -> bool:
+    """No response means the commits were already registered, which is as good as sent"""
+    return response is None or 200 <= response.status_code < 300
+
+
+def is_retriable(response) -> bool:
+    """Server errors and rate limits may succeed later, any other rejection would be repeated on every retry"""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def entry_path(key: str) -> str:
+    return f"{outbox_path()}{hashlib.sha1(key.encode('utf8')).hexdigest()}.json"
+
+
+@contextmanager
+def locked(name: str = OUTBOX_LOCK, blocking: bool = True):
+    """Serializes outbox access between hook processes. Yields False if not blocking and already locked"""
+    if fcntl is None:
+        yield True
+        return
+    with open(f"{outbox_path()}{name}", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def group_locked(day: date, prj_config, blocking: bool = True):
+    """Serializes the processes updating the activity of the day and role, as the last update would drop the commits
+    of the others"""
+    key = json.dumps([day.isoformat(), role_key(prj_config)])
+    return locked(f".group-{int(hashlib.sha1(key.encode('utf8')).hexdigest(), 16) % GROUP_LOCKS}.lock", blocking)
+
+
+def read_entry(path: str) -> dict:
+    with open(path) as entry_file:
+        return json.load(entry_file)
+
+
+def pending_entries() -> List[str]:
+    path = outbox_path()
+    return sorted(f"{path}{name}" for name in os.listdir(path) if name.endswith(".json"))
+
+
+def enqueue(commit_msgs: List[Tuple[str, str, str, str]], remote: str, prj_config, config_path: str = None,
+            day: date = None) -> str:
+    """Adds the commits to the pending entry of the same day, role and remote, so they are sent in one POST"""
+    day = day or date.today()
+    key = entry_key(day, prj_config, remote)
+    path = entry_path(key)
+    with locked():
+        if os.path.isfile(path):
+            entry = read_entry(path)
+        else:
+            entry = {"key": key,
+                     "day": day.isoformat(),
+                     "remote": remote,
+                     "prj_config": prj_config.__dict__,
+                     "config_path": os.path.abspath(config_path) if config_path else None,
+                     "commit_msgs": []}
+        known = set(map(tuple, entry["commit_msgs"]))
+        entry["commit_msgs"] += [list(commit_msg) for commit_msg in commit_msgs if tuple(commit_msg) not in known]
+        write_atomically(path, json.dumps(entry))
+    return path
+
+
+def group_key(path: str) -> str:
+    """Day and role of the entry, whose remotes share the same activity"""
+    day, role, _ = json.loads(read_entry(path)["key"])
+    return json.dumps([day, role])
+
+
+def flush_group(config, paths: List[str]) -> bool:
+    """Sends the entries of the same day and role with a single update, so their sections don't overwrite each other.
+    Returns False if they remain in the outbox"""
+    # Imported here to keep the enqueue path free of the HTTP and keyring machinery
+    from TNTGitHook.hook import PrjConfig, create_merged_activity
+    from TNTGitHook.utils import to_class
+
+    with locked():
+        entries = {path: read_entry(path) for path in paths if os.path.isfile(path)}
+    if not entries:
+        return True
+    first_entry = next(iter(entries.values()))
+    prj_config: PrjConfig = to_class(first_entry["prj_config"], PrjConfig)
+    remote_commits = [(entry["remote"], [tuple(commit_msg) for commit_msg in entry["commit_msgs"]])
+                      for entry in entries.values()]
+    day = date.fromisoformat(first_entry["day"])
+    with group_locked(day, prj_config):
+        response = create_merged_activity(config, prj_config, remote_commits, first_entry["config_path"], day)
+    if not is_sent(response) and is_retriable(response):
+        return False
+    if not is_sent(response):
+        # Left in the outbox, it would be rejected again on every push and hold back the other remotes of its group
+        print(f"TNT rejected the pending activity of {first_entry['day']} with HTTP return code "
+              f"{response.status_code}, it has been removed from the outbox")
+    with locked():
+        for path, entry in entries.items():
+            sent = set(tuple(commit_msg) for commit_msg in entry["commit_msgs"])
+            # Commits may have been added while the request was in flight, keep them for the next flush
+            remaining = [commit_msg for commit_msg in read_entry(path)["commit_msgs"]
+                         if tuple(commit_msg) not in sent] if os.path.isfile(path) else []
+            if remaining:
+                entry["commit_msgs"] = remaining
+                write_atomically(path, json.dumps(entry))
+            elif os.path.isfile(path):
+                os.remove(path)
+    return True
+
+
+def flush(config, max_workers: int = FLUSH_MAX_WORKERS) -> Tuple[int, int]:
+    """Sends every pending entry with bounded concurrency, one request per day and role. Returns (flushed, failed)
+    entries"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    flushed = 0
+    failed = 0
+    with locked(OUTBOX_FLUSH_LOCK, blocking=False) as acquired:
+        if not acquired:
+            # Another hook process is already flushing
+            return flushed, failed
+        groups = {}
+        with locked():
+            for path in pending_entries():
+                groups.setdefault(group_key(path), []).append(path)
+        if not groups:
+            return flushed, failed
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(executor.submit(flush_group, config, paths), len(paths)) for paths in groups.values()]
+            for future, entries in futures:
+                try:
+                    if future.result():
+                        flushed += entries
+                    else:
+                        failed += entries
+                except Exception:
+                    failed += entries
+    return flushed, failed
+
+
+def flush_pending(config) -> None:
+    if not pending_entries():
+        return
+    flushed, failed = flush(config)
+    if flushed:
+        print(f"Sent {flushed} pending activities from the outbox")
+    if failed:
+        print(f"{failed} activities remain in the outbox, they will be sent on next push")
@@ -12,10 +12,13 @@ class PrePush:
     shebang_symbol: str = '#!'
     shebang: str = '#!/bin/bash'
     pipefail: str = 'set -o pipefail'
-    readline: str = 'read local_ref local_sha remote_ref remote_sha'
-    tnt_call: str = f"$HOME/.tnt/hook/bin/tnt_git_hook $local_ref $local_sha $remote_ref $remote_sha $(git rev-parse --show-toplevel)"
-    old_script_to_delete: List[str] = ['set -o pipefail', 'PROJECT_PATH', 'tnt_git_hook',
-                                       'read local_ref local_sha remote_ref remote_sha']
+    # git writes the pushed refs to stdin once, so they are kept for the user's commands (i.e. git lfs pre-push)
+    # and then given to the hook. git passes the remote URL as second argument
+    read_refs: str = 'refs=$(cat)'
+    replay_refs: str = 'exec <<< "$refs"'
+    tnt_call: str = 'printf \'%s\\n\' "$refs" | python3 -m TNTGitHook --pre-push --remote "$2"'
+    old_script_to_delete: List[str] = ['set -o pipefail', 'PROJECT_PATH', 'tnt_git_hook', 'TNTGitHook --pre-push',
+                                       'read local_ref local_sha remote_ref remote_sha', read_refs, replay_refs]
 
     def write(self) -> None:
         self.write_in_file(self.path, self.__str__())
@@ -55,17 +58,13 @@ class PrePush:
         return False
 
     def is_pre_push_correct(self, current_hook: str) -> bool:
-        return self.is_shebang_in_place(current_hook) and self.is_readline_in_place(current_hook) \
-               and self.is_tnt_call_in_place(current_hook)
+        return self.is_shebang_in_place(current_hook) and self.is_tnt_call_in_place(current_hook)
 
     def is_shebang_in_place(self, current_hook: str) -> bool:
         return self.shebang in current_hook
 
-    def is_readline_in_place(self, current_hook: str) -> bool:
-        return self.readline in current_hook
-
     def is_tnt_call_in_place(self, current_hook: str) -> bool:
-        return self.tnt_call in current_hook
+        return self.read_refs in current_hook and self.tnt_call in current_hook
 
     def is_shebang_symbol(self, current_hook: str) -> bool:
         return self.tnt_call in current_hook
@@ -78,7 +77,7 @@ class PrePush:
         given_hook = "\n".join(list(filter(None, removed_old_script_lines)))
         if len(given_hook) > 0:
             given_hook = "\n" + given_hook
-        return f"{self.shebang}\n{self.pipefail}\n{self.readline}{given_hook}\n{self.tnt_call}"
+        return f"{self.shebang}\n{self.pipefail}\n{self.read_refs}\n{self.replay_refs}{given_hook}\n{self.tnt_call}"
 
     def read_hook(self) -> str:
         return Path(self.path).read_text()
@@ -117,4 +116,4 @@ class PrePush:
             self.write()
 
     def __str__(self):
-        return f"{self.shebang}\n{self.pipefail}\n{self.readline}\n{self.tnt_call}"
+        return f"{self.shebang}\n{self.pipefail}\n{self.read_refs}\n{self.replay_refs}\n{self.tnt_call}"
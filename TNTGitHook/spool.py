@@ -0,0 +1,185 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from TNTGitHook.utils import hook_data_path, write_atomically
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where a job may be run twice if it is picked up while its worker runs it
+    fcntl = None
+
+SUBMISSIONS_LOG: str = "submissions.log"
+SUBMISSIONS_LOG_OFFSET: str = "submissions.log.offset"
+# Jobs older than this are left by a worker that died (i.e. killed or the computer shut down) before registering them
+ORPHANED_JOB_SECONDS: int = 60
+
+
+def spool_path() -> str:
+    return hook_data_path("spool")
+
+
+def log_path() -> str:
+    return hook_data_path("log")
+
+
+def enqueue(commit_msgs: List[Tuple[str, str, str, str]], remote: str, prj_config, config_path: str,
+            debug: bool) -> str:
+    job = {"commit_msgs": commit_msgs,
+           "remote": remote,
+           "prj_config": prj_config.__dict__,
+           "config_path": os.path.abspath(config_path),
+           "day": date.today().isoformat(),
+           "debug": debug}
+    job_path = f"{spool_path()}{time.time_ns()}-{os.getpid()}.json"
+    write_atomically(job_path, json.dumps(job))
+    return job_path
+
+
+def spawn_worker(job_path: str, debug: bool) -> None:
+    import subprocess
+
+    args = [sys.executable, "-m", "TNTGitHook", "--submit-job", job_path]
+    if debug:
+        args.append("--debug")
+    # Detach the worker from the hook process group, so git doesn't wait for it and Ctrl-C doesn't kill it
+    subprocess.Popen(args,
+                     stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL,
+                     close_fds=True,
+                     start_new_session=True)
+
+
+def submit_async(commit_msgs: List[Tuple[str, str, str, str]], remote: str, prj_config, config_path: str,
+                 debug: bool) -> float:
+    """Stores the push durably and hands it to a detached worker. Returns the enqueue latency in milliseconds"""
+    start = time.perf_counter()
+    job_path = enqueue(commit_msgs, remote, prj_config, config_path, debug)
+    spawn_worker(job_path, debug)
+    return (time.perf_counter() - start) * 1000
+
+
+def pending_jobs() -> List[str]:
+    path = spool_path()
+    return sorted(f"{path}{name}" for name in os.listdir(path) if name.endswith(".json"))
+
+
+@contextmanager
+def claimed(job_path: str) -> Optional[dict]:
+    """Yields the job while this process is the only one running it, None if another one is or it is already done"""
+    try:
+        job_file = open(job_path)
+    except FileNotFoundError:
+        yield None
+        return
+    with job_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(job_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield None
+                return
+        if os.fstat(job_file.fileno()).st_nlink == 0:
+            # Removed by the process that ran it between the open and the lock
+            yield None
+            return
+        # Closing the file releases the lock
+        yield json.load(job_file)
+
+
+def run_job(job_path: str, debug: bool) -> None:
+    with claimed(job_path) as job:
+        if job is None:
+            return
+        try:
+            submit_job(job, debug)
+        finally:
+            os.remove(job_path)
+
+
+def run_orphaned_jobs(debug: bool) -> None:
+    """Registers the jobs whose worker died, so they aren't left in the spool forever"""
+    now = time.time()
+    for job_path in pending_jobs():
+        try:
+            orphaned = now - os.path.getmtime(job_path) > ORPHANED_JOB_SECONDS
+        except FileNotFoundError:
+            continue
+        if orphaned:
+            run_job(job_path, debug)
+
+
+def submit_job(job: dict, debug: bool) -> None:
+    # Imported here to keep the enqueue path free of the HTTP and keyring machinery
+    import requests
+    from TNTGitHook import outbox
+    from TNTGitHook.exceptions import NetworkError
+    from TNTGitHook.hook import Config, PrjConfig, create_activity
+    from TNTGitHook.utils import to_class
+
+    prj_config: PrjConfig = to_class(job["prj_config"], PrjConfig)
+    config = Config.config(debug)
+    config.timeout = prj_config.timeout
+    commit_msgs = [tuple(commit_msg) for commit_msg in job["commit_msgs"]]
+    # Jobs enqueued by previous versions don't have the day
+    day = date.fromisoformat(job["day"]) if job.get("day") else date.today()
+    try:
+        outbox.flush_pending(config)
+        with outbox.group_locked(day, prj_config):
+            response = create_activity(config, prj_config, commit_msgs, job["remote"], job["config_path"], day)
+        if response is None:
+            log_submission("OK", prj_config, job["remote"], "commits already registered")
+        elif outbox.is_sent(response):
+            log_submission("OK", prj_config, job["remote"], f"{len(commit_msgs)} commits registered")
+        elif outbox.is_retriable(response):
+            outbox.enqueue(commit_msgs, job["remote"], prj_config, job["config_path"], day)
+            log_submission("QUEUED", prj_config, job["remote"],
+                           f"stored in the outbox: HTTP return code: {response.status_code}")
+        else:
+            log_submission("ERROR", prj_config, job["remote"], f"rejected: HTTP return code: {response.status_code}")
+    except (requests.exceptions.RequestException, NetworkError) as error:
+        outbox.enqueue(commit_msgs, job["remote"], prj_config, job["config_path"], day)
+        log_submission("QUEUED", prj_config, job["remote"], f"stored in the outbox: {error}")
+    except Exception as error:
+        log_submission("ERROR", prj_config, job["remote"], str(error))
+
+
+def log_submission(status: str, prj_config, remote: str, message: str) -> None:
+    line = f"{datetime.now().isoformat(timespec='seconds')} {status} {prj_config.project} - {prj_config.role} " \
+           f"({remote}): {message}".replace("\n", " ")
+    with open(f"{log_path()}{SUBMISSIONS_LOG}", "a") as log:
+        log.write(line + "\n")
+        log.flush()
+        os.fsync(log.fileno())
+
+
+def read_new_submissions() -> List[str]:
+    """Returns the submissions logged by detached workers since the last time they were shown"""
+    path = f"{log_path()}{SUBMISSIONS_LOG}"
+    offset_path = f"{log_path()}{SUBMISSIONS_LOG_OFFSET}"
+    if not os.path.isfile(path):
+        return []
+    try:
+        with open(offset_path) as offset_file:
+            offset = int(offset_file.read() or 0)
+    except (FileNotFoundError, ValueError):
+        offset = 0
+    if offset > os.path.getsize(path):
+        # The log has been rotated or truncated
+        offset = 0
+    with open(path) as log:
+        log.seek(offset)
+        lines = log.read().splitlines()
+        write_atomically(offset_path, str(log.tell()))
+    return lines
+
+
+def show_new_submissions() -> None:
+    for line in read_new_submissions():
+        print(f"Previous TNT submission: {line}")
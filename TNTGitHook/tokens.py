@@ -0,0 +1,83 @@
+import json
+import os
+import time
+
+from TNTGitHook.exceptions import AuthError
+from TNTGitHook.utils import hook_data_path, write_atomically
+
+TOKENS_FILE: str = "tokens.json"
+# Refresh a bit before the token expires, so it doesn't expire while a request is in flight
+REFRESH_MARGIN_SECONDS: int = 60
+
+
+def tokens_path() -> str:
+    return f"{hook_data_path('auth')}{TOKENS_FILE}"
+
+
+def clear_tokens() -> None:
+    if os.path.isfile(tokens_path()):
+        os.remove(tokens_path())
+
+
+class TokenManager:
+    """OAuth tokens stored with their expiry and shared by every invocation, so each push doesn't request a new one"""
+
+    def __init__(self, config):
+        self.config = config
+        self.token = None
+
+    def headers(self) -> dict:
+        return {"Authorization": "Bearer " + self.access_token()}
+
+    def access_token(self) -> str:
+        if self.token is None:
+            self.token = self.load()
+        if self.token is not None and self.token["expires_at"] - REFRESH_MARGIN_SECONDS > time.time():
+            return self.token["access_token"]
+        token = None
+        if self.token is not None and self.token.get("refresh_token"):
+            token = self.request_token({"grant_type": "refresh_token",
+                                        "refresh_token": self.token["refresh_token"]})
+        if token is None:
+            # Imported here to avoid a circular import, hook uses the manager through Config
+            from TNTGitHook.hook import retrieve_keychain_credentials
+            username, password = retrieve_keychain_credentials()
+            token = self.request_token({"grant_type": "password",
+                                        "username": username,
+                                        "password": password})
+        if token is None:
+            raise AuthError()
+        self.token = token
+        self.store(token)
+        return token["access_token"]
+
+    def request_token(self, payload: dict):
+        headers = {"Authorization": "Basic " + self.config.basic_auth}
+        response = self.config.transport.post(self.config.authURL, headers=headers, data=payload)
+        if response.status_code != 200:
+            return None
+        body = response.json()
+        return {"access_token": body["access_token"],
+                "refresh_token": body.get("refresh_token"),
+                "expires_at": time.time() + body.get("expires_in", 0)}
+
+    def invalidate(self) -> None:
+        self.token = None
+        tokens = self.load_all()
+        if tokens.pop(self.config.authURL, None) is not None:
+            write_atomically(tokens_path(), json.dumps(tokens), mode=0o600)
+
+    def load(self):
+        return self.load_all().get(self.config.authURL)
+
+    def load_all(self) -> dict:
+        try:
+            with open(tokens_path()) as tokens_file:
+                return json.load(tokens_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def store(self, token: dict) -> None:
+        tokens = self.load_all()
+        tokens[self.config.authURL] = token
+        write_atomically(tokens_path(), json.dumps(tokens), mode=0o600)
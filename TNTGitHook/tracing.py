@@ -0,0 +1,100 @@
+"""Spans around the phases of a hook invocation, exported as Chrome trace events (chrome://tracing, Perfetto).
+
+Tracing is enabled with --trace <file> or the TNT_HOOK_TRACE environment variable. When it is disabled, span() returns
+a shared no-op context manager, so instrumented code only pays for a function call.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import List, Optional
+
+from TNTGitHook.utils import write_atomically
+
+TRACE_ENV: str = "TNT_HOOK_TRACE"
+
+_NO_SPAN = nullcontext()
+# Recorded events, None while tracing is disabled
+_events: Optional[List[dict]] = None
+_path: Optional[str] = None
+_lock = threading.Lock()
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+class Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = now_us()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        add_span(self.name, self.start, now_us(), **self.args)
+        return False
+
+
+def enable(path: str) -> None:
+    global _events, _path
+    _events = []
+    _path = path
+
+
+def enable_from_env() -> None:
+    if os.environ.get(TRACE_ENV):
+        enable(os.environ[TRACE_ENV])
+
+
+def is_enabled() -> bool:
+    return _events is not None
+
+
+def span(name: str, **args):
+    """Context manager that records the time spent in its block"""
+    if _events is None:
+        return _NO_SPAN
+    return Span(name, args)
+
+
+def add_span(name: str, start_us: int, end_us: int, **args) -> None:
+    """Records a span measured elsewhere, i.e. by the shell hook"""
+    if _events is None:
+        return
+    event = {"name": name, "cat": "hook", "ph": "X", "ts": start_us, "dur": max(0, end_us - start_us),
+             "pid": os.getpid(), "tid": threading.get_ident(), "args": args}
+    with _lock:
+        _events.append(event)
+
+
+def events() -> List[dict]:
+    return list(_events or [])
+
+
+def export() -> None:
+    """Appends the spans to the trace file, so pushes traced to the same file show up in the same timeline"""
+    if not _events or _path is None:
+        return
+    with _lock:
+        recorded = list(_events)
+        _events.clear()
+    try:
+        with open(_path) as trace_file:
+            trace = json.load(trace_file)
+    except (FileNotFoundError, ValueError):
+        trace = {"traceEvents": [], "displayTimeUnit": "ms"}
+    trace["traceEvents"] += recorded
+    try:
+        write_atomically(_path, json.dumps(trace))
+    except OSError as error:
+        # Tracing never fails a push
+        print(f"Unable to write trace to {_path}: {error}")
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from TNTGitHook import tracing
+
+POOL_SIZE: int = 4
+RETRY_BACKOFF_FACTOR: float = 0.2
+# Only idempotent requests are retried on gateway errors, POSTs are retried on connection errors only
+RETRY_STATUS_FORCELIST = (502, 503, 504)
+
+
+class Transport:
+    """HTTP session shared by every TNT call in one invocation, so connections are kept alive and reused"""
+    session: requests.Session
+
+    def __init__(self, config):
+        self.config = config
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json"})
+        retry = Retry(total=config.retries,
+                      connect=config.retries,
+                      read=0,
+                      status=config.retries,
+                      backoff_factor=RETRY_BACKOFF_FACTOR,
+                      status_forcelist=RETRY_STATUS_FORCELIST,
+                      allowed_methods=frozenset(["GET"]),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, authenticated: bool = False, **kwargs) -> Response:
+        with tracing.span(f"{method} {url.split('?', 1)[0]}") as span:
+            response = self.send(method, url, authenticated, **kwargs)
+            if span is not None:
+                span.args["status"] = response.status_code
+        return response
+
+    def send(self, method: str, url: str, authenticated: bool = False, **kwargs) -> Response:
+        # Timeout is read on every request because it is overridden by the project config after the transport is built
+        kwargs.setdefault("timeout", self.config.timeout)
+        if not authenticated:
+            return self.session.request(method, url, **kwargs)
+        headers = kwargs.pop("headers", {})
+        response = self.session.request(method, url, headers={**headers, **self.config.token_manager.headers()},
+                                        **kwargs)
+        if response.status_code == 401:
+            # The stored token may have been revoked before its expiry, request a new one and retry once
+            self.config.token_manager.invalidate()
+            response = self.session.request(method, url, headers={**headers, **self.config.token_manager.headers()},
+                                            **kwargs)
+        return response
+
+    def warm_up(self, url: str) -> None:
+        """Opens a pooled connection to the url host in advance, so the TCP/TLS handshake overlaps other work"""
+        try:
+            pool = self.session.get_adapter(url).get_connection(url)
+            connection = pool._get_conn(timeout=self.config.timeout)
+            if connection.sock is None:
+                connection.connect()
+            pool._put_conn(connection)
+        except Exception:
+            # Best effort, the connection is opened again by the first request if this fails
+            pass
+
+    def stats(self) -> (int, int):
+        """Returns (handshakes, reused connections) for every pool opened by this transport"""
+        handshakes = 0
+        requests_sent = 0
+        # The same adapter is mounted for http and https, count its pools only once
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                handshakes += pool.num_connections
+                requests_sent += pool.num_requests
+        return handshakes, requests_sent - handshakes
+
+    def close(self):
+        self.session.close()
+
+    def __str__(self):
+        handshakes, reused = self.stats()
+        return f"HTTP connections: {handshakes} handshakes, {reused} reused"
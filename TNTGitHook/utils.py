@@ -1,8 +1,11 @@
 import json
+import mmap
+import os
 import re
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable, Callable, TypeVar
+from typing import Any, Iterable, Iterator, Callable, TypeVar
 
 from TNTGitHook.entities import Organization
 
@@ -19,9 +22,7 @@ class OrganizationListDecoder(json.JSONDecoder):
         json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
 
     def object_hook(self, obj):
-        result = Organization()
-        result.__dict__.update(obj)
-        return result
+        return Organization.from_json(obj)
 
 
 T = TypeVar('T')
@@ -31,6 +32,59 @@ def hook_installation_path() -> str:
     return f"{str(Path.home())}/.tnt/hook/bin/"
 
 
+def hook_data_path(directory: str) -> str:
+    path = f"{str(Path.home())}/.tnt/hook/{directory}/"
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_atomically(path: str, content: str, mode: int = 0o666) -> None:
+    # Write to a temporary file in the same directory and rename it, so readers never see a partial file
+    directory = os.path.dirname(path) or "."
+    tmp_path = f"{directory}/.tmp-{os.getpid()}-{threading.get_ident()}-{os.path.basename(path)}"
+    try:
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def reverse_lines(path: str) -> Iterator[bytes]:
+    """Non empty lines of the file from the last one to the first, without reading the whole file"""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = len(data)
+            while end > 0:
+                start = data.rfind(b"\n", 0, end) + 1
+                if start < end:
+                    yield data[start:end]
+                end = start - 1
+
+
+def count_lines(path: str) -> int:
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    # The last line doesn't need to end with a new line
+    return lines if last == b"\n" else lines + 1
+
+
 def to_class(obj: dict, cls: T) -> T:
     result = cls()
     result.__dict__.update(obj)
@@ -0,0 +1,2 @@
+# Read by setup.py, and stamped in the installation manifest so an upgrade verifies the installed hook again
+VERSION: str = "0.14.0"
@@ -0,0 +1,127 @@
+"""Registers the commits of every configured repository under a directory in one run, i.e. at the end of the day from
+cron instead of on every push.
+
+The repositories are scanned in parallel, and their commits are merged into one update per activity (day and role), so
+the whole run pays a single interpreter start, credentials lookup and HTTP session.
+"""
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from TNTGitHook import hook, outbox
+from TNTGitHook.backfill import commits_by_day, remote_url, user_email
+from TNTGitHook.exceptions import UnknownAuthorError
+from TNTGitHook.utils import to_class
+
+# Repositories scanned at once, each one runs its own git processes
+SCAN_MAX_WORKERS: int = 8
+# Activities registered at once, up to the connections kept by the transport
+SUBMIT_MAX_WORKERS: int = 4
+
+
+class Repository(NamedTuple):
+    path: str
+    config_path: str
+    prj_config: hook.PrjConfig
+
+
+def discover(directory: str) -> List[str]:
+    """Repositories under the directory with the hook configured"""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        if ".git" in dirs or ".git" in files:
+            if os.path.isfile(os.path.join(root, hook.DEFAULT_CONFIG_FILE_PATH)):
+                found.append(root)
+            # Nothing else to find inside a repository, and its working tree may be huge (i.e. node_modules)
+            dirs.clear()
+        else:
+            dirs.sort()
+    return found
+
+
+def read_repository(path: str) -> Repository:
+    config_path = os.path.join(path, hook.DEFAULT_CONFIG_FILE_PATH)
+    with open(config_path) as config_file:
+        prj_config = json.load(config_file, object_hook=lambda x: to_class(x, hook.PrjConfig))
+    return Repository(path, config_path, prj_config)
+
+
+def scan(repository: Repository, since: date, until: date) -> Tuple[str, Dict[date, List[Tuple[str, str, str, str]]]]:
+    """Remote and commits of the user by day in every local branch"""
+    author = user_email(repository.path)
+    if author is None:
+        # Without it, the commits of every author would be registered as the user's
+        raise UnknownAuthorError()
+    commits = commits_by_day(since, until, ["--branches"], author=author, cwd=repository.path)
+    return remote_url(repository.path), commits
+
+
+def role_key(prj_config: hook.PrjConfig) -> Tuple[str, str, str]:
+    return prj_config.organization, prj_config.project, prj_config.role
+
+
+def run(config, directory: str, since: date, until: date) -> Tuple[int, int, int]:
+    """Registers the commits of every repository. Returns (updated, up to date, failed) activities, where repositories
+    that can't be scanned count as failed"""
+    repositories = []
+    for path in discover(directory):
+        try:
+            repositories.append(read_repository(path))
+        except (OSError, ValueError) as error:
+            print(f"Skipping {path}, invalid configuration: {error}")
+    if not repositories:
+        return 0, 0, 0
+    updated = 0
+    up_to_date = 0
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS) as executor:
+        futures = [executor.submit(scan, repository, since, until) for repository in repositories]
+    # The first configuration of each role is used for the whole activity
+    roles: Dict[Tuple[str, str, str], Repository] = {}
+    activities: Dict[Tuple[Tuple[str, str, str], date], list] = defaultdict(list)
+    for repository, future in zip(repositories, futures):
+        try:
+            remote, commits = future.result()
+        except Exception as error:
+            print(f"Skipping {repository.path}: {error}")
+            failed += 1
+            continue
+        key = role_key(repository.prj_config)
+        roles.setdefault(key, repository)
+        for day, commit_msgs in commits.items():
+            activities[(key, day)].append((remote, commit_msgs))
+    if not activities:
+        return updated, up_to_date, failed
+
+    config.timeout = max(repository.prj_config.timeout for repository in roles.values())
+    credentials = hook.retrieve_keychain_credentials()
+    for repository in roles.values():
+        hook.resolve_role_id(config, repository.prj_config, repository.config_path)
+
+    def register(key: Tuple[Tuple[str, str, str], date]) -> Optional[bool]:
+        repository = roles[key[0]]
+        with outbox.group_locked(key[1], repository.prj_config):
+            response = hook.create_merged_activity(config, repository.prj_config, activities[key],
+                                                   repository.config_path, day=key[1], credentials=credentials)
+        return None if response is None else response.status_code == 200
+
+    keys = sorted(activities, key=lambda key: (key[1], key[0]))
+    with ThreadPoolExecutor(max_workers=SUBMIT_MAX_WORKERS) as executor:
+        futures = [executor.submit(register, key) for key in keys]
+        for key, future in zip(keys, futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                print(f"Could not register the activity of {key[1]} for {key[0][1]} - {key[0][2]}: {error}")
+                result = False
+            if result is None:
+                up_to_date += 1
+            elif result:
+                updated += 1
+            else:
+                failed += 1
+    return updated, up_to_date, failed
@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import tempfile
+import unittest
+from threading import Thread
+from unittest.mock import patch, MagicMock
+
+from TNTGitHook import agent
+from TNTGitHook.hook import DEFAULT_CONFIG_FILE_PATH, fingerprint
+
+
+class AgentTestCase(unittest.TestCase):
+
+    home: tempfile.TemporaryDirectory
+    commits = "b287b94c4fdcccc426f828bd5e15e62139e0223f;2020-05-27T13:20:21+02:00;" \
+              "COMMITER 1 <commiter1@autentia.com>;Initial commit"
+
+    def setUp(self) -> None:
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name})
+        self.env.start()
+        os.makedirs(f"{self.home.name}/project/.git/hooks")
+        with open(f"{self.home.name}/project/{DEFAULT_CONFIG_FILE_PATH}", "w") as config_file:
+            json.dump({"organization": "Test Organization", "project": "Test Project", "role": "Test Role",
+                       "role_id": 0, "catalog_fingerprint": fingerprint(None, "Test Organization", None, "Test Project",
+                                                                        0, "Test Role")}, config_file)
+        self.path = agent.socket_path()
+        self.server = agent.AgentServer(self.path, agent.AgentState(debug=True), idle_minutes=1)
+        self.thread = Thread(target=self.server.serve_until_idle, daemon=True)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        if self.thread.is_alive():
+            agent.send("STOP")
+            self.thread.join()
+        self.env.stop()
+        self.home.cleanup()
+
+    def submit(self) -> (str, str):
+        body = self.commits.encode("utf8")
+        request = f"SUBMIT\nproject: {self.home.name}/project\nremote: git@github.com:autentia/TNTConcept.git\n" \
+                  f"length: {len(body)}\n\n".encode("utf8") + body
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.path)
+            client.sendall(request)
+            response = client.makefile("rb").read().decode("utf8")
+        status, _, message = response.partition("\n")
+        return status, message
+
+    def test_agent_is_running(self):
+        self.assertTrue(agent.is_running())
+
+    @patch('TNTGitHook.hook_setup.is_update_needed', MagicMock(return_value=False))
+    @patch('TNTGitHook.agent.retrieve_keychain_credentials')
+    @patch('TNTGitHook.agent.create_activity')
+    def test_submit_registers_the_activity_with_cached_credentials(self, mock_create_activity: MagicMock,
+                                                                   mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        mock_create_activity.side_effect = lambda *args, **kwargs: print("Successfully created activity")
+
+        first = self.submit()
+        second = self.submit()
+
+        self.assertEqual(("OK", "Successfully created activity\n"), first)
+        self.assertEqual(first, second)
+        mock_credentials.assert_called_once()
+        args, kwargs = mock_create_activity.call_args
+        self.assertEqual([tuple(self.commits.split(";"))], args[2])
+        self.assertEqual("git@github.com:autentia/TNTConcept.git", args[3])
+        self.assertEqual(("user", "pass"), kwargs["credentials"])
+
+    @patch('TNTGitHook.hook_setup.is_update_needed', MagicMock(return_value=False))
+    @patch('TNTGitHook.agent.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.agent.create_activity')
+    def test_submit_fails_when_the_activity_cannot_be_registered(self, mock_create_activity: MagicMock):
+        mock_create_activity.side_effect = Exception("Invalid credentials")
+
+        status, message = self.submit()
+
+        self.assertEqual("FAIL", status)
+        self.assertIn("Invalid credentials", message)
+
+    @patch('TNTGitHook.hook_setup.is_update_needed', MagicMock(return_value=False))
+    @patch('TNTGitHook.agent.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.agent.create_activity')
+    def test_pre_push_hook_submits_the_push_to_the_agent(self, mock_create_activity: MagicMock):
+        mock_create_activity.side_effect = lambda *args, **kwargs: print("Successfully created activity")
+        commit_msgs = [tuple(self.commits.split(";")), ("79ad7cedb8b2a7085c9203a42d4b9101b4634dc6",
+                                                        "2021-05-07T13:48:22+02:00", "COMMITER 2 <c2@autentia.com>",
+                                                        "Another commit")]
+
+        status, output = agent.submit(f"{self.home.name}/project", "git@github.com:autentia/TNTConcept.git",
+                                      commit_msgs, timeout=5)
+
+        self.assertEqual(("OK", "Successfully created activity"), (status, output))
+        self.assertEqual(commit_msgs, mock_create_activity.call_args[0][2])
+        self.assertEqual("git@github.com:autentia/TNTConcept.git", mock_create_activity.call_args[0][3])
+
+    def test_submit_returns_None_when_the_agent_is_not_running(self):
+        agent.send("STOP")
+        self.thread.join()
+
+        self.assertIsNone(agent.submit(f"{self.home.name}/project", None, [tuple(self.commits.split(";"))], 1))
+
+    @patch('TNTGitHook.hook_setup.is_update_needed', MagicMock(return_value=False))
+    @patch('TNTGitHook.agent.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.agent.create_activity', MagicMock(return_value=None))
+    def test_status_reports_served_requests_hit_rates_and_latency(self):
+        self.submit()
+        self.submit()
+
+        status, message = agent.send("STATUS")
+        report = json.loads(message)
+
+        self.assertEqual("OK", status)
+        self.assertEqual(2, report["requests_served"])
+        self.assertEqual(0.5, report["credentials_hit_rate"])
+        self.assertEqual(1.0, report["catalog_hit_rate"])
+        self.assertGreater(report["p99_ms"], 0)
+        self.assertGreaterEqual(report["p99_ms"], report["p50_ms"])
+
+    def test_stop_removes_the_socket(self):
+        agent.send("STOP")
+        self.thread.join()
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(agent.is_running())
+
+
+if __name__ == '__main__':
+    unittest.main()
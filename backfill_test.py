@@ -0,0 +1,153 @@
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+from datetime import date
+from threading import Thread
+from unittest.mock import patch, MagicMock
+
+from TNTGitHook import backfill, outbox
+from TNTGitHook.backfill import commits_by_day
+from TNTGitHook.hook import Config, PrjConfig
+from benchmarks.stub_server import StubServer
+
+REMOTE = "git@github.com:autentia/TNTConcept.git"
+
+
+class BackfillTestCase(unittest.TestCase):
+
+    home: tempfile.TemporaryDirectory
+    repository: tempfile.TemporaryDirectory
+    prj_config: PrjConfig
+
+    def setUp(self) -> None:
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name})
+        self.env.start()
+        self.repository = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.repository.name)
+        self.git("init", "-q", "-b", "main")
+        self.git("config", "user.email", "commiter1@autentia.com")
+        self.prj_config = PrjConfig()
+        self.prj_config.organization = "Test Organization"
+        self.prj_config.project = "Test Project"
+        self.prj_config.role = "Test Role"
+        self.prj_config.role_id = 0
+        self.prj_config.catalog_fingerprint = self.prj_config.names_fingerprint()
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        self.repository.cleanup()
+        self.env.stop()
+        self.home.cleanup()
+
+    def git(self, *args, author_date: str = None, author: str = "COMMITER 1 <commiter1@autentia.com>") -> str:
+        name, email = author[:-1].split(" <")
+        env = dict(os.environ, GIT_AUTHOR_NAME=name, GIT_AUTHOR_EMAIL=email,
+                   GIT_COMMITTER_NAME=name, GIT_COMMITTER_EMAIL=email)
+        if author_date:
+            env.update(GIT_AUTHOR_DATE=author_date, GIT_COMMITTER_DATE=author_date)
+        return subprocess.run(["git"] + list(args), env=env, check=True, capture_output=True, text=True).stdout.strip()
+
+    def commit(self, message: str, author_date: str, author: str = "COMMITER 1 <commiter1@autentia.com>") -> str:
+        self.git("commit", "-q", "--allow-empty", "-m", message, author_date=author_date, author=author)
+        return self.git("rev-parse", "HEAD")
+
+    def commit_days(self, days: int):
+        for day in range(1, days + 1):
+            self.commit(f"Morning {day}", f"2026-01-{day:02d}T09:00:00+01:00")
+            self.commit(f"Evening {day}", f"2026-01-{day:02d}T18:00:00+01:00")
+
+    def test_commits_are_grouped_by_author_day_oldest_first(self):
+        before = self.commit("Before", "2025-12-31T23:00:00+01:00")
+        first = self.commit("First", "2026-01-01T09:00:00+01:00")
+        second = self.commit("Second", "2026-01-01T18:00:00+01:00")
+        third = self.commit("Third", "2026-01-03T10:00:00+01:00")
+        self.commit("After", "2026-01-04T10:00:00+01:00")
+
+        days = commits_by_day(date(2026, 1, 1), date(2026, 1, 3))
+
+        self.assertNotIn(before, [commit_msg[0] for commit_msgs in days.values() for commit_msg in commit_msgs])
+        self.assertEqual({date(2026, 1, 1): [first, second], date(2026, 1, 3): [third]},
+                         {day: [commit_msg[0] for commit_msg in commit_msgs] for day, commit_msgs in days.items()})
+
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.hook.create_activity')
+    def test_only_the_commits_of_the_git_user_are_registered(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=200)
+        mine = self.commit("Mine", "2026-01-01T09:00:00+01:00")
+        self.commit("Colleague", "2026-01-01T10:00:00+01:00", author="COLLEAGUE <colleague@autentia.com>")
+        self.commit("Colleague", "2026-01-02T10:00:00+01:00", author="COLLEAGUE <colleague@autentia.com>")
+
+        registered, _, _ = backfill.backfill(Config.config(debug=True), self.prj_config, date(2026, 1, 1), date(2026, 1, 2),
+                                             REMOTE)
+
+        self.assertEqual(1, registered)
+        self.assertEqual([mine], [commit_msg[0] for commit_msg in mock_create_activity.call_args[0][2]])
+        registered, _, _ = backfill.backfill(Config.config(debug=True), self.prj_config, date(2026, 1, 1), date(2026, 1, 2),
+                                             REMOTE, author="colleague@autentia.com")
+        self.assertEqual(2, registered)
+
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.hook.create_activity')
+    def test_interrupted_backfill_does_not_submit_finished_days_again(self, mock_create_activity: MagicMock):
+        self.commit_days(3)
+        mock_create_activity.side_effect = lambda *args, day, **kwargs: \
+            MagicMock(status_code=500 if day == date(2026, 1, 2) else 200)
+
+        result = backfill.backfill(Config.config(debug=True), self.prj_config, date(2026, 1, 1), date(2026, 1, 31),
+                                   REMOTE)
+
+        self.assertEqual((2, 0, 1), result)
+        mock_create_activity.reset_mock()
+        mock_create_activity.side_effect = None
+        mock_create_activity.return_value = MagicMock(status_code=200)
+
+        result = backfill.backfill(Config.config(debug=True), self.prj_config, date(2026, 1, 1), date(2026, 1, 31),
+                                   REMOTE)
+
+        self.assertEqual((1, 2, 0), result)
+        self.assertEqual([date(2026, 1, 2)], [call.kwargs["day"] for call in mock_create_activity.call_args_list])
+
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.hook.create_activity')
+    def test_day_waits_for_the_push_updating_its_activity(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=200)
+        self.commit_days(1)
+
+        with outbox.group_locked(date(2026, 1, 1), self.prj_config):
+            worker = Thread(target=backfill.backfill, args=(Config.config(debug=True), self.prj_config,
+                                                            date(2026, 1, 1), date(2026, 1, 1), REMOTE))
+            worker.start()
+            worker.join(0.2)
+            mock_create_activity.assert_not_called()
+        worker.join()
+
+        mock_create_activity.assert_called_once()
+
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('builtins.print', MagicMock())
+    def test_days_are_registered_in_parallel_against_a_stub_server(self):
+        days = 16
+        latency = 0.05
+        self.commit_days(days)
+        with StubServer(latency=latency) as server:
+            config = Config(baseURL=server.base_url, authURL=server.auth_url, basic_auth="")
+            start = time.perf_counter()
+            result = backfill.backfill(config, self.prj_config, date(2026, 1, 1), date(2026, 1, 31), REMOTE)
+            elapsed = time.perf_counter() - start
+            config.transport.close()
+
+        throughput = days / elapsed
+        # Sequentially, every day waits for the day activities and the POST
+        sequential_throughput = 1 / (2 * latency)
+        self.assertEqual((days, 0, 0), result)
+        self.assertEqual(2 * days, server.requests)
+        self.assertGreater(throughput, 2 * sequential_throughput,
+                           f"{throughput:.1f} days/s, sequential {sequential_throughput:.1f} days/s")
+
+
+if __name__ == '__main__':
+    unittest.main()
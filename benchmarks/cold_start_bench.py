@@ -0,0 +1,104 @@
+"""Checks the cold start of the push hot path against a time budget.
+
+Measures the cumulative `-X importtime` of the TNTGitHook package, checks that requests and keyring are not imported by
+it, and times a complete `--commit-msgs-file` run in a fresh interpreter (async mode, without spawning the worker, so
+nothing is sent to TNT). Fails if any budget is exceeded.
+
+    python -m benchmarks.cold_start_bench [--runs 5]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_BUDGET_MS = 75
+COLD_START_BUDGET_MS = 250
+# Modules that only the network or credentials paths need
+LAZY_MODULES = ["requests", "urllib3", "keyring", "concurrent.futures", "subprocess"]
+
+COMMITS = "b287b94c4fdcccc426f828bd5e15e62139e0223f;2020-05-27T13:20:21+02:00;" \
+          "COMMITER 1 <commiter1@autentia.com>;Initial commit\n"
+
+HOT_PATH_SCRIPT = """
+import sys
+import TNTGitHook
+import TNTGitHook.spool
+TNTGitHook.spool.spawn_worker = lambda job_path, debug: None
+sys.argv = ["TNTGitHook"] + sys.argv[1:]
+TNTGitHook.main()
+"""
+
+
+def import_time_ms() -> float:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import TNTGitHook"],
+                            capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| TNTGitHook$", line)
+        if match:
+            return int(match.group(1)) / 1000
+    raise RuntimeError("TNTGitHook not found in -X importtime output")
+
+
+def eagerly_imported_modules() -> list:
+    script = f"import sys, TNTGitHook; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def cold_start_ms(workdir: str) -> float:
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, HOME=workdir, PYTHONPATH=project_root)
+    args = [sys.executable, "-c", HOT_PATH_SCRIPT,
+            "--commit-msgs-file", f"{workdir}/commits",
+            "--config", f"{workdir}/TNTGitHookConfig.json",
+            "--remote", "git@github.com:autentia/TNTConcept.git"]
+    start = time.perf_counter()
+    subprocess.run(args, env=env, cwd=workdir, capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def prepare_workdir(workdir: str) -> None:
+    with open(f"{workdir}/commits", "w") as commits:
+        commits.write(COMMITS)
+    with open(f"{workdir}/TNTGitHookConfig.json", "w") as prj_config:
+        json.dump({"organization": "Test Organization", "project": "Test Project", "role": "Test Role",
+                   "async_submission": True}, prj_config)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    failures = []
+    import_time = min(import_time_ms() for _ in range(args.runs))
+    print(f"import TNTGitHook: {import_time:.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+    if import_time > IMPORT_BUDGET_MS:
+        failures.append("import time")
+
+    eager = eagerly_imported_modules()
+    print(f"lazy modules imported on startup: {', '.join(eager) or 'none'}")
+    if eager:
+        failures.append("eager imports")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir)
+        # First run writes the hook script and compiles bytecode, it is not part of the measure
+        cold_start_ms(workdir)
+        cold_start = min(cold_start_ms(workdir) for _ in range(args.runs))
+    print(f"cold start --commit-msgs-file: {cold_start:.1f} ms (budget {COLD_START_BUDGET_MS} ms)")
+    if cold_start > COLD_START_BUDGET_MS:
+        failures.append("cold start")
+
+    if failures:
+        print(f"Budget exceeded: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Measures create_activity wall time against a stub server with injected latency.
+
+The sequential time is the sum of every injected delay (one per request plus the keyring access), the critical path is
+the longest chain of dependent calls. The benchmark fails if create_activity takes noticeably longer than the critical
+path.
+
+    python -m benchmarks.create_activity_bench [--latency 0.1] [--keyring-latency 0.1] [--runs 5] [--pinned]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from TNTGitHook.hook import Config, PrjConfig, create_activity
+from benchmarks.stub_server import StubServer
+
+CRITICAL_PATH_TOLERANCE = 1.25
+
+
+def prj_config(pinned: bool) -> PrjConfig:
+    result = PrjConfig()
+    result.organization = "Test Organization"
+    result.project = "Test Project"
+    result.role = "Test Role"
+    if pinned:
+        result.role_id = 0
+        result.catalog_fingerprint = result.names_fingerprint()
+    return result
+
+
+def run(server: StubServer, keyring_latency: float, pinned: bool) -> (float, int):
+    def slow_credentials():
+        time.sleep(keyring_latency)
+        return "user", "pass"
+
+    config = Config(baseURL=server.base_url, authURL=server.auth_url, basic_auth="")
+    requests_before = server.requests
+    # A new commit on every run, as the stub server keeps the activity and would find it already registered
+    commit_msgs = [(f"{requests_before:040x}", "2020-05-27T13:20:21+02:00", "COMMITER 1 <commiter1@autentia.com>",
+                    "Initial commit")]
+    with patch("TNTGitHook.hook.retrieve_keychain_credentials", slow_credentials), patch("builtins.print"):
+        start = time.perf_counter()
+        create_activity(config, prj_config(pinned), commit_msgs, None)
+        elapsed = time.perf_counter() - start
+    config.transport.close()
+    return elapsed, server.requests - requests_before
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds added to every stub response")
+    parser.add_argument("--keyring-latency", type=float, default=0.1, help="Seconds added to the keyring access")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--pinned", action="store_true", help="Use pinned catalog IDs, so no lookups are done")
+    args = parser.parse_args(argv)
+
+    # The activities mirror of the runs is kept apart from the user's one
+    with StubServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as home, \
+            patch.dict(os.environ, {"HOME": home}):
+        timings = []
+        requests_per_run = 0
+        for _ in range(args.runs):
+            elapsed, requests_per_run = run(server, args.keyring_latency, args.pinned)
+            timings.append(elapsed)
+
+    sequential = requests_per_run * args.latency + args.keyring_latency
+    # keyring -> activities GET runs alongside organization -> project -> role (skipped when pinned), then the POST
+    lookups = 0 if args.pinned else 3 * args.latency
+    critical_path = max(args.keyring_latency + args.latency, lookups) + args.latency
+    best = min(timings)
+    print(f"requests per push: {requests_per_run}")
+    print(f"sequential (sum of calls): {sequential * 1000:.0f} ms")
+    print(f"critical path: {critical_path * 1000:.0f} ms")
+    print(f"create_activity (best of {args.runs}): {best * 1000:.0f} ms")
+    print(f"gain over sequential: {(sequential - best) * 1000:.0f} ms")
+    return 0 if best < critical_path * CRITICAL_PATH_TOLERANCE else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Measures the memory held by the decoded activities of the day listings in resources/.
+
+The listings are repeated to get a stable figure, and the memory retained by parse_activities (and its peak while
+decoding) is reported per activity.
+
+    python -m benchmarks.entity_memory_bench [--copies 1000]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from typing import List
+
+from TNTGitHook.hook import parse_activities
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LISTINGS = ["example_activities", "resources/other_activities.json", "resources/other_activities_with_several_repos.json"]
+
+
+def listing_days() -> List[dict]:
+    days = []
+    for listing in LISTINGS:
+        with open(os.path.join(PROJECT_ROOT, listing)) as listing_file:
+            days += json.load(listing_file)
+    return days
+
+
+def measure(copies: int) -> (int, float, float):
+    """Activities decoded, bytes retained per activity and peak bytes per activity"""
+    body = json.dumps(listing_days() * copies)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        activities = parse_activities(body)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return len(activities), retained / len(activities), peak / len(activities)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=1000, help="Times the listings are repeated")
+    args = parser.parse_args(argv)
+
+    count, retained, peak = measure(args.copies)
+    print(f"{count} activities: {retained:.0f} bytes retained per activity, {peak:.0f} bytes peak per activity")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
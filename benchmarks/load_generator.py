@@ -0,0 +1,114 @@
+"""Simulates developers pushing concurrently against the stub server, through the real entry point in a new interpreter.
+
+Every developer has its own home directory (credentials session, tokens, mirror and outbox) and project, and pushes a
+new commit each time. The push overhead is the wall time of the whole process, as the developer waits for it.
+
+    python -m benchmarks.load_generator [--developers 10] [--pushes 5] [--latency 0.05] [--jitter 0]
+                                        [--error-rate 0] [--drop-rate 0] [--activities 20] [--catalog-size 1]
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple
+
+from benchmarks.stub_server import StubServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Points the entry point to the stub server instead of TNT
+PUSH_SCRIPT = """
+import sys
+import TNTGitHook
+from TNTGitHook.hook import Config
+base_url, auth_url = sys.argv[1:3]
+Config.config = staticmethod(lambda debug: Config(baseURL=base_url, authURL=auth_url, basic_auth="", debug=debug))
+sys.argv = ["TNTGitHook"] + sys.argv[3:]
+TNTGitHook.main()
+"""
+
+
+class Push(NamedTuple):
+    developer: int
+    seconds: float
+    returncode: int
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def prepare_developer(workdir: str, developer: int) -> dict:
+    home = f"{workdir}/developer-{developer}"
+    os.makedirs(f"{home}/.tnt/hook/run")
+    # Credentials come from the session cache, so no keyring is needed
+    with open(f"{home}/.tnt/hook/run/credentials_session.json", "w") as session:
+        json.dump({"username": f"developer-{developer}", "password": "pass", "expires_at": time.time() + 3600},
+                  session)
+    with open(f"{home}/TNTGitHookConfig.json", "w") as prj_config:
+        json.dump({"organization": "Test Organization", "project": "Test Project", "role": "Test Role"}, prj_config)
+    return dict(os.environ, HOME=home, XDG_RUNTIME_DIR="", TNT_HOOK_CREDENTIALS_TTL="3600", PYTHONPATH=PROJECT_ROOT)
+
+
+def push(server: StubServer, env: dict, developer: int, number: int) -> Push:
+    commit = f"{developer * 100000 + number:040x};2026-01-15T10:00:00+01:00;" \
+             f"DEVELOPER {developer} <developer{developer}@autentia.com>;Change {number}"
+    args = [sys.executable, "-c", PUSH_SCRIPT, server.base_url, server.auth_url,
+            "--commit-msgs", commit,
+            "--config", f"{env['HOME']}/TNTGitHookConfig.json",
+            "--remote", f"git@github.com:autentia/repository-{developer}.git"]
+    start = time.perf_counter()
+    result = subprocess.run(args, env=env, cwd=env["HOME"], capture_output=True)
+    return Push(developer, time.perf_counter() - start, result.returncode)
+
+
+def run(server: StubServer, developers: int, pushes: int) -> List[Push]:
+    """Every developer pushes sequentially, and all developers at the same time"""
+    with tempfile.TemporaryDirectory() as workdir:
+        envs = [prepare_developer(workdir, developer) for developer in range(developers)]
+
+        def developer_pushes(developer: int) -> List[Push]:
+            return [push(server, envs[developer], developer, number) for number in range(pushes)]
+
+        with ThreadPoolExecutor(max_workers=developers) as executor:
+            return [result for results in executor.map(developer_pushes, range(developers)) for result in results]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--developers", type=int, default=10)
+    parser.add_argument("--pushes", type=int, default=5, help="Pushes of each developer")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every stub response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Ratio of 503 responses")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Ratio of requests dropped without response")
+    parser.add_argument("--activities", type=int, default=20, help="Other activities of every developer each day")
+    parser.add_argument("--catalog-size", type=int, default=1, help="Organizations, projects and roles in TNT")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with StubServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, drop_rate=args.drop_rate,
+                    activities=args.activities, catalog_size=args.catalog_size, seed=args.seed) as server:
+        start = time.perf_counter()
+        results = run(server, args.developers, args.pushes)
+        elapsed = time.perf_counter() - start
+
+    timings = [result.seconds * 1000 for result in results]
+    failed = sum(1 for result in results if result.returncode != 0)
+    print(f"{len(results)} pushes of {args.developers} developers in {elapsed:.1f} s, {failed} failed")
+    print(f"push overhead: p50 {percentile(timings, 50):.0f} ms, p95 {percentile(timings, 95):.0f} ms, "
+          f"p99 {percentile(timings, 99):.0f} ms, max {max(timings):.0f} ms")
+    print(f"server requests per push: {server.requests / len(results):.2f}")
+    for endpoint, count in sorted(server.endpoint_requests.items()):
+        print(f"  {endpoint}: {count / len(results):.2f}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
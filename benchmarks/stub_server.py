@@ -0,0 +1,171 @@
+"""Local stand-in for the TNT API endpoints used by the hook, with injected latency, errors and dataset sizes.
+
+Posted activities are kept in memory, so the day activities and single activity requests of later pushes find them
+like in TNT.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+
+ORGANIZATIONS = [{"id": 0, "name": "Test Organization"}]
+PROJECTS = [{"id": 0, "name": "Test Project", "open": True, "billable": False}]
+ROLES = [{"id": 0, "name": "Test Role"}]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer the response so headers and body go out in one segment, avoiding delayed ACK stalls on keep-alive
+    wbufsize = -1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path
+        if self.is_dropped():
+            return
+        if path.endswith("/organization"):
+            self.reply(200, self.server.organizations, "organization")
+        elif re.search(r"/organization/\d+/project$", path):
+            self.reply(200, self.server.projects, "project")
+        elif re.search(r"/project/\d+/role$", path):
+            self.reply(200, self.server.roles, "role")
+        elif path.endswith("/activity/"):
+            query = parse_qs(url.query)
+            self.reply(200, self.server.day_activities(query.get("startDate", [""])[0], query.get("user", [""])[0]),
+                       "activities")
+        elif re.search(r"/activity/\d+$", path):
+            activity = self.server.activities.get(int(path.rsplit("/", 1)[1]))
+            self.reply(200 if activity else 404, activity or {}, "activity")
+        else:
+            self.reply(404, {}, "unknown")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.is_dropped():
+            return
+        if path.endswith("/activity"):
+            self.reply(200, self.server.store_activity(json.loads(body or b"{}")), "post activity")
+        elif path.endswith("/oauth/token"):
+            self.reply(200, {"access_token": "stub", "token_type": "bearer", "expires_in": 1799}, "token")
+        else:
+            self.reply(404, {}, "unknown")
+
+    def is_dropped(self) -> bool:
+        """Closes the connection without response, like a lost packet that times out in the client"""
+        if self.server.drop_rate and self.server.random() < self.server.drop_rate:
+            self.server.count("dropped")
+            self.close_connection = True
+            return True
+        return False
+
+    def reply(self, status: int, payload, endpoint: str):
+        self.server.count(endpoint)
+        time.sleep(self.server.delay())
+        if self.server.error_rate and self.server.random() < self.server.error_rate:
+            status, payload = 503, {}
+        body = json.dumps(payload).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, drop_rate: float = 0.0,
+                 activities: int = 0, catalog_size: int = 1, seed: int = None, port: int = 0):
+        """
+        :param latency: Seconds added to every response, plus up to jitter seconds
+        :param error_rate: Ratio of responses replaced by a 503
+        :param drop_rate: Ratio of requests whose connection is closed without response
+        :param activities: Activities of other projects returned with the day activities of every user
+        :param catalog_size: Organizations, projects and roles returned by the catalog endpoints
+        """
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.filler_activities = activities
+        self.organizations = ORGANIZATIONS + [{"id": index, "name": f"Organization {index}"}
+                                              for index in range(1, catalog_size)]
+        self.projects = PROJECTS + [{"id": index, "name": f"Project {index}", "open": True, "billable": False}
+                                    for index in range(1, catalog_size)]
+        self.roles = ROLES + [{"id": index, "name": f"Role {index}"} for index in range(1, catalog_size)]
+        self.activities = {}
+        self.requests = 0
+        self.endpoint_requests = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def delay(self) -> float:
+        return self.latency + (self.random() * self.jitter if self.jitter else 0.0)
+
+    def count(self, endpoint: str) -> None:
+        with self._lock:
+            self.endpoint_requests[endpoint] += 1
+            if endpoint != "dropped":
+                self.requests += 1
+
+    def store_activity(self, request: dict) -> dict:
+        role = next((role for role in self.roles if role["id"] == request.get("projectRoleId")), ROLES[0])
+        with self._lock:
+            activity_id = request.get("id")
+            if activity_id is None:
+                activity_id = len(self.activities) + 1
+            activity = {"id": activity_id,
+                        "startDate": request.get("startDate"),
+                        "duration": request.get("duration", 0),
+                        "description": request.get("description", ""),
+                        "billable": request.get("billable", False),
+                        "userName": request.get("userName"),
+                        "organization": self.organizations[0] if role["id"] == 0 else self.organizations[-1],
+                        "project": self.projects[0] if role["id"] == 0 else self.projects[-1],
+                        "projectRole": role}
+            self.activities[activity_id] = activity
+        return activity
+
+    def day_activities(self, day: str, user: str) -> list:
+        filler = [{"id": -index,
+                   "startDate": f"{day}T09:00:00",
+                   "duration": 60,
+                   "description": f"Meeting number {index}",
+                   "billable": False,
+                   "organization": self.organizations[-1],
+                   "project": self.projects[-1],
+                   "projectRole": self.roles[-1]} for index in range(1, self.filler_activities + 1)]
+        with self._lock:
+            stored = [activity for activity in self.activities.values()
+                      if activity["userName"] == user and str(activity["startDate"]).startswith(day)]
+        return [{"date": day, "workedMinutes": 60 * len(filler), "activities": filler + stored}]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api-hook/"
+
+    @property
+    def auth_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/oauth/token"
+
+    def __enter__(self):
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from TNTGitHook import credentials
+from TNTGitHook.exceptions import NoCredentialsError
+
+
+class CredentialsTestCase(unittest.TestCase):
+
+    home: tempfile.TemporaryDirectory
+
+    def setUp(self) -> None:
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name, "XDG_RUNTIME_DIR": ""})
+        self.env.start()
+        credentials.clear_credentials_cache()
+
+    def tearDown(self) -> None:
+        credentials.clear_credentials_cache()
+        self.env.stop()
+        self.home.cleanup()
+
+    @patch('keyring.delete_password')
+    @patch('keyring.get_password')
+    def test_credentials_are_read_from_keyring_once_per_process(self, mock_get_password: MagicMock,
+                                                                 mock_delete_password: MagicMock):
+        mock_get_password.return_value = "user:pass"
+
+        first = credentials.retrieve_credentials()
+        second = credentials.retrieve_credentials()
+
+        self.assertEqual(("user", "pass"), first)
+        self.assertEqual(first, second)
+        mock_get_password.assert_called_once()
+        self.assertIn("keyring_get", credentials.timings)
+        self.assertIn("memoized reads", credentials.timings_report())
+
+    @patch('keyring.delete_password')
+    @patch('keyring.get_password')
+    def test_legacy_cleanup_is_only_attempted_until_recorded(self, mock_get_password: MagicMock,
+                                                             mock_delete_password: MagicMock):
+        mock_get_password.return_value = "user:pass"
+
+        credentials.retrieve_credentials()
+        credentials.clear_credentials_cache()
+        credentials.retrieve_credentials()
+
+        self.assertTrue(credentials.is_migration_recorded())
+        self.assertEqual(2, mock_delete_password.call_count)
+
+    @patch('keyring.delete_password')
+    @patch('keyring.get_password')
+    def test_session_cache_is_shared_between_processes_when_ttl_is_set(self, mock_get_password: MagicMock,
+                                                                       mock_delete_password: MagicMock):
+        mock_get_password.return_value = "user:pass"
+        with patch.dict(os.environ, {credentials.SESSION_TTL_ENV: "60"}):
+            credentials.retrieve_credentials()
+            # Simulates a new process
+            credentials._credentials = None
+            result = credentials.retrieve_credentials()
+
+            self.assertEqual(0o600, os.stat(credentials.session_cache_path()).st_mode & 0o777)
+        self.assertEqual(("user", "pass"), result)
+        mock_get_password.assert_called_once()
+
+    @patch('keyring.delete_password')
+    @patch('keyring.get_password')
+    def test_session_cache_is_not_written_by_default(self, mock_get_password: MagicMock,
+                                                     mock_delete_password: MagicMock):
+        mock_get_password.return_value = "user:pass"
+
+        credentials.retrieve_credentials()
+
+        self.assertFalse(os.path.exists(credentials.session_cache_path()))
+
+    @patch('keyring.set_password')
+    @patch('keyring.delete_password')
+    @patch('keyring.get_password')
+    def test_missing_credentials_raise_error(self, mock_get_password: MagicMock, mock_delete_password: MagicMock,
+                                             mock_set_password: MagicMock):
+        mock_get_password.return_value = None
+
+        self.assertRaises(NoCredentialsError, credentials.retrieve_credentials)
+
+
+if __name__ == '__main__':
+    unittest.main()
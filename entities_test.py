@@ -0,0 +1,42 @@
+import json
+import unittest
+from datetime import datetime
+
+from TNTGitHook.entities import Activity, CreateActivityRequest, Organization, Project, Role
+
+
+class EntitiesTestCase(unittest.TestCase):
+
+    def test_activity_from_json_builds_its_nested_entities(self):
+        with open('example_activities') as example_activities:
+            obj = json.load(example_activities)[0]["activities"][0]
+
+        activity = Activity.from_json(obj)
+
+        self.assertEqual((250112, "2021-05-06T08:00:00", 0), (activity.id, activity.startDate, activity.duration))
+        self.assertIsInstance(activity.organization, Organization)
+        self.assertEqual(Project(47, "i+d - Desarrollo TNT Concept", True, False).to_json(), activity.project.to_json())
+        self.assertEqual(Role(10, "desarrollo").to_json(), activity.projectRole.to_json())
+        self.assertFalse(hasattr(activity, "__dict__"))
+
+    def test_activity_to_json_is_the_inverse_of_from_json(self):
+        obj = {"id": 1, "startDate": "2026-01-15T05:00:00", "duration": 0, "description": "Evidence", "billable": False,
+               "organization": {"id": 2, "name": "Organization"},
+               "project": {"id": 3, "name": "Project", "open": True, "billable": False},
+               "projectRole": {"id": 4, "name": "Role"}}
+
+        self.assertEqual(obj, Activity.from_json(obj).to_json())
+        self.assertIsNone(Activity.from_json({"id": 1}).organization)
+
+    def test_create_activity_request_to_json_omits_the_id_of_new_activities(self):
+        request = CreateActivityRequest(description="Evidence", startDate=datetime(2026, 1, 15, 5), duration=0,
+                                        billable=False, projectRoleId=4, userName="user")
+
+        self.assertEqual({"description": "Evidence", "startDate": "2026-01-15T05:00:00", "duration": 0,
+                          "billable": False, "projectRoleId": 4, "userName": "user"}, request.to_json())
+        request.id = 1
+        self.assertEqual(1, request.to_json()["id"])
+
+
+if __name__ == '__main__':
+    unittest.main()
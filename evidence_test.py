@@ -0,0 +1,152 @@
+import hashlib
+import json
+import unittest
+from datetime import date
+
+from TNTGitHook import parse_commit_messages
+from TNTGitHook.entities import Activity
+from TNTGitHook.evidence import EvidenceDocument, EVIDENCE_PREFIX, TRUNCATION_MARK, fair_shares
+from TNTGitHook.hook import generate_info, parse_activities, TNT_DESCRIPTION_MAX_SIZE
+
+COMMIT = ("b287b94c4fdcccc426f828bd5e15e62139e0223f", "2020-05-27T13:20:21+02:00",
+          "COMMITER 1 <commiter1@autentia.com>", "Initial commit")
+OTHER_COMMIT = ("c3a1e2bbf0a6b83e0a8b3e1f3c2f1d4c5b6a7980", "2020-05-27T14:20:21+02:00",
+                "COMMITER 2 <commiter2@autentia.com>", "Second commit")
+
+
+class EvidenceTestCase(unittest.TestCase):
+
+    def test_generate_info_should_match_the_descriptions_generated_by_previous_versions(self):
+        with open("resources/new_branch_commits") as commits:
+            commit_msgs = parse_commit_messages(commits.read())
+        with open("resources/generated_evidences.json") as generated_evidences:
+            cases = json.load(generated_evidences)
+
+        for case in cases:
+            with self.subTest(source=case["source"], activity=case["activity"], remote=case["remote"]):
+                activity = None
+                if case["source"] is not None:
+                    with open(case["source"]) as activities:
+                        activity = parse_activities(activities.read())[case["activity"]]
+                info = generate_info(commit_msgs, activity, case["remote"], date(2021, 5, 27))
+                self.assertEqual(case["description"], info[0])
+
+    def test_parse_and_render_should_keep_the_description(self):
+        descriptions = [EVIDENCE_PREFIX,
+                        f"{EVIDENCE_PREFIX}\ngit@github.com:autentia/TNTConcept.git\n" + "\n".join(COMMIT),
+                        f"Text written by the user\n{EVIDENCE_PREFIX}\n\n{EVIDENCE_PREFIX}\nremote\n-----\n"]
+        for description in descriptions:
+            self.assertEqual(description, EvidenceDocument.parse(description).render())
+
+    def test_should_add_commits_to_the_section_of_the_remote(self):
+        document = EvidenceDocument.parse(f"{EVIDENCE_PREFIX}\nremote A\n" + "\n".join(COMMIT) +
+                                          f"\n{EVIDENCE_PREFIX}\nremote B\n")
+        document.add_commits("remote B\n", [OTHER_COMMIT])
+
+        self.assertEqual(2, len(document.sections))
+        self.assertEqual(1, len(document.find_section("remote A\n").entries))
+        self.assertEqual(2, len(document.find_section("remote B\n").entries))
+
+    def test_should_skip_commits_already_registered(self):
+        description = f"{EVIDENCE_PREFIX}\nremote A\n" + "\n".join(COMMIT)
+        document = EvidenceDocument.parse(description)
+        document.add_commits("remote A\n", [COMMIT, OTHER_COMMIT, OTHER_COMMIT])
+
+        self.assertEqual(description + "\n-----\n" + "\n".join(OTHER_COMMIT), document.render())
+
+    def test_should_leave_the_description_untouched_when_every_commit_is_registered(self):
+        activity = Activity()
+        activity.description = f"{EVIDENCE_PREFIX}\nremote A\n" + "\n".join(COMMIT)
+        info = generate_info([COMMIT], activity, "remote B", date(2021, 5, 27))
+
+        self.assertEqual(activity.description, info[0])
+
+    def test_should_keep_user_text_before_the_first_section(self):
+        activity = Activity()
+        activity.description = f"Text written by the user\n{EVIDENCE_PREFIX}\nremote A\n" + "\n".join(COMMIT)
+        info = generate_info([OTHER_COMMIT], activity, "remote A", date(2021, 5, 27))
+
+        self.assertTrue(info[0].startswith(f"Text written by the user\n{EVIDENCE_PREFIX}\nremote A\n"))
+        self.assertEqual(1, info[0].count(EVIDENCE_PREFIX))
+
+    def test_compact_evidence_should_write_date_and_author_once(self):
+        info = generate_info([COMMIT, OTHER_COMMIT], None, "remote A", date(2021, 5, 27), compact=True)
+
+        self.assertEqual(f"{EVIDENCE_PREFIX}\nremote A\n2020-05-27\n~COMMITER 1\nb287b94c 13:20 Initial commit\n"
+                         f"~COMMITER 2\nc3a1e2bb 14:20 Second commit", info[0])
+
+    def test_compact_evidence_should_skip_commits_already_registered(self):
+        activity = Activity()
+        activity.description = generate_info([COMMIT], None, "remote A", date(2021, 5, 27), compact=True)[0]
+        info = generate_info([COMMIT, OTHER_COMMIT], activity, "remote A", date(2021, 5, 27), compact=True)
+
+        self.assertEqual(activity.description + "\n-----\n2020-05-27\n~COMMITER 2\nc3a1e2bb 14:20 Second commit",
+                         info[0])
+        self.assertEqual({COMMIT[0][:8], OTHER_COMMIT[0][:8]}, EvidenceDocument.parse(info[0]).shas)
+
+    def test_compact_evidence_should_roll_up_the_commits_that_do_not_fit(self):
+        commit_msgs = [(hashlib.sha1(str(i).encode()).hexdigest(), "2021-05-27T13:20:21+02:00",
+                        "COMMITER 1 <commiter1@autentia.com>", f"Commit-number-{i}") for i in range(200)]
+        info = generate_info(commit_msgs, None, "remote A", date(2021, 5, 27), compact=True)
+
+        self.assertLessEqual(len(info[0]), TNT_DESCRIPTION_MAX_SIZE + len(TRUNCATION_MARK))
+        # The ends of the rolled up range are registered too
+        listed = len(EvidenceDocument.parse(info[0]).shas) - 2
+        self.assertTrue(info[0].endswith(f"\n+{200 - listed} more commits "
+                                         f"({commit_msgs[listed][0][:8]}..{commit_msgs[-1][0][:8]})"))
+        self.assertEqual(info[0], generate_info(commit_msgs, None, "remote A", date(2021, 5, 27), compact=True)[0])
+
+    def test_compact_evidence_should_add_the_commits_of_later_pushes_to_the_rollup(self):
+        commit_msgs = [(hashlib.sha1(str(i).encode()).hexdigest(), "2021-05-27T13:20:21+02:00",
+                        "COMMITER 1 <commiter1@autentia.com>", f"Commit-number-{i}") for i in range(300)]
+        activity = Activity()
+        activity.description = generate_info(commit_msgs[:200], None, "remote A", date(2021, 5, 27), compact=True)[0]
+        listed = len(EvidenceDocument.parse(activity.description).shas) - 2
+
+        info = generate_info(commit_msgs[150:], activity, "remote A", date(2021, 5, 27), compact=True)
+
+        self.assertNotIn(TRUNCATION_MARK, info[0])
+        self.assertEqual(activity.description.rpartition("\n")[0], info[0].rpartition("\n")[0])
+        self.assertTrue(info[0].endswith(f"\n+{300 - listed} more commits "
+                                         f"({commit_msgs[listed][0][:8]}..{commit_msgs[-1][0][:8]})"))
+        activity.description = info[0]
+        self.assertEqual(info[0], generate_info(commit_msgs[listed:], activity, "remote A", date(2021, 5, 27),
+                                                compact=True)[0])
+
+    def test_compact_section_over_its_share_should_roll_up_the_commits_instead_of_cutting_them(self):
+        commit_msgs = [(hashlib.sha1(str(i).encode()).hexdigest(), "2021-05-27T13:20:21+02:00",
+                        "COMMITER 1 <commiter1@autentia.com>", f"Commit-number-{i}") for i in range(201)]
+        activity = Activity()
+        activity.description = generate_info(commit_msgs[:200], None, "remote A", date(2021, 5, 27), compact=True)[0]
+        activity.description = generate_info([COMMIT], activity, "remote B", date(2021, 5, 27), compact=True)[0]
+
+        section_a = activity.description.split(f"\n{EVIDENCE_PREFIX}\nremote B\n")[0]
+        self.assertNotIn(TRUNCATION_MARK, activity.description)
+        self.assertLessEqual(len(activity.description), TNT_DESCRIPTION_MAX_SIZE)
+        listed = len(EvidenceDocument.parse(section_a).shas) - 2
+        self.assertTrue(section_a.endswith(f"\n+{200 - listed} more commits "
+                                           f"({commit_msgs[listed][0][:8]}..{commit_msgs[199][0][:8]})"))
+
+        info = generate_info(commit_msgs[200:], activity, "remote A", date(2021, 5, 27), compact=True)
+
+        self.assertIn(f"\n+{201 - listed} more commits ({commit_msgs[listed][0][:8]}..{commit_msgs[200][0][:8]})\n",
+                      info[0])
+
+    def test_fair_shares_should_split_what_small_sections_leave_among_big_ones(self):
+        self.assertEqual([100, 451, 450], fair_shares([100, 2000, 900], 1001))
+        self.assertEqual([100, 200], fair_shares([100, 200], 1000))
+
+    def test_busy_remote_should_not_crowd_out_the_evidence_of_other_remotes(self):
+        commit_msgs = [(hashlib.sha1(str(i).encode()).hexdigest(), "2021-05-27T13:20:21+02:00",
+                        "COMMITER 1 <commiter1@autentia.com>", f"Commit-number-{i}") for i in range(100)]
+        activity = Activity()
+        activity.description = generate_info(commit_msgs, None, "remote A", date(2021, 5, 27))[0]
+        info = generate_info([COMMIT], activity, "remote B", date(2021, 5, 27))
+
+        self.assertEqual(TNT_DESCRIPTION_MAX_SIZE + len(TRUNCATION_MARK), len(info[0]))
+        self.assertTrue(info[0].endswith(f"{EVIDENCE_PREFIX}\nremote B\n" + "\n".join(COMMIT)))
+        self.assertIn(TRUNCATION_MARK + f"\n{EVIDENCE_PREFIX}\nremote B\n", info[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
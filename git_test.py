@@ -0,0 +1,135 @@
+import io
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from TNTGitHook import git
+from TNTGitHook.git import PushRef, ZERO_SHA, new_ref_revisions, pushed_commits, revisions
+
+
+class GitTestCase(unittest.TestCase):
+
+    repository: tempfile.TemporaryDirectory
+
+    def setUp(self) -> None:
+        self.repository = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.repository.name)
+        self.git("init", "-q", "-b", "main")
+        self.base = self.commit("Initial commit")
+
+    def tearDown(self) -> None:
+        os.chdir(self.cwd)
+        self.repository.cleanup()
+
+    def git(self, *args) -> str:
+        env = dict(os.environ, GIT_AUTHOR_NAME="COMMITER 1", GIT_AUTHOR_EMAIL="commiter1@autentia.com",
+                   GIT_COMMITTER_NAME="COMMITER 1", GIT_COMMITTER_EMAIL="commiter1@autentia.com")
+        return subprocess.run(["git"] + list(args), env=env, check=True, capture_output=True, text=True).stdout.strip()
+
+    def commit(self, message: str) -> str:
+        self.git("commit", "-q", "--allow-empty", "-m", message)
+        return self.git("rev-parse", "HEAD")
+
+    def test_pushed_commits_of_an_existing_remote_branch_oldest_first(self):
+        first = self.commit("First change")
+        second = self.commit("Second change")
+        stdin = io.StringIO(f"refs/heads/main {second} refs/heads/main {self.base}\n")
+
+        commit_msgs = pushed_commits(stdin)
+
+        self.assertEqual([first, second], [commit_msg[0] for commit_msg in commit_msgs])
+        self.assertEqual(("COMMITER 1 <commiter1@autentia.com>", "First-change"), commit_msgs[0][2:])
+
+    def test_pushed_commits_of_a_new_remote_branch_exclude_the_other_branches(self):
+        self.git("checkout", "-q", "-b", "feature")
+        feature = self.commit("Feature")
+        stdin = io.StringIO(f"refs/heads/feature {feature} refs/heads/feature {ZERO_SHA}\n")
+
+        self.assertEqual([feature], [commit_msg[0] for commit_msg in pushed_commits(stdin)])
+
+    def test_pushed_tag_is_registered_with_its_names(self):
+        self.git("tag", "v1")
+        self.git("tag", "-a", "v0", "-m", "Annotated")
+        stdin = io.StringIO(f"refs/tags/v1 {self.base} refs/tags/v1 {ZERO_SHA}\n")
+
+        commit_msgs = pushed_commits(stdin)
+
+        self.assertEqual([(self.base, "tag: v0 v1")], [(commit_msg[0], commit_msg[3]) for commit_msg in commit_msgs])
+
+    def test_nothing_is_registered_when_a_branch_is_deleted(self):
+        self.assertIsNone(pushed_commits(io.StringIO(f"(delete) {ZERO_SHA} refs/heads/main {self.base}\n")))
+        self.assertIsNone(pushed_commits(io.StringIO("")))
+
+    def test_a_single_git_process_is_run_per_push(self):
+        head = self.commit("Change")
+        with patch.object(git.subprocess, "Popen", wraps=subprocess.Popen) as popen:
+            pushed_commits(io.StringIO(f"refs/heads/main {head} refs/heads/main {self.base}\n"))
+
+        self.assertEqual(1, popen.call_count)
+
+    def test_all_the_pushed_refs_are_registered_in_a_walk_per_kind_of_ref(self):
+        main = self.commit("Main change")
+        self.git("checkout", "-q", "-b", "feature")
+        shared = self.commit("Shared change")
+        self.git("checkout", "-q", "-b", "other")
+        other = self.commit("Other change")
+        stdin = io.StringIO(f"refs/heads/main {main} refs/heads/main {self.base}\n"
+                            f"refs/heads/feature {shared} refs/heads/feature {ZERO_SHA}\n"
+                            f"refs/heads/other {other} refs/heads/other {ZERO_SHA}\n")
+        with patch.object(git.subprocess, "Popen", wraps=subprocess.Popen) as popen:
+            commit_msgs = pushed_commits(stdin)
+
+        # Shared commits are logged once, and the new branches being pushed don't exclude each other
+        self.assertEqual([main, shared, other], [commit_msg[0] for commit_msg in commit_msgs])
+        self.assertEqual(2, len([call for call in popen.call_args_list if "log" in call.args[0]]))
+
+    def test_other_local_branches_only_exclude_commits_of_the_new_refs(self):
+        first = self.commit("First change")
+        second = self.commit("Second change")
+        self.git("branch", "dev")
+        self.git("checkout", "-q", "-b", "feature")
+        feature = self.commit("Feature")
+        stdin = io.StringIO(f"refs/heads/main {second} refs/heads/main {self.base}\n"
+                            f"refs/heads/feature {feature} refs/heads/feature {ZERO_SHA}\n")
+
+        self.assertEqual([first, second, feature], [commit_msg[0] for commit_msg in pushed_commits(stdin)])
+
+    def test_deleted_refs_are_ignored_when_others_are_pushed(self):
+        head = self.commit("Change")
+        stdin = io.StringIO(f"(delete) {ZERO_SHA} refs/heads/old {self.base}\n"
+                            f"refs/heads/main {head} refs/heads/main {self.base}\n")
+
+        self.assertEqual([head], [commit_msg[0] for commit_msg in pushed_commits(stdin)])
+
+    def test_new_branch_excludes_the_other_branches_through_stdin(self):
+        self.git("branch", "stale")
+        push_refs = [PushRef("refs/heads/feature", "a" * 40, "refs/heads/feature", ZERO_SHA),
+                     PushRef("refs/heads/main", "b" * 40, "refs/heads/main", "c" * 40)]
+
+        self.assertEqual(["a" * 40, "^" + "b" * 40, "^refs/heads/main", "^refs/heads/stale"],
+                         list(new_ref_revisions(push_refs[:1], push_refs[1:])))
+
+    def test_existing_branches_dont_list_the_local_branches(self):
+        push_refs = [PushRef("refs/heads/main", "b" * 40, "refs/heads/main", "c" * 40)]
+        with patch.object(git.subprocess, "Popen") as popen:
+            self.assertEqual(["b" * 40, "^" + "c" * 40], list(revisions(push_refs)))
+
+        popen.assert_not_called()
+
+    def test_pushed_tags_are_registered_together(self):
+        self.git("tag", "v1")
+        head = self.commit("Change")
+        self.git("tag", "v2")
+        stdin = io.StringIO(f"refs/tags/v1 {self.base} refs/tags/v1 {ZERO_SHA}\n"
+                            f"refs/tags/v2 {head} refs/tags/v2 {ZERO_SHA}\n")
+
+        commit_msgs = pushed_commits(stdin)
+
+        self.assertEqual({(self.base, "tag: v1"), (head, "tag: v2")},
+                         {(commit_msg[0], commit_msg[3]) for commit_msg in commit_msgs})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from TNTGitHook import hook_setup
+from TNTGitHook.hook import get_hook_sha1
+from TNTGitHook.hook_setup import is_update_needed, write_hook
+from TNTGitHook.pre_push import PrePush
+
+
+class HookSetupTestCase(unittest.TestCase):
+
+    home: tempfile.TemporaryDirectory
+
+    def setUp(self) -> None:
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name})
+        self.env.start()
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.home.cleanup()
+
+    def read_manifest(self) -> dict:
+        with open(hook_setup.manifest_path()) as manifest_file:
+            return json.load(manifest_file)
+
+    def test_update_is_needed_when_the_hook_is_not_installed(self):
+        self.assertTrue(is_update_needed())
+
+    def test_written_hook_is_stamped_in_the_manifest(self):
+        write_hook()
+
+        manifest = self.read_manifest()
+        self.assertEqual(hook_setup.VERSION, manifest["version"])
+        self.assertEqual(get_hook_sha1(), manifest["hook_script"]["sha1"])
+        self.assertEqual(os.path.getsize(hook_setup.hook_script_path()), manifest["hook_script"]["size"])
+
+    def test_stamped_hook_is_not_hashed_again(self):
+        write_hook()
+
+        with patch('TNTGitHook.hook.get_hook_sha1') as get_hook_sha1_mock, \
+                patch('TNTGitHook.hook_setup.file_sha1') as file_sha1_mock:
+            self.assertFalse(is_update_needed())
+        get_hook_sha1_mock.assert_not_called()
+        file_sha1_mock.assert_not_called()
+
+    def test_update_is_needed_when_the_hook_is_modified(self):
+        write_hook()
+        with open(hook_setup.hook_script_path(), "a") as hook_script:
+            hook_script.write("\necho modified\n")
+
+        self.assertTrue(is_update_needed())
+
+    def test_touched_hook_is_verified_and_stamped_again(self):
+        write_hook()
+        stamp = self.read_manifest()["hook_script"]
+        os.utime(hook_setup.hook_script_path(), ns=(stamp["mtime_ns"] + 10 ** 9, stamp["mtime_ns"] + 10 ** 9))
+
+        self.assertFalse(is_update_needed())
+        self.assertEqual(stamp["mtime_ns"] + 10 ** 9, self.read_manifest()["hook_script"]["mtime_ns"])
+
+    def test_new_package_version_verifies_the_hook_again(self):
+        write_hook()
+
+        with patch('TNTGitHook.hook_setup.VERSION', "99.0.0"), \
+                patch('TNTGitHook.hook.get_hook_sha1', wraps=get_hook_sha1) as get_hook_sha1_mock:
+            self.assertFalse(is_update_needed())
+            self.assertEqual("99.0.0", self.read_manifest()["version"])
+        get_hook_sha1_mock.assert_called_once()
+
+    def test_modified_pre_push_file_is_reported_on_verification(self):
+        pre_push_path = f"{self.home.name}/pre-push"
+        with open(pre_push_path, "w") as pre_push:
+            pre_push.write(str(PrePush()))
+        write_hook()
+        hook_setup.record_installation(pre_push_path)
+        with open(pre_push_path, "w") as pre_push:
+            pre_push.write("#!/bin/bash\nnpm test")
+
+        with patch('builtins.print') as print_mock:
+            hook_setup.check_pre_push(self.read_manifest(), pre_push_path)
+
+        self.assertIn("run the setup again", print_mock.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
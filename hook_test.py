@@ -5,19 +5,24 @@
 # patch decorator creates a MagicMock. It must be declared using the fully qualified name of the class/function
 # API and documentation: https://docs.python.org/3/library/unittest.mock.html
 
+import hashlib
 import json
+import os
+import tempfile
 import unittest
 import warnings
+from datetime import date
 from typing import List
 from unittest.mock import patch, MagicMock
 
 import httpretty
 
-from TNTGitHook import hook, parse_commit_messages, parse_commit_messages_from_file
+from TNTGitHook import credentials, hook, mirror, parse_commit_messages, parse_commit_messages_from_file, utils
 from TNTGitHook.entities import *
 from TNTGitHook.exceptions import AuthError, NotFoundError, NetworkError, CommitMessagesFileFormatError, \
     CommitMessagesFileNotFoundError, InvalidSetupConfigurationError
-from TNTGitHook.hook import Config, find_automatic_evidence, PrjConfig, parse_activities, generate_info, check_new_setup
+from TNTGitHook.hook import Config, find_automatic_evidence, PrjConfig, parse_activities, generate_info, check_new_setup, \
+    generate_merged_info
 
 
 class HookTestCase(unittest.TestCase):
@@ -44,8 +49,17 @@ class HookTestCase(unittest.TestCase):
         hook.PrjConfig.organization = "Autentia"
         hook.PrjConfig.project = "Desarrollos internos"
         hook.PrjConfig.role = "Desarrollador"
+        # The activities mirror and the credentials session cache are written in the home directory
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name, "XDG_RUNTIME_DIR": ""})
+        self.env.start()
+        credentials.clear_credentials_cache()
         self.setup_fake_data()
 
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.home.cleanup()
+
     def test_generated_info_order_should_be_from_recent_to_older(self):
         commits = hook.read_commit_msgs("resources/new_branch_commits")
         info = generate_info(parse_commit_messages(commits), None, None)
@@ -70,6 +84,26 @@ class HookTestCase(unittest.TestCase):
         self.assertIsNotNone(raised_exception.file_info.file_last_access_time)
         self.assertIsNotNone(raised_exception.file_info.file_last_modification_time)
 
+    def test_should_close_the_commits_file_when_invalid_commits_format(self):
+        closed = []
+        original_read_commit_msgs = hook.read_commit_msgs
+
+        def reverse_lines(path):
+            try:
+                yield from utils.reverse_lines(path)
+            finally:
+                closed.append(path)
+
+        def read_commit_msgs(path):
+            # Closed before the error is built, not when the traceback is released
+            self.assertEqual([path], closed)
+            return original_read_commit_msgs(path)
+
+        with patch('TNTGitHook.hook.reverse_lines', reverse_lines), \
+                patch('TNTGitHook.hook.read_commit_msgs', read_commit_msgs):
+            with self.assertRaises(CommitMessagesFileFormatError):
+                parse_commit_messages_from_file("resources/invalid_branch_commits")
+
     def test_should_show_error_when_file_not_found_exception(self):
         with self.assertRaises(CommitMessagesFileNotFoundError) as error:
             generate_info(parse_commit_messages_from_file("resources/invalid_branch_commits2"), None, None)
@@ -78,6 +112,11 @@ class HookTestCase(unittest.TestCase):
         self.assertEqual(error.exception.path, "resources/invalid_branch_commits2")
         self.assertTrue(error.exception.path_write_permissions)
 
+    def test_should_parse_only_the_oldest_commits_that_fit_in_the_budget(self):
+        commit_msgs = parse_commit_messages_from_file("resources/new_branch_commits", budget=1)
+
+        self.assertEqual(parse_commit_messages(self.commit_messages)[:1], commit_msgs)
+
     def test_recovery_old_credentials(self):
         with patch('keyring.get_password') as mock_get_password:
             mock_get_password.side_effect = [None, "user", "pass"]
@@ -192,6 +231,217 @@ class HookTestCase(unittest.TestCase):
         response = hook.check_role_exists(self.config, self.projectA, "Test Role")
         self.assertEqual(0, response.id)
 
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_not_lookup_catalog_when_ids_are_pinned(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/", body="[]", status=200)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity", body="{}", status=200)
+
+        hook.create_activity(self.config, self.pinned_prj_config(role_id=7), parse_commit_messages(self.commit_messages), None)
+
+        requested_paths = {request.path.split("?")[0] for request in httpretty.latest_requests()}
+        self.assertEqual({"/api-hook/activity/", "/api-hook/activity"}, requested_paths)
+        self.assertEqual(7, json.loads(httpretty.last_request().body)["projectRoleId"])
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_lookup_the_role_again_when_its_name_is_edited(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/", body="[]", status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization", body=self.fake_organizations, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization/0/project", body=self.json_projects, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "project/0/role", body=self.json_roles, status=200)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity", body="{}", status=200)
+        prj_config = self.pinned_prj_config(role_id=0)
+        prj_config.role = "Other Role"
+
+        hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        requested_paths = {request.path.split("?")[0] for request in httpretty.latest_requests()}
+        self.assertIn("/api-hook/project/0/role", requested_paths)
+        self.assertEqual(1, json.loads(httpretty.last_request().body)["projectRoleId"])
+        self.assertTrue(prj_config.has_pinned_ids())
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_revalidate_pinned_ids_when_post_is_rejected(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/", body="[]", status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization", body=self.fake_organizations, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization/0/project", body=self.json_projects, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "project/0/role", body=self.json_roles, status=200)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity",
+                               responses=[httpretty.Response(body="{}", status=404),
+                                          httpretty.Response(body="{}", status=200)])
+        prj_config = self.pinned_prj_config(role_id=7)
+
+        hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        self.assertEqual(0, json.loads(httpretty.last_request().body)["projectRoleId"])
+        self.assertEqual(0, prj_config.role_id)
+        self.assertEqual(hook.catalog_fingerprint(self.organizationA, self.projectA, self.roleA),
+                         prj_config.catalog_fingerprint)
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_not_post_again_when_the_revalidated_role_is_the_same(self,
+                                                                                         mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/", body="[]", status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization", body=self.fake_organizations, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization/0/project", body=self.json_projects, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "project/0/role", body=self.json_roles, status=200)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity",
+                               responses=[httpretty.Response(body="{}", status=400),
+                                          httpretty.Response(body="{}", status=200)])
+
+        response = hook.create_activity(self.config, self.pinned_prj_config(role_id=0),
+                                        parse_commit_messages(self.commit_messages), None)
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual("GET", httpretty.last_request().method)
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_not_post_when_the_day_activities_fail(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/", body="{}", status=500)
+
+        with self.assertRaises(NetworkError):
+            hook.create_activity(self.config, self.pinned_prj_config(role_id=7),
+                                 parse_commit_messages(self.commit_messages), None)
+        self.assertEqual("GET", httpretty.last_request().method)
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_not_post_when_commits_are_already_registered(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        with open('resources/other_activities_with_several_repos.json') as activities:
+            httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/", body=activities.read(), status=200)
+        prj_config = self.pinned_prj_config(role_id=7)
+        prj_config.organization = "Autentia Real Business Solutions S.L."
+        prj_config.project = "i+d - Desarrollos de Software Interno"
+        prj_config.role = "desarrollo"
+        prj_config.catalog_fingerprint = prj_config.names_fingerprint()
+
+        response = hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        self.assertIsNone(response)
+        self.assertEqual("GET", httpretty.last_request().method)
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_request_only_the_activity_of_the_last_push(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/", body="[]", status=200)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity", body='{"id": 42}', status=200)
+        prj_config = self.pinned_prj_config(role_id=7)
+        hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+        description = json.loads(httpretty.last_request().body)["description"]
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/42",
+                               body=self.automatic_activity_json(42, description), status=200,
+                               adding_headers={"ETag": '"v1"'})
+        first_push_requests = len(httpretty.latest_requests())
+
+        response = hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        self.assertIsNone(response)
+        self.assertEqual(["/api-hook/activity/42"],
+                         [request.path for request in httpretty.latest_requests()[first_push_requests:]])
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_use_the_mirror_when_the_activity_is_not_modified(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        prj_config = self.pinned_prj_config(role_id=7)
+        key = mirror.entry_key(date.today(), prj_config, "user")
+        mirror.store(key, 42, PrjConfig.activity_prefix() + "\n", etag='"v1"')
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/42", status=304)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity", body="{}", status=200)
+
+        hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        get, post = httpretty.latest_requests()[0], httpretty.last_request()
+        self.assertEqual('"v1"', get.headers["If-None-Match"])
+        self.assertEqual(42, json.loads(post.body)["id"])
+        self.assertEqual(json.loads(post.body)["description"], mirror.load(key)["description"])
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_post_new_commits_when_the_description_is_full(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        commit_msgs = [(hashlib.sha1(str(i).encode()).hexdigest(), "2021-05-27T13:20:21+02:00",
+                        "COMMITER 1 <commiter1@autentia.com>", f"Commit-number-{i}") for i in range(100)]
+        prj_config = self.pinned_prj_config(role_id=7)
+        key = mirror.entry_key(date.today(), prj_config, "user")
+        description = generate_info(commit_msgs, None, None)[0]
+        mirror.store(key, 42, description, etag='"v1"')
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/42", status=304)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity", body="{}", status=200)
+
+        response = hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("POST", httpretty.last_request().method)
+        self.assertEqual(description, json.loads(httpretty.last_request().body)["description"])
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_look_for_the_activity_in_the_day_when_the_mirror_is_stale(self,
+                                                                                               mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        prj_config = self.pinned_prj_config(role_id=7)
+        key = mirror.entry_key(date.today(), prj_config, "user")
+        mirror.store(key, 42, PrjConfig.activity_prefix())
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/42", status=404)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/",
+                               body=f'[{{"date": "{date.today()}", "activities": '
+                                    f'[{self.automatic_activity_json(43, PrjConfig.activity_prefix())}]}}]',
+                               status=200)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity", body="{}", status=200)
+
+        hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        self.assertEqual(43, json.loads(httpretty.last_request().body)["id"])
+        self.assertEqual(43, mirror.load(key)["id"])
+        self.assertTrue(mirror.is_item_endpoint_supported())
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_create_activity_should_stop_requesting_single_activities_if_not_supported(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        prj_config = self.pinned_prj_config(role_id=7)
+        mirror.store(mirror.entry_key(date.today(), prj_config, "user"), 42, PrjConfig.activity_prefix())
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/42", status=405)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "activity/",
+                               body=f'[{{"date": "{date.today()}", "activities": '
+                                    f'[{self.automatic_activity_json(42, PrjConfig.activity_prefix())}]}}]',
+                               status=200)
+        httpretty.register_uri(httpretty.POST, self.config.baseURL + "activity", body="{}", status=200)
+
+        hook.create_activity(self.config, prj_config, parse_commit_messages(self.commit_messages), None)
+
+        self.assertFalse(mirror.is_item_endpoint_supported())
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    def test_setup_config_should_pin_catalog_ids(self):
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization", body=self.fake_organizations, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization/1/project", body=self.json_projects, status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "project/1/role", body=self.json_roles, status=200)
+        path = "./test_pinned_config.json"
+
+        hook.setup_config_with_path(self.config, "Another Organization", "Other Project", "Other Role", path)
+
+        with open(path) as config_file:
+            prj_config_file = json.load(config_file)
+        os.remove(path)
+        self.assertEqual(1, prj_config_file["organization_id"])
+        self.assertEqual(1, prj_config_file["project_id"])
+        self.assertEqual(1, prj_config_file["role_id"])
+        self.assertEqual(hook.catalog_fingerprint(self.organizationB, self.projectB, self.roleB),
+                         prj_config_file["catalog_fingerprint"])
+
     def test_find_evidence_should_return_None_if_this_is_the_first(self):
         prjConfig = PrjConfig()
         prjConfig.organization = "New Organization"
@@ -215,6 +465,40 @@ class HookTestCase(unittest.TestCase):
         prjConfig.role = "AutoFormacion"
         self.assertIsNone(find_automatic_evidence(prjConfig, self.fake_activities))
 
+    def test_parse_activities_decodes_every_field_as_its_entity(self):
+        activity = self.fake_activities[0]
+
+        self.assertIsInstance(activity, Activity)
+        self.assertIsInstance(activity.organization, Organization)
+        self.assertIsInstance(activity.project, Project)
+        self.assertIsInstance(activity.projectRole, Role)
+        self.assertEqual("Autentia Real Business Solutions S.L.", activity.organization.name)
+
+    def test_parse_activities_flattens_every_day_in_order(self):
+        days = [{"date": f"2026-01-{day:02d}", "activities": [{"id": day * 10 + index} for index in range(2)]}
+                for day in range(1, 4)] + [{"date": "2026-01-04", "activities": []}]
+
+        self.assertEqual([10, 11, 20, 21, 30, 31], [activity.id for activity in parse_activities(json.dumps(days))])
+
+    def test_find_evidence_in_response_only_decodes_activities_with_the_prefix(self):
+        prjConfig = PrjConfig()
+        prjConfig.organization = "Autentia Real Business Solutions S.L."
+        prjConfig.project = "i+d - Desarrollos de Software Interno"
+        prjConfig.role = "desarrollo"
+        with open('example_activities') as example_activities:
+            data = example_activities.read()
+        prefix_activities = [activity for activity in json.loads(data)[0]["activities"]
+                             if prjConfig.activity_prefix() in activity["description"]]
+
+        with patch('TNTGitHook.hook.decode_activity', wraps=hook.decode_activity) as decode:
+            evidence = hook.find_automatic_evidence_in(prjConfig, data)
+
+        self.assertEqual(250199, evidence.id)
+        self.assertEqual(find_automatic_evidence(prjConfig, self.fake_activities).description, evidence.description)
+        self.assertLessEqual(decode.call_count, len(prefix_activities))
+        prjConfig.role = "Another role"
+        self.assertIsNone(hook.find_automatic_evidence_in(prjConfig, data))
+
     def test_generate_info(self):
         prjConfig = PrjConfig()
         prjConfig.organization = "Autentia Real Business Solutions S.L."
@@ -238,6 +522,16 @@ class HookTestCase(unittest.TestCase):
         self.assertIsNotNone(info)
         self.assertRegex(info[0], r'(^###Autocreated evidence###\n\(DO NOT DELETE\)\n)')
 
+    def test_generate_merged_info_adds_a_section_per_remote(self):
+        commit_msgs = parse_commit_messages(self.commit_messages)
+
+        info = generate_merged_info([("git@github.com:autentia/first.git", commit_msgs[:1]),
+                                     ("git@github.com:autentia/second.git", commit_msgs[1:])])
+
+        self.assertEqual(generate_info(commit_msgs[1:], Activity().with_description(
+            generate_info(commit_msgs[:1], remote_url="git@github.com:autentia/first.git")[0]),
+            remote_url="git@github.com:autentia/second.git")[0], info[0])
+
     def test_generate_info_with_several_remoteURLs(self):
         prjConfig = PrjConfig()
         prjConfig.organization = "Autentia Real Business Solutions S.L."
@@ -277,6 +571,24 @@ class HookTestCase(unittest.TestCase):
         self.assertRaises(InvalidSetupConfigurationError, hook.check_new_setup, "resources/EmptyFieldTNTGitHookConfig.json", "", "", "")
 
 
+    def automatic_activity_json(self, activity_id: int, description: str) -> str:
+        return json.dumps({"id": activity_id, "startDate": f"{date.today()}T05:00:00", "duration": 0,
+                           "description": description, "billable": False,
+                           "organization": {"id": 0, "name": "Test Organization"},
+                           "project": {"id": 0, "name": "Test Project"},
+                           "projectRole": {"id": 7, "name": "Test Role"}})
+
+    def pinned_prj_config(self, role_id: int) -> PrjConfig:
+        prj_config = PrjConfig()
+        prj_config.organization = "Test Organization"
+        prj_config.project = "Test Project"
+        prj_config.role = "Test Role"
+        prj_config.organization_id = 0
+        prj_config.project_id = 0
+        prj_config.role_id = role_id
+        prj_config.catalog_fingerprint = prj_config.names_fingerprint()
+        return prj_config
+
     def get_regex(self) -> str:
         header = r'(^###Autocreated evidence###\n\(DO NOT DELETE\)\n){1}'
         sha = r'([\da-f]{40}\n)'
@@ -321,15 +633,15 @@ class HookTestCase(unittest.TestCase):
 
         self.organizationA = Organization().with_id(0).with_name("Test Organization")
         self.organizationB = Organization().with_id(1).with_name("Another Organization")
-        self.fake_organizations = json.dumps([fake_organization.__dict__ for fake_organization in [self.organizationA, self.organizationB]])
+        self.fake_organizations = json.dumps([fake_organization.to_json() for fake_organization in [self.organizationA, self.organizationB]])
 
         self.projectA = Project().with_id(0).with_name("Test Project").with_open(True).with_billable(True)
         self.projectB = Project().with_id(1).with_name("Other Project").with_open(True).with_billable(True)
-        self.json_projects = json.dumps([fake_project.__dict__ for fake_project in [self.projectA, self.projectB]])
+        self.json_projects = json.dumps([fake_project.to_json() for fake_project in [self.projectA, self.projectB]])
 
         self.roleA = Role().with_id(0).with_name("Test Role")
         self.roleB = Role().with_id(1).with_name("Other Role")
-        self.json_roles = json.dumps([fake_role.__dict__ for fake_role in [self.roleA, self.roleB]])
+        self.json_roles = json.dumps([fake_role.to_json() for fake_role in [self.roleA, self.roleB]])
 
         self.fake_remote_url = "git@github.com:autentia/TNTConcept.git"
         self.fake_activity = "This is a manual created activity by the user"
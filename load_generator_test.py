@@ -0,0 +1,57 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+
+from benchmarks import load_generator
+from benchmarks.load_generator import percentile
+from benchmarks.stub_server import StubServer
+
+
+class LoadGeneratorTestCase(unittest.TestCase):
+
+    def request(self, url: str, payload: dict = None) -> (int, object):
+        data = json.dumps(payload).encode("utf8") if payload is not None else None
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+    def test_percentile_is_the_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual((50, 95, 99, 100), tuple(percentile(values, percent) for percent in (50, 95, 99, 100)))
+        self.assertEqual(7, percentile([7], 99))
+
+    def test_stub_server_keeps_the_posted_activities(self):
+        with StubServer(activities=3) as server:
+            status, activity = self.request(server.base_url + "activity",
+                                            {"startDate": "2026-01-15T05:00:00", "description": "Evidence",
+                                             "projectRoleId": 0, "userName": "developer"})
+            _, day = self.request(server.base_url + "activity/?startDate=2026-01-15&endDate=2026-01-15&user=developer")
+            _, other_day = self.request(server.base_url + "activity/?startDate=2026-01-16&endDate=2026-01-16"
+                                                          "&user=developer")
+
+            self.assertEqual((200, activity), self.request(f"{server.base_url}activity/{activity['id']}"))
+        self.assertEqual("Test Role", activity["projectRole"]["name"])
+        self.assertEqual(4, len(day[0]["activities"]))
+        self.assertEqual(3, len(other_day[0]["activities"]))
+
+    def test_stub_server_injects_errors(self):
+        with StubServer(error_rate=1.0) as server:
+            self.assertEqual(503, self.request(server.base_url + "organization")[0])
+
+    def test_pushes_run_through_the_entry_point(self):
+        with StubServer() as server:
+            results = load_generator.run(server, developers=1, pushes=2)
+
+        self.assertEqual([0, 0], [result.returncode for result in results])
+        # The catalog is resolved by the first push, and the second one only requests the activity of the first one
+        self.assertEqual(1, server.endpoint_requests["role"])
+        self.assertEqual(1, server.endpoint_requests["activity"])
+        self.assertEqual(2, server.endpoint_requests["post activity"])
+
+
+if __name__ == '__main__':
+    unittest.main()
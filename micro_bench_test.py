@@ -0,0 +1,32 @@
+import unittest
+
+from benchmarks import micro_bench
+from benchmarks.micro_bench import Case, regressions
+
+
+class MicroBenchTestCase(unittest.TestCase):
+
+    baselines = {"case[10]": {"ops_per_sec": 1000.0, "peak_kib": 1000.0}}
+
+    def test_results_within_the_tolerance_are_not_regressions(self):
+        results = {"case[10]": {"ops_per_sec": 800.0, "peak_kib": 1200.0},
+                   "new_case[10]": {"ops_per_sec": 1.0, "peak_kib": 1.0}}
+
+        self.assertEqual([], regressions(results, self.baselines, 0.3))
+
+    def test_slower_or_bigger_results_are_regressions(self):
+        results = {"case[10]": {"ops_per_sec": 600.0, "peak_kib": 1500.0}}
+
+        self.assertEqual(2, len(regressions(results, self.baselines, 0.3)))
+
+    def test_every_case_runs_with_its_smallest_size(self):
+        cases = [Case(case.name, case.sizes[:1], case.setup) for case in micro_bench.CASES]
+
+        results = micro_bench.run(cases, min_time=0)
+
+        self.assertEqual([f"{case.name}[{case.sizes[0]}]" for case in cases], list(results))
+        self.assertTrue(all(result["ops_per_sec"] > 0 for result in results.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
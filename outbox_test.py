@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+import TNTGitHook
+from TNTGitHook import outbox
+from TNTGitHook.hook import Config, PrjConfig
+
+
+class OutboxTestCase(unittest.TestCase):
+
+    config = Config.config(debug=True)
+    home: tempfile.TemporaryDirectory
+    prj_config: PrjConfig
+    first_commit = ("b287b94c4fdcccc426f828bd5e15e62139e0223f", "2020-05-27T13:20:21+02:00",
+                    "COMMITER 1 <commiter1@autentia.com>", "Initial commit")
+    second_commit = ("79ad7cedb8b2a7085c9203a42d4b9101b4634dc6", "2021-05-07T13:48:22+02:00",
+                     "COMMITER 2 <commiter2@autentia.com>", "Another commit")
+
+    def setUp(self) -> None:
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name})
+        self.env.start()
+        self.prj_config = PrjConfig()
+        self.prj_config.organization = "Test Organization"
+        self.prj_config.project = "Test Project"
+        self.prj_config.role = "Test Role"
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.home.cleanup()
+
+    def test_pushes_with_same_day_role_and_remote_are_merged(self):
+        first_path = outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config)
+        second_path = outbox.enqueue([self.first_commit, self.second_commit], "git@github.com:autentia/TNTConcept.git",
+                                     self.prj_config)
+
+        self.assertEqual(first_path, second_path)
+        self.assertEqual([first_path], outbox.pending_entries())
+        with open(first_path) as entry_file:
+            entry = json.load(entry_file)
+        self.assertEqual([list(self.first_commit), list(self.second_commit)], entry["commit_msgs"])
+
+    def test_pushes_with_different_remote_or_day_are_kept_apart(self):
+        outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config)
+        outbox.enqueue([self.first_commit], "git@github.com:autentia/other.git", self.prj_config)
+        outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config,
+                       day=date(2021, 5, 27))
+
+        self.assertEqual(3, len(outbox.pending_entries()))
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    def test_flush_sends_one_request_per_entry_and_empties_the_outbox(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=200)
+        for _ in range(10):
+            outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config,
+                           day=date(2021, 5, 27))
+
+        flushed, failed = outbox.flush(self.config)
+
+        self.assertEqual((1, 0), (flushed, failed))
+        self.assertEqual([], outbox.pending_entries())
+        args = mock_create_activity.call_args[0]
+        self.assertEqual([("git@github.com:autentia/TNTConcept.git", [self.first_commit])], args[2])
+        self.assertEqual(date(2021, 5, 27), args[4])
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    def test_flush_sends_the_remotes_of_the_same_day_and_role_in_one_request(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=200)
+        outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config)
+        outbox.enqueue([self.second_commit], "git@github.com:autentia/other.git", self.prj_config)
+        outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config,
+                       day=date(2021, 5, 27))
+
+        flushed, failed = outbox.flush(self.config)
+
+        self.assertEqual((3, 0), (flushed, failed))
+        self.assertEqual(2, mock_create_activity.call_count)
+        remote_commits = sorted(max((call[0][2] for call in mock_create_activity.call_args_list), key=len))
+        self.assertEqual([("git@github.com:autentia/TNTConcept.git", [self.first_commit]),
+                          ("git@github.com:autentia/other.git", [self.second_commit])], remote_commits)
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    def test_flush_keeps_entries_when_tnt_is_not_reachable(self, mock_create_activity: MagicMock):
+        mock_create_activity.side_effect = ConnectionError()
+        outbox.enqueue([self.first_commit], None, self.prj_config)
+
+        flushed, failed = outbox.flush(self.config)
+
+        self.assertEqual((0, 1), (flushed, failed))
+        self.assertEqual(1, len(outbox.pending_entries()))
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    def test_flush_keeps_commits_added_while_the_request_was_in_flight(self, mock_create_activity: MagicMock):
+        def push_while_flushing(*args):
+            outbox.enqueue([self.second_commit], None, self.prj_config)
+            return MagicMock(status_code=200)
+        mock_create_activity.side_effect = push_while_flushing
+        path = outbox.enqueue([self.first_commit], None, self.prj_config)
+
+        outbox.flush(self.config)
+
+        with open(path) as entry_file:
+            self.assertEqual([list(self.second_commit)], json.load(entry_file)["commit_msgs"])
+
+
+    @patch('TNTGitHook.is_update_needed', MagicMock(return_value=False))
+    @patch('TNTGitHook.create_activity')
+    def test_push_rejected_by_tnt_is_stored_in_the_outbox(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=503)
+        config_path = f"{self.home.name}/TNTGitHookConfig.json"
+        with open(config_path, "w") as config_file:
+            json.dump(self.prj_config.__dict__, config_file)
+        argv = ["TNTGitHook", "--commit-msgs", ";".join(self.first_commit), "--config", config_path,
+                "--remote", "git@github.com:autentia/TNTConcept.git"]
+
+        with patch("sys.argv", argv):
+            TNTGitHook.main()
+
+        [path] = outbox.pending_entries()
+        with open(path) as entry_file:
+            self.assertEqual([list(self.first_commit)], json.load(entry_file)["commit_msgs"])
+
+    @patch('TNTGitHook.is_update_needed', MagicMock(return_value=False))
+    @patch('TNTGitHook.create_activity')
+    def test_push_rejected_for_good_is_not_stored_in_the_outbox(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=403)
+        config_path = f"{self.home.name}/TNTGitHookConfig.json"
+        with open(config_path, "w") as config_file:
+            json.dump(self.prj_config.__dict__, config_file)
+        argv = ["TNTGitHook", "--commit-msgs", ";".join(self.first_commit), "--config", config_path]
+
+        with patch("sys.argv", argv):
+            TNTGitHook.main()
+
+        self.assertEqual([], outbox.pending_entries())
+
+    def test_pinned_and_unpinned_configs_of_the_same_role_share_the_entry_and_the_lock(self):
+        pinned = PrjConfig()
+        pinned.__dict__.update(self.prj_config.__dict__, role_id=7, catalog_fingerprint="fingerprint")
+
+        self.assertEqual(outbox.enqueue([self.first_commit], None, self.prj_config),
+                         outbox.enqueue([self.second_commit], None, pinned))
+        with outbox.group_locked(date.today(), pinned):
+            with outbox.group_locked(date.today(), self.prj_config, blocking=False) as acquired:
+                self.assertFalse(acquired)
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    def test_flush_removes_the_group_rejected_for_good(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=400)
+        outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config)
+        outbox.enqueue([self.second_commit], "git@github.com:autentia/other.git", self.prj_config)
+
+        self.assertEqual((2, 0), outbox.flush(self.config))
+        self.assertEqual([], outbox.pending_entries())
+        mock_create_activity.return_value = MagicMock(status_code=429)
+        outbox.enqueue([self.first_commit], "git@github.com:autentia/TNTConcept.git", self.prj_config)
+
+        self.assertEqual((0, 1), outbox.flush(self.config))
+        self.assertEqual(1, len(outbox.pending_entries()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,6 @@
 import os
+import subprocess
+import tempfile
 import unittest
 
 from TNTGitHook.pre_push import PrePush
@@ -28,23 +30,31 @@ class PrePushTestCase(unittest.TestCase):
         self.assertEqual(self.pre_push.__str__(),
                          "#!/bin/bash\n"
                          "set -o pipefail\n"
-                         "read local_ref local_sha remote_ref remote_sha\n"
-                         f"$HOME/.tnt/hook/bin/tnt_git_hook $local_ref $local_sha $remote_ref $remote_sha $(git rev-parse --show-toplevel)")
+                         "refs=$(cat)\n"
+                         'exec <<< "$refs"\n'
+                         'printf \'%s\\n\' "$refs" | python3 -m TNTGitHook --pre-push --remote "$2"')
 
     def test_the_pre_push_string_is_correct_when_there_are_more_elements(self):
         self.assertTrue(self.pre_push.is_pre_push_correct(
                          "#!/bin/bash\n"
-                         "read local_ref local_sha remote_ref remote_sha\n"
+                         "refs=$(cat)\n"
                          "npm run test:ci\n"
+                         'printf \'%s\\n\' "$refs" | python3 -m TNTGitHook --pre-push --remote "$2"'))
+
+    def test_the_pre_push_with_the_shell_hook_is_not_correct(self):
+        self.assertFalse(self.pre_push.is_pre_push_correct(
+                         "#!/bin/bash\n"
+                         "read local_ref local_sha remote_ref remote_sha\n"
                          f"$HOME/.tnt/hook/bin/tnt_git_hook $local_ref $local_sha $remote_ref $remote_sha $(git rev-parse --show-toplevel)"))
 
     def test_the_pre_push_is_composed_correctly(self):
         self.assertEqual(self.pre_push.compose_pre_hook("#!/bin/sh\nnpm run test:ci"),
                          "#!/bin/bash\n"
                          "set -o pipefail\n"
-                         "read local_ref local_sha remote_ref remote_sha\n"
+                         "refs=$(cat)\n"
+                         'exec <<< "$refs"\n'
                          "npm run test:ci\n"
-                         f"$HOME/.tnt/hook/bin/tnt_git_hook $local_ref $local_sha $remote_ref $remote_sha $(git rev-parse --show-toplevel)")
+                         'printf \'%s\\n\' "$refs" | python3 -m TNTGitHook --pre-push --remote "$2"')
 
     def test_the_pre_push_is_composed_correctly_if_should_be_total_replaced(self):
         pre_push_script = f"#!/bin/bash\n" \
@@ -53,8 +63,30 @@ class PrePushTestCase(unittest.TestCase):
         self.assertEqual(self.pre_push.compose_pre_hook(pre_push_script),
                          "#!/bin/bash\n"
                          "set -o pipefail\n"
-                         "read local_ref local_sha remote_ref remote_sha\n"
-                         f"$HOME/.tnt/hook/bin/tnt_git_hook $local_ref $local_sha $remote_ref $remote_sha $(git rev-parse --show-toplevel)")
+                         "refs=$(cat)\n"
+                         'exec <<< "$refs"\n'
+                         'printf \'%s\\n\' "$refs" | python3 -m TNTGitHook --pre-push --remote "$2"')
+
+    def test_the_pre_push_without_the_stored_refs_is_not_correct(self):
+        self.assertFalse(self.pre_push.is_pre_push_correct(
+                         "#!/bin/bash\n"
+                         'python3 -m TNTGitHook --pre-push --remote "$2"'))
+
+    def test_user_commands_and_the_hook_read_the_same_refs(self):
+        refs = "refs/heads/main 1111 refs/heads/main 2222\nrefs/heads/dev 3333 refs/heads/dev 0000"
+        with tempfile.TemporaryDirectory() as directory:
+            fake_python = f"{directory}/python3"
+            with open(fake_python, "w") as fake_python_file:
+                fake_python_file.write(f"#!/bin/sh\ncat > {directory}/hook_stdin\n")
+            os.chmod(fake_python, 0o755)
+            hook = self.pre_push.compose_pre_hook(f"#!/bin/sh\ncat > {directory}/user_stdin")
+            env = dict(os.environ, PATH=f"{directory}:{os.environ['PATH']}")
+            subprocess.run(["bash", "-c", hook, "pre-push", "origin", "git@github.com:autentia/TNTConcept.git"],
+                           input=refs, text=True, check=True, env=env)
+
+            for name in ["user_stdin", "hook_stdin"]:
+                with open(f"{directory}/{name}") as stdin:
+                    self.assertEqual(refs, stdin.read().strip())
 
     def test_old_lines_are_removed(self):
         self.assertListEqual([],
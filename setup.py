@@ -3,16 +3,20 @@ import setuptools
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+version = {}
+with open("TNTGitHook/version.py") as fh:
+    exec(fh.read(), version)
+
 setuptools.setup(
     name="TNTGitHook",
-    version="0.14.0",
+    version=version["VERSION"],
     author="Autentia",
     author_email="desktop.support@autentia.com",
     description="Utility to auto impute activities in TNT",
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/autentia/tnt-hook-git.git",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks"]),
     license='Unlicense',
     classifiers=[
         "Programming Language :: Python :: 3",
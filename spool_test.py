@@ -0,0 +1,150 @@
+import fcntl
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+from threading import Lock, Thread
+from unittest.mock import patch, MagicMock
+
+from TNTGitHook import outbox, spool
+from TNTGitHook.hook import PrjConfig
+
+
+class SpoolTestCase(unittest.TestCase):
+
+    home: tempfile.TemporaryDirectory
+    prj_config: PrjConfig
+    commit_msgs = [("b287b94c4fdcccc426f828bd5e15e62139e0223f", "2020-05-27T13:20:21+02:00",
+                    "COMMITER 1 <commiter1@autentia.com>", "Initial commit")]
+
+    def setUp(self) -> None:
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name})
+        self.env.start()
+        self.prj_config = PrjConfig()
+        self.prj_config.organization = "Test Organization"
+        self.prj_config.project = "Test Project"
+        self.prj_config.role = "Test Role"
+        self.prj_config.async_submission = True
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.home.cleanup()
+
+    def test_enqueue_stores_the_push_in_the_spool(self):
+        job_path = spool.enqueue(self.commit_msgs, "git@github.com:autentia/TNTConcept.git", self.prj_config,
+                                 "config.json", False)
+
+        with open(job_path) as job_file:
+            job = json.load(job_file)
+        self.assertTrue(job_path.startswith(spool.spool_path()))
+        self.assertEqual([list(self.commit_msgs[0])], job["commit_msgs"])
+        self.assertEqual("git@github.com:autentia/TNTConcept.git", job["remote"])
+        self.assertEqual("Test Project", job["prj_config"]["project"])
+        self.assertEqual(os.path.abspath("config.json"), job["config_path"])
+
+    @patch('TNTGitHook.spool.spawn_worker')
+    def test_submit_async_returns_enqueue_latency(self, mock_spawn_worker: MagicMock):
+        latency = spool.submit_async(self.commit_msgs, None, self.prj_config, "config.json", False)
+
+        self.assertGreaterEqual(latency, 0)
+        mock_spawn_worker.assert_called_once()
+
+    @patch('TNTGitHook.hook.create_activity')
+    def test_run_job_logs_the_result_once(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=200)
+        job_path = spool.enqueue(self.commit_msgs, None, self.prj_config, "config.json", False)
+
+        spool.run_job(job_path, False)
+
+        self.assertFalse(os.path.exists(job_path))
+        self.assertEqual(self.commit_msgs, mock_create_activity.call_args[0][2])
+        submissions = spool.read_new_submissions()
+        self.assertEqual(1, len(submissions))
+        self.assertIn("OK Test Project - Test Role", submissions[0])
+        self.assertEqual([], spool.read_new_submissions())
+
+    @patch('TNTGitHook.hook.create_activity')
+    def test_run_job_queues_only_the_pushes_that_can_be_retried(self, mock_create_activity: MagicMock):
+        for status_code, result in [(404, "ERROR"), (503, "QUEUED")]:
+            mock_create_activity.return_value = MagicMock(status_code=status_code)
+            spool.run_job(spool.enqueue(self.commit_msgs, None, self.prj_config, "config.json", False), False)
+
+            [submission] = spool.read_new_submissions()
+            self.assertIn(f"{result} Test Project", submission)
+            self.assertIn(str(status_code), submission)
+        self.assertEqual(1, len(outbox.pending_entries()))
+
+    @patch('TNTGitHook.hook.create_activity')
+    def test_run_job_logs_errors(self, mock_create_activity: MagicMock):
+        mock_create_activity.side_effect = Exception("TNT not reachable")
+        job_path = spool.enqueue(self.commit_msgs, None, self.prj_config, "config.json", False)
+
+        spool.run_job(job_path, False)
+
+        submissions = spool.read_new_submissions()
+        self.assertIn("ERROR", submissions[0])
+        self.assertIn("TNT not reachable", submissions[0])
+
+    @patch('TNTGitHook.hook.create_activity')
+    def test_orphaned_jobs_are_registered_on_their_day(self, mock_create_activity: MagicMock):
+        mock_create_activity.return_value = MagicMock(status_code=200)
+        orphaned = spool.enqueue(self.commit_msgs, None, self.prj_config, "config.json", False)
+        with open(orphaned) as job_file:
+            job = json.load(job_file)
+        job["day"] = "2020-05-27"
+        with open(orphaned, "w") as job_file:
+            json.dump(job, job_file)
+        old = time.time() - spool.ORPHANED_JOB_SECONDS - 1
+        os.utime(orphaned, (old, old))
+        recent = spool.enqueue(self.commit_msgs, None, self.prj_config, "config.json", False)
+
+        spool.run_orphaned_jobs(False)
+
+        self.assertFalse(os.path.exists(orphaned))
+        self.assertTrue(os.path.exists(recent))
+        self.assertEqual([date(2020, 5, 27)], [call.args[5] for call in mock_create_activity.call_args_list])
+
+    @patch('TNTGitHook.hook.create_activity')
+    def test_job_run_by_another_worker_is_skipped(self, mock_create_activity: MagicMock):
+        job_path = spool.enqueue(self.commit_msgs, None, self.prj_config, "config.json", False)
+
+        with open(job_path) as job_file:
+            fcntl.flock(job_file, fcntl.LOCK_EX)
+            spool.run_job(job_path, False)
+
+        mock_create_activity.assert_not_called()
+        self.assertTrue(os.path.exists(job_path))
+
+    @patch('TNTGitHook.hook.create_activity')
+    def test_workers_of_the_same_day_and_role_run_one_at_a_time(self, mock_create_activity: MagicMock):
+        running = []
+        overlaps = []
+        lock = Lock()
+
+        def create_activity(*args, **kwargs):
+            with lock:
+                running.append(args[3])
+                overlaps.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(args[3])
+            return MagicMock(status_code=200)
+
+        mock_create_activity.side_effect = create_activity
+        job_paths = [spool.enqueue(self.commit_msgs, remote, self.prj_config, "config.json", False)
+                     for remote in ["remote A", "remote B", "remote C"]]
+        workers = [Thread(target=spool.run_job, args=(job_path, False)) for job_path in job_paths]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual([1, 1, 1], overlaps)
+        self.assertEqual([], spool.pending_jobs())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+import warnings
+from unittest.mock import patch, MagicMock
+
+import httpretty
+
+from TNTGitHook.exceptions import AuthError
+from TNTGitHook.hook import Config, generate_request_headers
+from TNTGitHook.tokens import TokenManager, tokens_path
+
+
+class TokenManagerTestCase(unittest.TestCase):
+
+    config: Config
+    home: tempfile.TemporaryDirectory
+
+    def setUp(self) -> None:
+        # Httpretty has an issue with unclosed file warnings. Check url for more info.
+        # https://github.com/gabrielfalcao/HTTPretty/issues/368
+        warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed.*")
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name})
+        self.env.start()
+        self.config = Config.config(debug=True)
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.home.cleanup()
+
+    def fake_token(self, access_token: str, expires_in: int = 1799) -> str:
+        return json.dumps({"access_token": access_token, "token_type": "bearer", "refresh_token": "refresh",
+                           "expires_in": expires_in, "scope": "tnt"})
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_token_is_reused_between_invocations(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        httpretty.register_uri(httpretty.POST, self.config.authURL, body=self.fake_token("first"), status=200)
+
+        first = generate_request_headers(self.config)
+        second = generate_request_headers(Config.config(debug=True))
+
+        self.assertEqual({"Authorization": "Bearer first"}, first)
+        self.assertEqual(first, second)
+        mock_credentials.assert_called_once()
+        self.assertEqual(0o600, os.stat(tokens_path()).st_mode & 0o777)
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_token_is_refreshed_before_expiry_without_credentials(self, mock_credentials: MagicMock):
+        TokenManager(self.config).store({"access_token": "old", "refresh_token": "refresh",
+                                         "expires_at": time.time() + 10})
+        httpretty.register_uri(httpretty.POST, self.config.authURL, body=self.fake_token("refreshed"), status=200)
+
+        headers = generate_request_headers(self.config)
+
+        self.assertEqual({"Authorization": "Bearer refreshed"}, headers)
+        self.assertEqual(["refresh_token"], httpretty.last_request().parsed_body["grant_type"])
+        mock_credentials.assert_not_called()
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_invalid_credentials_raise_auth_error(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "wrong")
+        httpretty.register_uri(httpretty.POST, self.config.authURL, status=401)
+
+        self.assertRaises(AuthError, generate_request_headers, self.config)
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_authenticated_request_is_retried_once_with_a_new_token_on_401(self, mock_credentials: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        TokenManager(self.config).store({"access_token": "revoked", "refresh_token": None,
+                                         "expires_at": time.time() + 1000})
+        httpretty.register_uri(httpretty.POST, self.config.authURL, body=self.fake_token("new"), status=200)
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization",
+                               responses=[httpretty.Response(body="", status=401),
+                                          httpretty.Response(body="[]", status=200)])
+
+        response = self.config.transport.get(self.config.baseURL + "organization", authenticated=True)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("Bearer new", httpretty.last_request().headers["Authorization"])
+
+
+if __name__ == '__main__':
+    unittest.main()
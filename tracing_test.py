@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import httpretty
+
+import TNTGitHook
+from TNTGitHook import tracing
+
+
+class TracingTestCase(unittest.TestCase):
+
+    directory: tempfile.TemporaryDirectory
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.trace_path = f"{self.directory.name}/trace.json"
+
+    def tearDown(self) -> None:
+        tracing._events = None
+        tracing._path = None
+        self.directory.cleanup()
+
+    def read_trace(self) -> dict:
+        with open(self.trace_path) as trace_file:
+            return json.load(trace_file)
+
+    def test_spans_are_not_recorded_while_disabled(self):
+        with tracing.span("phase", size=1) as span:
+            pass
+
+        self.assertIsNone(span)
+        self.assertIs(tracing.span("other"), tracing.span("phase"))
+        self.assertEqual([], tracing.events())
+        tracing.export()
+        self.assertFalse(os.path.exists(self.trace_path))
+
+    def test_spans_are_exported_as_chrome_trace_events(self):
+        tracing.enable(self.trace_path)
+        with tracing.span("outer"):
+            with tracing.span("inner", size=10):
+                pass
+        tracing.export()
+
+        trace = self.read_trace()
+        inner, outer = trace["traceEvents"]
+        self.assertEqual(("inner", "outer"), (inner["name"], outer["name"]))
+        self.assertEqual(("X", {"size": 10}), (inner["ph"], inner["args"]))
+        self.assertLessEqual(outer["ts"], inner["ts"])
+        self.assertGreaterEqual(outer["ts"] + outer["dur"], inner["ts"] + inner["dur"])
+
+    def test_failed_spans_record_the_error(self):
+        tracing.enable(self.trace_path)
+        with self.assertRaises(ValueError):
+            with tracing.span("phase"):
+                raise ValueError()
+
+        self.assertEqual({"error": "ValueError"}, tracing.events()[0]["args"])
+
+    def test_exports_are_appended_to_the_trace_file(self):
+        tracing.enable(self.trace_path)
+        tracing.add_span("first push", 1000, 2000)
+        tracing.export()
+        tracing.add_span("second push", 3000, 3500)
+        tracing.export()
+
+        trace = self.read_trace()
+        self.assertEqual(["first push", "second push"], [event["name"] for event in trace["traceEvents"]])
+        self.assertEqual(500, trace["traceEvents"][1]["dur"])
+
+    @httpretty.activate(allow_net_connect=False)
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials', return_value=("user", "pass"))
+    def test_push_is_traced_per_phase(self, _):
+        config = TNTGitHook.Config("http://tnt.test/api-hook/", "http://tnt.test/oauth/token", "", debug=False)
+        httpretty.register_uri(httpretty.POST, "http://tnt.test/oauth/token",
+                               body='{"access_token": "token", "token_type": "bearer", "expires_in": 1799}')
+        httpretty.register_uri(httpretty.GET, "http://tnt.test/api-hook/organization",
+                               body='[{"id": 1, "name": "Test Organization"}]')
+        httpretty.register_uri(httpretty.GET, "http://tnt.test/api-hook/organization/1/project",
+                               body='[{"id": 2, "name": "Test Project", "open": true, "billable": false}]')
+        httpretty.register_uri(httpretty.GET, "http://tnt.test/api-hook/project/2/role",
+                               body='[{"id": 3, "name": "Test Role"}]')
+        httpretty.register_uri(httpretty.GET, "http://tnt.test/api-hook/activity/", body='[]')
+        httpretty.register_uri(httpretty.POST, "http://tnt.test/api-hook/activity", body='{"id": 4}')
+        with open(f"{self.directory.name}/TNTGitHookConfig.json", "w") as prj_config:
+            json.dump({"organization": "Test Organization", "project": "Test Project", "role": "Test Role"},
+                      prj_config)
+        argv = ["TNTGitHook", "--commit-msgs",
+                "b287b94c4fdcccc426f828bd5e15e62139e0223f;2020-05-27T13:20:21+02:00;COMMITER <c@autentia.com>;Commit",
+                "--config", f"{self.directory.name}/TNTGitHookConfig.json",
+                "--remote", "git@github.com:autentia/TNTConcept.git",
+                "--trace", self.trace_path, "--git-timestamps", "1000000000,3000000000"]
+
+        with patch.dict(os.environ, {"HOME": self.directory.name}), patch("sys.argv", argv), \
+                patch.object(TNTGitHook.Config, "config", return_value=config), \
+                patch("TNTGitHook.is_update_needed", return_value=False):
+            TNTGitHook.main()
+
+        names = [event["name"] for event in self.read_trace()["traceEvents"]]
+        for name in ["git log (shell hook)", "main", "read commits", "credentials", "resolve role", "fetch activity",
+                     "parse activities", "generate evidence", "post activity",
+                     "GET http://tnt.test/api-hook/activity/", "POST http://tnt.test/api-hook/activity"]:
+            self.assertIn(name, names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import httpretty
+
+from TNTGitHook import hook
+from TNTGitHook.hook import Config
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'[{"id": 0, "name": "Test Organization"}, {"id": 0, "name": "Test Project"}]'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TransportTestCase(unittest.TestCase):
+
+    config: Config
+
+    def setUp(self) -> None:
+        # Httpretty has an issue with unclosed file warnings. Check url for more info.
+        # https://github.com/gabrielfalcao/HTTPretty/issues/368
+        warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed.*")
+        self.config = Config.config(debug=True)
+
+    def test_transport_is_built_once_per_config(self):
+        self.assertFalse(self.config.has_transport())
+        self.assertIs(self.config.transport, self.config.transport)
+        self.assertTrue(self.config.has_transport())
+
+    def test_transport_reuses_connections_between_calls(self):
+        # Httpretty closes its fake sockets after every response, so a real keep-alive server is needed here
+        server = ThreadingHTTPServer(("127.0.0.1", 0), CatalogHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.config.baseURL = f"http://127.0.0.1:{server.server_address[1]}/api-hook/"
+        try:
+            organization = hook.check_organization_exists(self.config, "Test Organization")
+            hook.check_project_exists(self.config, organization, "Test Project")
+            handshakes, reused = self.config.transport.stats()
+        finally:
+            self.config.transport.close()
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(1, handshakes)
+        self.assertEqual(1, reused)
+
+    @httpretty.activate(verbose=True, allow_net_connect=False)
+    def test_transport_sends_default_headers(self):
+        httpretty.register_uri(httpretty.GET, self.config.baseURL + "organization", body='[]', status=200)
+
+        self.config.transport.get(self.config.baseURL + "organization")
+
+        self.assertEqual("application/json", httpretty.last_request().headers["Accept"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,11 @@
+import tempfile
 import unittest
 from datetime import datetime
 from typing import List
 
 from TNTGitHook.entities import ActivitiesResponse
 from TNTGitHook.hook import parse_activities
-from TNTGitHook.utils import DateTimeEncoder, formatRemoteURL
+from TNTGitHook.utils import DateTimeEncoder, formatRemoteURL, reverse_lines, count_lines
 
 
 class UtilsTestCase(unittest.TestCase):
@@ -43,6 +44,19 @@ class UtilsTestCase(unittest.TestCase):
         formatedRemoteURL = formatRemoteURL(remoteURL)
         self.assertEqual(formatedRemoteURL, expectedRemoteURL)
 
+    def test_reverse_lines_should_skip_empty_lines(self):
+        for content in [b"first\nsecond\n\nthird", b"first\nsecond\n\nthird\n"]:
+            with tempfile.NamedTemporaryFile() as file:
+                file.write(content)
+                file.flush()
+                self.assertEqual([b"third", b"second", b"first"], list(reverse_lines(file.name)))
+                self.assertEqual(4, count_lines(file.name))
+
+    def test_reverse_lines_of_empty_file(self):
+        with tempfile.NamedTemporaryFile() as file:
+            self.assertEqual([], list(reverse_lines(file.name)))
+            self.assertEqual(0, count_lines(file.name))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,148 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from datetime import date
+from threading import Thread
+from unittest.mock import patch, MagicMock
+
+from TNTGitHook import outbox, workspace
+from TNTGitHook.hook import Config, DEFAULT_CONFIG_FILE_PATH
+
+DEVELOPER = {"organization": "Test Organization", "project": "Test Project", "role": "Developer"}
+REVIEWER = {"organization": "Test Organization", "project": "Test Project", "role": "Reviewer"}
+
+
+class WorkspaceTestCase(unittest.TestCase):
+
+    home: tempfile.TemporaryDirectory
+    directory: str
+
+    def setUp(self) -> None:
+        self.home = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {"HOME": self.home.name})
+        self.env.start()
+        self.directory = f"{self.home.name}/workspace"
+        os.makedirs(self.directory)
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.home.cleanup()
+
+    def git(self, path: str, *args, author: str = "commiter1") -> str:
+        env = dict(os.environ, GIT_AUTHOR_NAME=author, GIT_AUTHOR_EMAIL=f"{author}@autentia.com",
+                   GIT_COMMITTER_NAME=author, GIT_COMMITTER_EMAIL=f"{author}@autentia.com")
+        return subprocess.run(["git"] + list(args), env=env, cwd=path, check=True, capture_output=True,
+                              text=True).stdout.strip()
+
+    def repository(self, name: str, prj_config: dict = None) -> str:
+        path = f"{self.directory}/{name}"
+        os.makedirs(path)
+        self.git(path, "init", "-q", "-b", "main")
+        self.git(path, "config", "user.email", "commiter1@autentia.com")
+        self.git(path, "remote", "add", "origin", f"git@github.com:autentia/{os.path.basename(name)}.git")
+        if prj_config is not None:
+            with open(f"{path}/{DEFAULT_CONFIG_FILE_PATH}", "w") as config_file:
+                json.dump(prj_config, config_file)
+        return path
+
+    def commit(self, path: str, message: str, author: str = "commiter1") -> str:
+        self.git(path, "commit", "-q", "--allow-empty", "-m", message, author=author)
+        return self.git(path, "rev-parse", "HEAD")
+
+    def test_only_repositories_with_the_hook_configured_are_discovered(self):
+        configured = self.repository("configured", DEVELOPER)
+        self.repository("not-configured")
+        nested = self.repository("group/nested", REVIEWER)
+        os.makedirs(f"{configured}/node_modules/dependency/.git")
+
+        self.assertEqual([configured, nested], workspace.discover(self.directory))
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    @patch('TNTGitHook.hook.resolve_role_id')
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_repositories_of_the_same_role_are_registered_in_one_update(self, mock_credentials: MagicMock,
+                                                                         mock_resolve_role_id: MagicMock,
+                                                                         mock_create_merged_activity: MagicMock):
+        mock_credentials.return_value = ("user", "pass")
+        mock_create_merged_activity.return_value = MagicMock(status_code=200)
+        first = self.repository("first", DEVELOPER)
+        second = self.repository("second", DEVELOPER)
+        reviews = self.repository("reviews", REVIEWER)
+        first_commit = self.commit(first, "First")
+        self.commit(first, "Commit of a colleague", author="commiter2")
+        second_commit = self.commit(second, "Second")
+        self.git(second, "checkout", "-q", "-b", "feature")
+        feature_commit = self.commit(second, "Not pushed yet")
+        review_commit = self.commit(reviews, "Review")
+        config = Config.config(debug=True)
+
+        result = workspace.run(config, self.directory, date.today(), date.today())
+
+        self.assertEqual((2, 0, 0), result)
+        mock_credentials.assert_called_once()
+        self.assertEqual(2, mock_resolve_role_id.call_count)
+        updates = {call.args[1].role: call.args[2] for call in mock_create_merged_activity.call_args_list}
+        self.assertEqual({"Developer": [("git@github.com:autentia/first.git", [first_commit]),
+                                        ("git@github.com:autentia/second.git", [second_commit, feature_commit])],
+                          "Reviewer": [("git@github.com:autentia/reviews.git", [review_commit])]},
+                         {role: [(remote, [commit_msg[0] for commit_msg in commit_msgs])
+                                 for remote, commit_msgs in remote_commits]
+                          for role, remote_commits in updates.items()})
+        # Every update shares the same HTTP session and credentials
+        self.assertTrue(all(call.args[0] is config for call in mock_create_merged_activity.call_args_list))
+        self.assertTrue(all(call.kwargs["credentials"] == ("user", "pass")
+                            for call in mock_create_merged_activity.call_args_list))
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.hook.resolve_role_id', MagicMock(return_value=0))
+    @patch('builtins.print', MagicMock())
+    def test_repositories_without_user_email_are_skipped_as_failed(self, mock_create_merged_activity: MagicMock):
+        mock_create_merged_activity.return_value = MagicMock(status_code=200)
+        anonymous = self.repository("anonymous", DEVELOPER)
+        self.git(anonymous, "config", "--unset", "user.email")
+        self.commit(anonymous, "Anonymous change", author="colleague")
+        mine = self.repository("mine", DEVELOPER)
+        self.commit(mine, "My change")
+
+        with patch.dict(os.environ, {"GIT_CONFIG_GLOBAL": os.devnull, "GIT_CONFIG_NOSYSTEM": "1"}):
+            result = workspace.run(Config.config(debug=True), self.directory, date.today(), date.today())
+
+        self.assertEqual((1, 0, 1), result)
+        remotes = [remote for remote, _ in mock_create_merged_activity.call_args[0][2]]
+        self.assertEqual(["git@github.com:autentia/mine.git"], remotes)
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials', MagicMock(return_value=("user", "pass")))
+    @patch('TNTGitHook.hook.resolve_role_id', MagicMock(return_value=0))
+    def test_activity_waits_for_the_push_updating_it(self, mock_create_merged_activity: MagicMock):
+        mock_create_merged_activity.return_value = MagicMock(status_code=200)
+        self.commit(self.repository("backend", DEVELOPER), "Backend change")
+        prj_config = workspace.read_repository(f"{self.directory}/backend").prj_config
+
+        with outbox.group_locked(date.today(), prj_config):
+            worker = Thread(target=workspace.run, args=(Config.config(debug=True), self.directory, date.today(),
+                                                        date.today()))
+            worker.start()
+            worker.join(0.2)
+            mock_create_merged_activity.assert_not_called()
+        worker.join()
+
+        mock_create_merged_activity.assert_called_once()
+
+    @patch('TNTGitHook.hook.create_merged_activity')
+    @patch('TNTGitHook.hook.retrieve_keychain_credentials')
+    def test_nothing_is_registered_without_commits(self, mock_credentials: MagicMock,
+                                                   mock_create_merged_activity: MagicMock):
+        self.repository("empty", DEVELOPER)
+
+        self.assertEqual((0, 0, 0), workspace.run(Config.config(debug=True), self.directory, date.today(),
+                                                  date.today()))
+        mock_credentials.assert_not_called()
+        mock_create_merged_activity.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()